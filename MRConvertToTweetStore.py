@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Read in tweets once and write the fields the other jobs use to a columnar
+tweet store on local disk, one directory per day (see trec_ingest/store.py).
+
+The output is a file list for the store: pass it, with --tweet-store, to
+any of the other jobs in place of list_of_trec_files.txt.
+"""
+import logging
+import os
+
+from mrjob.protocol import PickleProtocol
+from mrjob.protocol import RawValueProtocol
+
+# ingest imports
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.store import TweetStoreWriter
+from trec_ingest.store import day_from_epoch
+from trec_ingest.store import day_table_line
+from trec_ingest.store import tweet_record_from_entry
+
+
+class MRConvertToTweetStore(MRTrecJob):
+    """
+    Mappers pull the fields out of each entry and key them by day;
+    each reducer call writes one day of the store.
+    """
+    INTERNAL_PROTOCOL = PickleProtocol  # Serialize messages internally
+    OUTPUT_PROTOCOL = RawValueProtocol  # Output as store file list
+
+    def configure_options(self):
+        """Configure where the store goes and what it keeps."""
+        super(MRConvertToTweetStore, self).configure_options()
+        self.add_passthrough_option('--store-dir',
+                                    default=None,
+                                    help='absolute path of the directory to write the tweet store to')
+        self.add_passthrough_option('--skip-content', action='store_true', default=False,
+                                    help="don't keep the raw tweet content, only the parsed fields")
+
+    def load_options(self, args):
+        """Tasks don't run in the launch directory, so the store needs a full path."""
+        super(MRConvertToTweetStore, self).load_options(args)
+        if not self.options.store_dir or not os.path.isabs(self.options.store_dir):
+            self.option_parser.error('--store-dir must be an absolute path')
+
+    def mapper_init(self):
+        """Set up a logger and initialize counters"""
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                            datefmt='%m-%d %H:%M',
+                            filename='./mrtwa.log',
+                            filemode='w')
+        self.logger = logging.getLogger(__name__)
+        self.increment_counter('wa1', 'valid_tweets', 0)
+        self.increment_counter('wa1', 'other_exception', 0)
+
+        self.ingest_init()
+
+    def mapper(self, _, line):
+        """
+        Takes a line specifying a file in an s3 bucket,
+        connects to and retrieves all tweets from the file.
+        :param _: the line number in the file listing the buckets (ignored)
+        :param str|unicode line: pseudo-tab separated date, size amd file path
+        :return tuple: day, tweet record
+        """
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
+
+    def mapper_final(self):
+        """Convert the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
+
+    def mapper_feed_entries(self, entries):
+        """
+        Yields every tweet's record, keyed by the UTC day it was published.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: day, tweet record
+        """
+        for entry in entries:
+            try:
+                record = tweet_record_from_entry(entry, not self.options.skip_content)
+            except Exception as e:
+                self.increment_counter('wa1', 'other_exception', 1)
+                self.logger.debug('Could not convert entry: {}'.format(e))
+                continue
+            self.increment_counter('wa1', 'valid_tweets', 1)
+            yield day_from_epoch(record[2]), record
+
+    def reducer(self, day, records):
+        """
+        :param str day: YYYY-MM-DD
+        :param records: generator of tweet records published that day
+        :return tuple: None, file list line for the day
+        """
+        writer = TweetStoreWriter(self.options.store_dir, day)
+        for record in records:
+            writer.append(record)
+        count = writer.close()
+        self.increment_counter('wa1', 'days_written', 1)
+        yield None, day_table_line(self.options.store_dir, day, count)
+
+
+if __name__ == '__main__':
+    MRConvertToTweetStore.run()
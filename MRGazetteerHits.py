@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+TREC DD 2015
+Ebola domain
+
+Count how often each gazetteer entry matches, per day, over the corpus.
+
+MRTwitterWestAfricaUsers only keeps whether a tweet mentions a west african
+place, another place or a CrisisLex term. This job finds the entries behind
+those flags, with the same tokens and the same gazetteer index, so noisy
+entries can be pruned after one pass over the corpus.
+
+Each output line is tab-separated:
+    day  gazetteers  entry  hits  tweets
+where gazetteers names the gazetteers the entry is in (comma-separated),
+hits counts its matches and tweets the tweets it matched in.
+"""
+from array import array
+import logging
+import time
+
+from mrjob.protocol import PickleProtocol
+from mrjob.protocol import RawValueProtocol
+
+from gazetteer import normalize_tokens
+from MRTwitterWestAfricaUsers import load_gazetteers
+
+# ingest imports
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.manifest import EBOLA_DATE_RANGE
+from trec_ingest.timestamps import DEC_2014
+from trec_ingest.timestamps import FEB_2014
+from trec_ingest.timestamps import SECONDS_PER_DAY
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+# Distinct (entry, day) counts a mapper holds before handing them on
+MAX_BUFFERED_COUNTS = 100000
+
+
+def day_string(day):
+    """
+    :param int day: days since 1970-01-01
+    :return str: the day as YYYY-MM-DD
+    """
+    return time.strftime('%Y-%m-%d', time.gmtime(day * SECONDS_PER_DAY))
+
+
+class HitCounter(object):
+    """
+    Hits and tweets per (entry, day), summed in the mapper until flushed.
+    """
+    def __init__(self, index):
+        """
+        :param GazetteerIndex index: from `load_gazetteers()`
+        """
+        self.index = index
+        self.counts = {}
+        self.hits = array('i')
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add_tweet(self, tokens, tweet_epoch):
+        """
+        :param list tokens: simpleTokenize() of the tweet; normalized here
+            as the gazetteer entries were compiled
+        :param int tweet_epoch: when the tweet was published, in epoch seconds
+        :return int: number of hits in the tweet
+        """
+        hits = self.hits
+        del hits[:]
+        n_hits = self.index.find_hits(normalize_tokens(tokens), hits)
+        if not n_hits:
+            return 0
+
+        day = tweet_epoch // SECONDS_PER_DAY
+        counts = self.counts
+        seen = set()
+        for i in xrange(0, 3 * n_hits, 3):
+            entry_id = hits[i]
+            key = (entry_id, day)
+            entry_counts = counts.get(key)
+            if entry_counts is None:
+                entry_counts = counts[key] = [0, 0]
+            entry_counts[0] += 1
+            if entry_id not in seen:
+                seen.add(entry_id)
+                entry_counts[1] += 1
+        return n_hits
+
+    def flush(self):
+        """
+        :return generator: day, gazetteers and entry as key, [hits, tweets];
+            the counter is emptied
+        """
+        counts, self.counts = self.counts, {}
+        index = self.index
+        for (entry_id, day), entry_counts in counts.iteritems():
+            gazetteers = ','.join(index.label_names(index.entry_labels[entry_id]))
+            key = '\t'.join([day_string(day), gazetteers, index.entries[entry_id].encode('utf8')])
+            yield key, entry_counts
+
+
+class MRGazetteerHits(MRTrecJob):
+    """
+    Hits per gazetteer entry per day, over in-range, non-spam tweets.
+    """
+    INTERNAL_PROTOCOL = PickleProtocol  # Serialize messages internally
+    OUTPUT_PROTOCOL = RawValueProtocol  # Output as tab-separated lines
+    DATE_RANGE = EBOLA_DATE_RANGE  # Only read files from February - November 2014
+
+    def configure_options(self):
+        """Configure the gazetteer indexes."""
+        super(MRGazetteerHits, self).configure_options()
+        self.add_file_option('--west-africa-places',
+                             default='only_west_africa.csv.idx',
+                             help='path to gazetteer index of west african places; see gazetteer.compiler')
+        self.add_file_option('--other-places',
+                             default='only_other_places.csv.idx',
+                             help='path to gazetteer index of non-west african places; see gazetteer.compiler')
+        self.add_file_option('--crisislex',
+                             default='CrisisLexRec.csv.idx',
+                             help='path to gazetteer index of crisislex terms; see gazetteer.compiler')
+
+    def mapper_init(self):
+        """Set up a logger, counters and the gazetteer index"""
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                            datefmt='%m-%d %H:%M',
+                            filename='./mrtwa.log',
+                            filemode='w')
+        self.logger = logging.getLogger(__name__)
+        self.increment_counter('wa1', 'tweet_date_valid', 0)
+        self.increment_counter('wa1', 'tweet_date_invalid', 0)
+        self.increment_counter('wa1', 'spam_count', 0)
+        self.increment_counter('wa1', 'tweets_with_hits', 0)
+
+        self.ingest_init()
+
+        self.hit_counter = HitCounter(load_gazetteers(self.options.west_africa_places,
+                                                      self.options.other_places,
+                                                      self.options.crisislex))
+
+    def mapper(self, _, line):
+        """
+        Takes a line specifying a file in an s3 bucket,
+        connects to and retrieves all tweets from the file,
+        and counts the gazetteer entries in them.
+        :param _: the line number in the file listing the buckets (ignored)
+        :param str|unicode line: pseudo-tab separated date, size amd file path
+        :return tuple: day, gazetteers and entry as key, [hits, tweets]
+        """
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
+
+    def mapper_final(self):
+        """Count the files still being prefetched, then hand on the counts."""
+        for key, value in self.mapper_feed_entries(self.drain_feed_entries()):
+            yield key, value
+        for key, value in self.hit_counter.flush():
+            yield key, value
+
+    def mapper_feed_entries(self, entries):
+        """
+        Counts the entries in in-range, non-spam tweets. Counts are only
+        yielded when the mapper holds too many of them.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: day, gazetteers and entry as key, [hits, tweets]
+        """
+        for entry in entries:
+            tweet = entry.feed_entry
+
+            if tweet.spam_probability > 0.5:
+                self.increment_counter('wa1', 'spam_count', 1)
+                continue
+
+            try:
+                tweet_epoch = epoch_from_timestamp(tweet.last_published)
+            except ValueError:
+                self.increment_counter('wa1', 'tweet_date_exception', 1)
+                continue
+
+            if not FEB_2014 <= tweet_epoch < DEC_2014:
+                self.increment_counter('wa1', 'tweet_date_invalid', 1)
+                continue
+            self.increment_counter('wa1', 'tweet_date_valid', 1)
+
+            try:
+                if self.hit_counter.add_tweet(self.tokenize(tweet.title), tweet_epoch):
+                    self.increment_counter('wa1', 'tweets_with_hits', 1)
+            except:
+                self.increment_counter('wa1', 'other_exception', 1)
+                continue
+
+            if len(self.hit_counter) >= MAX_BUFFERED_COUNTS:
+                for key, value in self.hit_counter.flush():
+                    yield key, value
+
+    def combiner(self, key, counts):
+        """
+        :param str key: day, gazetteers and entry
+        :param counts: generator of [hits, tweets]
+        :return tuple: key, summed [hits, tweets]
+        """
+        yield key, map(sum, zip(*counts))
+
+    def reducer(self, key, counts):
+        """
+        :param str key: day, gazetteers and entry
+        :param counts: generator of [hits, tweets]
+        :return tuple: None, tab-separated line
+        """
+        hits, tweets = map(sum, zip(*counts))
+        yield None, '\t'.join([key, str(hits), str(tweets)])
+
+
+if __name__ == '__main__':
+    # Build the gazetteer indexes first:
+    #   python -m gazetteer.compiler only_west_africa.csv only_other_places.csv CrisisLexRec.csv
+
+    MRGazetteerHits.run()
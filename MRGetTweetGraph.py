@@ -3,95 +3,128 @@ __author__ = 'Sam Zhang, Peter M. Landwehr'
 """
 Read in tweets. If the user or the mentioned users are in a predefined list,
 extract the edge.
-Return edges if they are over a given threshold in both directions
-Edges are yielded as soon as they pass the threshold, so all weights are minimums.
+Return edges if they are over a given threshold in both directions.
+Mappers sum edge weights in memory and the combiner sums them further, but
+only the reducer sees an edge's total weight, so only it applies the threshold.
 """
-import codecs
 import logging
-import os
-from cStringIO import StringIO
 
-from mrjob.job import MRJob
-from mrjob.protocol import PickleProtocol
 from mrjob.protocol import RawValueProtocol
-import requests
-import sys
-
-# parse code
-from twokenize import simpleTokenize
-import marisa_trie
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.authors import author_screen_name
+from trec_ingest.entities import scan_mentions
+from trec_ingest.protocol import VarintProtocol
+from trec_ingest.registry import UserRegistry
 
 
 MIN_BIDIRECTIONAL_WEIGHT = 2
+MAX_BUFFERED_EDGES = 100000
 
 
-def write_gazetteer_to_trie_pickle_file(filename):
-    """
-    Load newline-delimited gazetteer file at `filename` by
-        - Tokenizing by whitespace
-        - Loading n-grams into a trie.
+def get_edge_key_value_pair(source_uni, sink_uni):
+    if source_uni < sink_uni:
+        return source_uni.encode('utf8')+'@'+sink_uni.encode('utf8'), (1, 0)
+    return sink_uni.encode('utf8')+'@'+source_uni.encode('utf8'), (0, 1)
 
-    Pickles output
-    """
-    with codecs.open(filename, 'r', 'utf8') as infile:
-        lines = list(set(line.lower().strip() for line in infile))
 
-    trie = marisa_trie.Trie(lines)
-    trie.save(filename + '.tr')
+def get_mentions(tweet_text):
+    """
+    :param unicode tweet_text: text of the tweet
+    :return list: lowercased users mentioned in the tweet, sans '@'; see
+        trec_ingest.entities
+    """
+    return [name.lower() for name in scan_mentions(tweet_text)]
 
 
-def load_trie_from_pickle_file(filename):
-    trie = marisa_trie.Trie()
-    trie.load(filename)
-    return trie
+def get_tweet_edges(user_scrn_uni, mentions_uni, username_set):
+    """
+    If the user is known, yields edges for all unknown mentioned users.
+    Alternately, if a mentioned user is known, yields an edge to them.
+    :param unicode user_scrn_uni: screen name of the tweet's author
+    :param list mentions_uni: users mentioned in the tweet
+    :param set|UserRegistry username_set: known users
+    :return generator: edge key, edge weight pairs
+    """
+    if user_scrn_uni in username_set:
+        for mention in mentions_uni:
+            if mention not in username_set:
+                yield get_edge_key_value_pair(user_scrn_uni, mention)
+    else:
+        for mention in mentions_uni:
+            if mention in username_set:
+                yield get_edge_key_value_pair(user_scrn_uni, mention)
 
 
-def any_word_subsequence_in_trie(tweet_tokens, trie):
+class EdgeWeights(object):
     """
-    :param list|tuple tweet_tokens: tokenized tweet
-    :param marisa_trie.Trie trie: trie of words
-    :return bool: True if some subset of the tweet's words are in the trie, else False
+    Per-edge sums of (in, out) weights, held in the mapper for at most
+    `size` edges. When the table fills, the lighter half of it is handed on
+    and the heavier half kept, so the edges of much-mentioned users (news
+    accounts and the like) are summed in memory for the whole input and
+    shuffled about once per mapper. Evicted sums are exact partial sums, as
+    in Space-Saving with the counts handed on instead of estimated.
     """
-    cur_uni = tweet_tokens[-1]
-    if trie.has_keys_with_prefix(cur_uni):
-        return True
-    for i in xrange(len(tweet_tokens) - 2, -1, -1):
-        cur_uni = tweet_tokens[i] + ' ' + cur_uni
-        if trie.has_keys_with_prefix(cur_uni):
-            return True
-    return False
+    def __init__(self, size=MAX_BUFFERED_EDGES):
+        """
+        :param int size: edges to hold before evicting
+        """
+        self.size = max(size, 2)
+        self.weights = {}
 
+    def __len__(self):
+        return len(self.weights)
 
-def get_edge_key_value_pair(source_uni, sink_uni):
-    if source_uni < sink_uni:
-        return source_uni.encode('utf8')+'@'+sink_uni.encode('utf8'), (1, 0)
-    return sink_uni.encode('utf8')+'@'+source_uni.encode('utf8'), (0, 1)
+    def add(self, edge_name, edge_weight):
+        """
+        :param str edge_name: Alpha-sorted name of the edge
+        :param tuple edge_weight: (in, out) weights
+        :return list: (edge name, [in, out]) for each evicted edge; usually empty
+        """
+        weights = self.weights.get(edge_name)
+        if weights is not None:
+            weights[0] += edge_weight[0]
+            weights[1] += edge_weight[1]
+            return []
+        self.weights[edge_name] = list(edge_weight)
+        if len(self.weights) < self.size:
+            return []
+        # Sorting the table costs O(n log n) every n / 2 new edges
+        edges = sorted(self.weights.iteritems(), key=lambda item: item[1][0] + item[1][1])
+        evicted = edges[:len(edges) // 2]
+        for edge_name, _ in evicted:
+            del self.weights[edge_name]
+        return evicted
+
+    def flush(self):
+        """
+        :return list: (edge name, [in, out]) for each edge; the sums are emptied
+        """
+        weights, self.weights = self.weights, {}
+        return weights.items()
 
 
-class MRGetTweetGraph(MRJob):
+class MRGetTweetGraph(MRTrecJob):
     """
     <Temporary empty docstring>
     """
     # INPUT_PROTOCOL = protocol.RawValueProtocol  # Custom parse tab-delimited values
-    INTERNAL_PROTOCOL = PickleProtocol  # protocol.RawValueProtocol  # Serialize messages internally
+    INTERNAL_PROTOCOL = VarintProtocol  # Serialize edge weights internally as varints
     OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
 
     def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
+        """Configure the list of desired users."""
         super(MRGetTweetGraph, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
         self.add_file_option('--desired-users',
                              default='usernames.csv.tr',
-                             help='path to pickled trie of desired usernames')
+                             help='path to user registry (.tr) or list of desired usernames; '
+                                  'see trec_ingest.registry')
+        self.add_passthrough_option('--max-buffered-edges', type='int', default=MAX_BUFFERED_EDGES,
+                                    help='edges whose weights a mapper sums in memory before handing the '
+                                         'lighter half on (default: {}; 0 to yield every edge '
+                                         'as found)'.format(MAX_BUFFERED_EDGES))
 
     def mapper_init(self):
         """Set up a logger and initialize counters"""
@@ -104,7 +137,6 @@ class MRGetTweetGraph(MRJob):
         self.increment_counter('wa1', 'file_date_invalid', 0)
         self.increment_counter('wa1', 'file_date_valid', 0)
         self.increment_counter('wa1', 'file_date_exception', 0)
-        self.increment_counter('wa1', 'file_data_bad', 0)
         self.increment_counter('wa1', 'tweet_date_valid', 0)
         self.increment_counter('wa1', 'tweet_date_invalid', 0)
         self.increment_counter('wa1', 'tweet_date_exception', 0)
@@ -115,18 +147,17 @@ class MRGetTweetGraph(MRJob):
         self.increment_counter('wa1', 'known_mention', 0)
         self.increment_counter('wa1', 'edge_finding_exception', 0)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
         # self.naive_feb_2014 = dateutil.parser.parse('2014-02-01')
         # self.naive_dec_2014 = dateutil.parser.parse('2014-12-01')
         # self.feb_2014 = dateutil.parser.parse('2014-02-01 00:00:00+00:00')
         # self.dec_2014 = dateutil.parser.parse('2014-12-01 00:00:00+00:00')
 
-        self.username_set = set(x.strip() for x in open(self.options.desired_users))
-        # self.username_trie = load_trie_from_pickle_file(self.options.desired_users)
+        self.username_set = UserRegistry(self.options.desired_users)
+        self.edge_weights = None
+        if self.options.max_buffered_edges > 0:
+            self.edge_weights = EdgeWeights(self.options.max_buffered_edges)
 
     def mapper(self, _, line):
         """
@@ -140,48 +171,33 @@ class MRGetTweetGraph(MRJob):
         :param str|unicode line: pseudo-tab separated date, size amd file path
         :return tuple: user, mentioned user
         """
-        aws_prefix, aws_path = line.strip().split('//')
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
-
-        try:
-            resp = requests.get(url)
-            data = resp.content
-        except Exception as e:
-            self.increment_counter('resp_exception', type(e).__name__, 1)
-            return
-
-        if data is None:
-            self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
-        for entry in reader:
-            # entries have other info, see other info here:
-            # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
-            #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
+
+    def mapper_final(self):
+        """Analyze the files still being prefetched when the input ran out, then hand on the sums."""
+        for edge in self.mapper_feed_entries(self.drain_feed_entries()):
+            yield edge
+        if self.edge_weights is not None:
+            for edge in self.edge_weights.flush():
+                yield edge
+
+    def mapper_feed_entries(self, entries):
+        """
+        Finds an edge for every known user mentioning or mentioned by
+        another, and sums it into the mapper's edge weights; edges are only
+        yielded when evicted, or as found without --max-buffered-edges.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: edge name, edge weights
+        """
+        for entry in entries:
             tweet = entry.feed_entry
 
             if tweet.spam_probability > 0.5:
                 self.increment_counter('wa1', 'spam_count', 1)
                 continue
 
-            mentions_uni = [tok[1:].lower() for tok in simpleTokenize(tweet.title) if tok[0] == '@']
+            mentions_uni = get_mentions(tweet.title)
             if len(mentions_uni) == 0:
                 self.increment_counter('wa1', 'no_mentions', 1)
                 continue
@@ -190,31 +206,28 @@ class MRGetTweetGraph(MRJob):
 
             try:
                 # user_scrn_uni = tweet.author[0].name.split(' (')[0]
-                user_scrn_uni = tweet.author[0].link[0].href.split('/')[-1].lower().decode('utf8')
-                if user_scrn_uni in self.username_set:
-                    # self.increment_counter('u_'+user_scrn_uni, tweet.title, 1)
-                    # self.increment_counter('wa1', 'known_user', len(mentions_uni))
-                    for mention in mentions_uni:
-                        if mention not in self.username_set:
-                            yield get_edge_key_value_pair(user_scrn_uni, mention)
-                else:
-                    for mention in mentions_uni:
-                        if mention in self.username_set:
-                            # self.increment_counter('m_'+mention+'@u_'+user_scrn_uni, tweet.title, 1)
-                            # self.increment_counter('wa1', 'known_mention', 1)
-                            yield get_edge_key_value_pair(user_scrn_uni, mention)
+                user_scrn_uni = author_screen_name(tweet).decode('utf8')
+                edges = list(get_tweet_edges(user_scrn_uni, mentions_uni, self.username_set))
             except:
                 self.increment_counter('wa1', 'edge_finding_exception', 1)
+                continue
+
+            if self.edge_weights is None:
+                for edge in edges:
+                    yield edge
+                continue
+            for edge_name, edge_weight in edges:
+                for edge in self.edge_weights.add(edge_name, edge_weight):
+                    yield edge
 
     def combiner(self, edge_name, edge_weight_tuples):
         """
         :param str edge_name: Alpha-sorted name of the edge
-        :param list edge_weight_tuples: list (generator) of 0,1 and 1,0 edge weights
+        :param list edge_weight_tuples: list (generator) of (in, out) edge weights
         :return tuple: edge_name, combined edge weights
         """
-        cur_in, cur_out = map(sum, zip(*edge_weight_tuples))
-        if cur_in >= MIN_BIDIRECTIONAL_WEIGHT and cur_out >= MIN_BIDIRECTIONAL_WEIGHT:
-            yield edge_name, (cur_in, cur_out)
+        # Only the reducer sees an edge's total weight, so only it may threshold.
+        yield edge_name, map(sum, zip(*edge_weight_tuples))
 
     def reducer(self, edge_name, edge_weight_tuples):
         """
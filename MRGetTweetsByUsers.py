@@ -3,92 +3,44 @@ __author__ = 'Sam Zhang, Peter M. Landwehr'
 """
 Read in tweets. If the user is in a predefined list, extract the tweet.
 """
-import codecs
 import logging
-import os
-from cStringIO import StringIO
 
 import dateutil
 import dateutil.parser
-from mrjob.job import MRJob
 from mrjob.protocol import PickleProtocol
 from mrjob.protocol import RawValueProtocol
-import requests
-import sys
 import zlib
 
 # parse code
 # from twokenize import simpleTokenize
-import marisa_trie
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.authors import author_screen_name
+from trec_ingest.manifest import EBOLA_DATE_RANGE
+from trec_ingest.registry import UserRegistry
+from trec_ingest.timestamps import DEC_2014
+from trec_ingest.timestamps import FEB_2014
+from trec_ingest.timestamps import epoch_from_timestamp
 
 
-def write_gazetteer_to_trie_pickle_file(filename):
-    """
-    Load newline-delimited gazetteer file at `filename` by
-        - Tokenizing by whitespace
-        - Loading n-grams into a trie.
-
-    Pickles output
-    """
-    with codecs.open(filename, 'r', 'utf8') as infile:
-        lines = list(set(line.lower().strip() for line in infile))
-
-    trie = marisa_trie.Trie(lines)
-    trie.save(filename + '.tr')
-
-
-def load_trie_from_pickle_file(filename):
-    trie = marisa_trie.Trie()
-    trie.load(filename)
-    return trie
-
-
-def any_word_subsequence_in_trie(tweet_tokens, trie):
-    """
-    :param list|tuple tweet_tokens: tokenized tweet
-    :param marisa_trie.Trie trie: trie of words
-    :return bool: True if some subset of the tweet's words are in the trie, else False
-    """
-    cur_uni = tweet_tokens[-1]
-    if trie.has_keys_with_prefix(cur_uni):
-        return True
-    for i in xrange(len(tweet_tokens) - 2, -1, -1):
-        cur_uni = tweet_tokens[i] + ' ' + cur_uni
-        if trie.has_keys_with_prefix(cur_uni):
-            return True
-    return False
-
-
-def get_edge_key_value_pair(source_uni, sink_uni):
-    if source_uni < sink_uni:
-        return source_uni.encode('utf8')+'@'+sink_uni.encode('utf8'), (1, 0)
-    return sink_uni.encode('utf8')+'@'+source_uni.encode('utf8'), (0, 1)
-
-
-class MRGetTweetsByUsers(MRJob):
+class MRGetTweetsByUsers(MRTrecJob):
     """
     <Temporary empty docstring>
     """
     # INPUT_PROTOCOL = protocol.RawValueProtocol  # Custom parse tab-delimited values
     INTERNAL_PROTOCOL = PickleProtocol  # protocol.RawValueProtocol  # Serialize messages internally
     OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
+    DATE_RANGE = EBOLA_DATE_RANGE  # Only read files from February - November 2014
 
     def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
+        """Configure the list of desired users."""
         super(MRGetTweetsByUsers, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
         self.add_file_option('--desired-users',
                              default='usernames.csv.tr',
-                             help='path to pickled trie of desired usernames')
+                             help='path to user registry (.tr) or list of desired usernames; '
+                                  'see trec_ingest.registry')
 
     def mapper_init(self):
         """Set up a logger and initialize counters"""
@@ -100,7 +52,6 @@ class MRGetTweetsByUsers(MRJob):
         self.logger = logging.getLogger(__name__)
         self.increment_counter('wa1', 'file_date_invalid', 0)
         self.increment_counter('wa1', 'file_date_valid', 0)
-        self.increment_counter('wa1', 'file_data_bad', 0)
         self.increment_counter('wa1', 'tweet_date_valid', 0)
         self.increment_counter('wa1', 'tweet_date_invalid', 0)
         self.increment_counter('wa1', 'spam_count', 0)
@@ -110,17 +61,12 @@ class MRGetTweetsByUsers(MRJob):
         self.increment_counter('wa1', 'known_mention', 0)
         self.increment_counter('wa1', 'edge_finding_exception', 0)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
         self.naive_feb_2014 = dateutil.parser.parse('2014-02-01')
         self.naive_dec_2014 = dateutil.parser.parse('2014-12-01')
-        self.feb_2014 = dateutil.parser.parse('2014-02-01 00:00:00+00:00')
-        self.dec_2014 = dateutil.parser.parse('2014-12-01 00:00:00+00:00')
 
-        self.username_trie = load_trie_from_pickle_file(self.options.desired_users)
+        self.username_trie = UserRegistry(self.options.desired_users)
 
     def mapper(self, _, line):
         """
@@ -134,48 +80,37 @@ class MRGetTweetsByUsers(MRJob):
         :param str|unicode line: pseudo-tab separated date, size amd file path
         :return tuple: user, mentioned user
         """
-        aws_prefix, aws_path = line.strip().split('//')
+        aws_path = aws_path_from_line(line)
         bucket_date = dateutil.parser.parse(aws_path.split('/')[-2])
         if bucket_date < self.naive_feb_2014 or bucket_date > self.naive_dec_2014:
             self.increment_counter('wa1', 'file_date_invalid', 1)
             return
 
         self.increment_counter('wa1', 'file_date_valid', 1)
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
-        resp = requests.get(url)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
 
-        data = resp.content
-        if data is None:
-            self.logger('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
+    def mapper_final(self):
+        """Analyze the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
-        for entry in reader:
-            # entries have other info, see other info here:
-            # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
-            #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
+    def mapper_feed_entries(self, entries):
+        """
+        Yields the raw content of in-range tweets by desired users.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: None, raw tweet content
+        """
+        for entry in entries:
             tweet = entry.feed_entry
 
-            tweet_time = dateutil.parser.parse(tweet.last_published)
-            if self.feb_2014 > tweet_time or tweet_time > self.dec_2014:
+            try:
+                tweet_epoch = epoch_from_timestamp(tweet.last_published)
+            except ValueError:
+                self.increment_counter('wa1', 'tweet_date_exception', 1)
+                continue
+
+            if FEB_2014 > tweet_epoch or tweet_epoch > DEC_2014:
                 self.increment_counter('wa1', 'tweet_date_invalid', 1)
-                self.logger.debug('Bad time:{}'.format(tweet_time))
+                self.logger.debug('Bad time:{}'.format(tweet.last_published))
                 continue
             self.increment_counter('wa1', 'tweet_date_valid', 1)
 
@@ -185,8 +120,7 @@ class MRGetTweetsByUsers(MRJob):
 
             try:
                 # user_scrn_uni = tweet.author[0].name.split(' (')[0]
-                user_scrn_uni = tweet.author[0].link[0].href.split('/')[-1].lower().decode('utf8')
-                if user_scrn_uni in self.username_trie:
+                if author_screen_name(tweet) in self.username_trie:
                     raw = zlib.decompress(entry.feed_entry.content.data).decode('utf8').encode('utf8')
                     yield None, raw
             except:
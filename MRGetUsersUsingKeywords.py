@@ -11,48 +11,132 @@ ebola crisis.
 This program extracts users who appear to mention west africa a moderate number of times
 and who on average tweet between 10 AM and 8 PM in UTC 0 (west african time).
 """
+import codecs
 import logging
-import os
-from cStringIO import StringIO
-from urllib2 import urlparse
 
-from mrjob.job import MRJob
-from mrjob.protocol import PickleProtocol
 from mrjob.protocol import RawValueProtocol
-import requests
-import sys
 
-# parse code
+from gazetteer.normalize import normalize_text
+from gazetteer.normalize import strip_hashtag
 from twokenize import simpleTokenize
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.authors import author_screen_name
+from trec_ingest.protocol import VarintProtocol
+from trec_ingest.registry import UserRegistry
 
 
-class MRGetUsersUsingKeywords(MRJob):
+def load_keywords(filename):
+    """
+    :param str filename: newline-delimited keywords, utf8
+    :return list: the distinct keywords, normalized like tweet tokens, in
+        the order of the file; a keyword's id is its position
+    """
+    keywords = []
+    seen = set()
+    with codecs.open(filename, 'r', 'utf8') as f:
+        for line in f:
+            keyword = normalize_text(line.strip())
+            if keyword and keyword not in seen:
+                seen.add(keyword)
+                keywords.append(keyword)
+    return keywords
+
+
+def keyword_index(keywords):
+    """
+    :param list keywords: from `load_keywords()`
+    :return dict: id of each keyword
+    """
+    return dict((keyword, keyword_id) for keyword_id, keyword in enumerate(keywords))
+
+
+def keyword_tokens(text, tokenize=simpleTokenize):
+    """
+    :param unicode text: text of the tweet
+    :param tokenize: the tokenizer to use
+    :return set: its tokens, normalized as the keywords were and without
+        hashmarks; see ParsedTweet.hashless_lower_tokens
+    """
+    return set(strip_hashtag(x) for x in tokenize(normalize_text(text)))
+
+
+def get_keyword_counts(tokens, index):
+    """
+    :param set tokens: lowercased tokens of the tweet, sans hashmarks
+    :param dict index: from `keyword_index()`
+    :return list: sparse vector of (keyword_id, 1) for each keyword in the
+        tweet, sorted by id
+    """
+    return sorted((index[token], 1) for token in tokens if token in index)
+
+
+def merge_keyword_counts(values):
+    """
+    :param values: (tweet count, sparse vector of keyword counts) pairs
+    :return tuple: total tweet count, and the summed sparse vector
+    """
+    n_tweets = 0
+    counts = {}
+    for tweet_count, keyword_counts in values:
+        n_tweets += tweet_count
+        for keyword_id, count in keyword_counts:
+            counts[keyword_id] = counts.get(keyword_id, 0) + count
+    return n_tweets, sorted(counts.iteritems())
+
+
+def keyword_counts_line(user, n_tweets, keyword_counts, n_keywords):
+    """
+    :param str user: screen name, or 'Null User'
+    :param int n_tweets: tweet count
+    :param list keyword_counts: sparse vector of keyword counts
+    :param int n_keywords: number of keywords
+    :return str: csv line of the user, tweet count and every keyword's count
+    """
+    dense = [0] * n_keywords
+    for keyword_id, count in keyword_counts:
+        dense[keyword_id] = count
+    return user + ',' + ','.join([str(x) for x in [n_tweets] + dense])
+
+
+class KeywordCountsProtocol(VarintProtocol):
+    """
+    VarintProtocol for a tweet count and sparse vector of keyword counts,
+    flattened to the count followed by each keyword's id and count.
+    """
+    def dump_value(self, value):
+        n_tweets, keyword_counts = value
+        ints = [n_tweets]
+        for keyword_id, count in keyword_counts:
+            ints.append(keyword_id)
+            ints.append(count)
+        return ints
+
+    def load_value(self, ints):
+        counts = iter(ints)
+        return next(counts), zip(counts, counts)
+
+
+class MRGetUsersUsingKeywords(MRTrecJob):
     """
     <Temporary empty docstring>
     """
     # INPUT_PROTOCOL = protocol.RawValueProtocol  # Custom parse tab-delimited values
-    INTERNAL_PROTOCOL = PickleProtocol  # protocol.RawValueProtocol  # Serialize messages internally
+    INTERNAL_PROTOCOL = KeywordCountsProtocol  # Serialize keyword counts internally as varints
     OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
 
     def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
+        """Configure the keyword and known user lists."""
         super(MRGetUsersUsingKeywords, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
         self.add_file_option('--keyword-file',
                              default='seed_keywords.csv',
                              help='path to list of keywords')
         self.add_file_option('--known-user-file',
                              default='seed_usernames.csv',
-                             help='path to list of known usernames')
+                             help='path to user registry (.tr) or list of known usernames; '
+                                  'see trec_ingest.registry')
 
     def mapper_init(self):
         """Set up a logger, counters, and a set of keywords"""
@@ -63,18 +147,14 @@ class MRGetUsersUsingKeywords(MRJob):
                             filemode='w')
         self.logger = logging.getLogger(__name__)
         self.increment_counter('wa1', 'file_date_valid', 0)
-        self.increment_counter('wa1', 'file_data_bad', 0)
         self.increment_counter('wa1', 'tweet_date_valid', 0)
         self.increment_counter('wa1', 'tweet_date_invalid', 0)
         self.increment_counter('wa1', 'spam_count', 0)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
-        self.keywords = [x.strip() for x in open(self.options.keyword_file, 'r')]
-        self.known_users = set(x.stri() for x in open(self.option.known_user_file, 'r'))
+        self.keyword_index = keyword_index(load_keywords(self.options.keyword_file))
+        self.known_users = UserRegistry(self.options.known_user_file)
         self.null_thresh = 1000000
 
     def mapper(self, _, line):
@@ -86,41 +166,22 @@ class MRGetUsersUsingKeywords(MRJob):
         :param str|unicode line: pseudo-tab separated date, size amd file path
         :return tuple: user as key, language, post time, and body as tuple
         """
-        cur_line = line.strip()
-        aws_prefix, aws_path = cur_line.split('//')
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
 
-        try:
-            resp = requests.get(url)
-        except Exception as e:
-            self.increment_counter('resp_exception', type(e).__name__, 1)
-            return
-
-        data = resp.content
-        if data is None:
-            self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(self.options.gpg_private))
-            self.increment_counter('wa1', 'missing_key', 1)
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
+    def mapper_final(self):
+        """Analyze the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
+
+    def mapper_feed_entries(self, entries):
+        """
+        Yields summary stats totaling up the number of time each keyword is used.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: user as key, tweet count and sparse vector of keyword counts
+        """
         null_tweets = 0
         try:
-            for entry in reader:
+            for entry in entries:
                 # entries have other info, see other info here:
                 # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
                 #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
@@ -129,9 +190,7 @@ class MRGetUsersUsingKeywords(MRJob):
                     self.increment_counter('wa1', 'spam_count', 1)
                     continue
                 try:
-                    user_link = tweet.author[0].link[0].href
-                    user_scrn_uni = urlparse.urlsplit(user_link).path.split('@')[1].lower()
-                    user_scrn_encoded = user_scrn_uni.encode('utf8')
+                    user_scrn_encoded = author_screen_name(tweet)
                     # user_name_scrn_uni = tweet.author[0].name
                     # user_name_uni = ''.join(user_name_scrn_uni.split(' (')[1:])[:-1].lower()
                     # user_scrn_uni = user_name_scrn_uni.split(' (')[0]
@@ -140,15 +199,14 @@ class MRGetUsersUsingKeywords(MRJob):
                     if user_scrn_encoded in self.known_users:
                         continue
 
-                    # When tokenizing, strip hashmarks from hashtags
-                    tokens = set([x[1:] if x[0] == '#' else x for x in simpleTokenize(tweet.title.lower())])
-                    out_vals = [1 if x in tokens else 0 for x in self.keywords]
-                    if sum(out_vals) > 0:
-                        yield (user_scrn_encoded, [1] + out_vals)
+                    tokens = keyword_tokens(tweet.title, self.tokenize)
+                    keyword_counts = get_keyword_counts(tokens, self.keyword_index)
+                    if keyword_counts:
+                        yield (user_scrn_encoded, (1, keyword_counts))
                     else:
                         null_tweets += 1
                         if null_tweets >= self.null_thresh:
-                            yield ('Null User', [null_tweets] + [0]*len(self.keywords))
+                            yield ('Null User', (null_tweets, []))
                             null_tweets = 0
 
                 except Exception as e:
@@ -158,7 +216,7 @@ class MRGetUsersUsingKeywords(MRJob):
             self.increment_counter('file_exception', type(e).__name__, 1)
 
         if null_tweets > 0:
-            yield ('Null User', [null_tweets] + [0]*len(self.keywords))
+            yield ('Null User', (null_tweets, []))
 
     def combiner(self, user, tweet_tuples):
         """
@@ -167,12 +225,14 @@ class MRGetUsersUsingKeywords(MRJob):
         one value greated than zero. (See reducer)
         This means we get an undercount of the user's total volume of tweets!
         :param str|unicode user: The user who made the tweets
-        :param tweet_tuples:
-                    1,
-                    (all other keywords in the list)
-        :return tuple: user, sum of all results (*including* times)
+        :param tweet_tuples: tweet count and sparse vector of keyword counts
+        :return tuple: user, summed tweet count and keyword counts
         """
-        yield user, map(sum, zip(*tweet_tuples))
+        yield user, merge_keyword_counts(tweet_tuples)
+
+    def reducer_init(self):
+        """Count the keywords, to write every keyword's column"""
+        self.n_keywords = len(load_keywords(self.options.keyword_file))
 
     def reducer(self, user, tuples_over_file):
         """
@@ -181,8 +241,8 @@ class MRGetUsersUsingKeywords(MRJob):
         :param tuple tuples_over_file: aggregated tweet tuples from the combiner
         :return tuple:
         """
-        tuples_over_files = map(sum, zip(*tuples_over_file))
-        yield None, user+','+','.join([str(x) for x in tuples_over_files])
+        n_tweets, keyword_counts = merge_keyword_counts(tuples_over_file)
+        yield None, keyword_counts_line(user, n_tweets, keyword_counts, self.n_keywords)
 
 
 if __name__ == '__main__':
@@ -12,38 +12,33 @@ This program extracts users who appear to mention west africa a moderate number
 and who on average tweet between 10 AM and 8 PM in UTC 0 (west african time).
 """
 import logging
-import os
-from cStringIO import StringIO
 
-from mrjob.job import MRJob
 from mrjob.protocol import RawValueProtocol
-import requests
-import sys
-
-from twokenize import simpleTokenize
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+
+
+SALONE_TERMS = ('saloneindependence', 'saloneindependance', 'salone', 'sierraleone')
 
 
-class MRSaloneMentions(MRJob):
+def mentions_salone(tweet_tokens):
+    """
+    :param list tweet_tokens: lowercased tokens of the tweet, sans hashmarks
+    :return bool: True if the tweet mentions Salone or Sierra Leone
+    """
+    return any(term in tweet_tokens for term in SALONE_TERMS)
+
+
+class MRSaloneMentions(MRTrecJob):
     """
     <Temporary empty docstring>
     """
     # INPUT_PROTOCOL = protocol.RawValueProtocol  # Custom parse tab-delimited values
     # INTERNAL_PROTOCOL = PickleProtocol  # protocol.RawValueProtocol  # Serialize messages internally
     OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
-
-    def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
-        super(MRSaloneMentions, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
+    FULL_ENTRIES = True  # Outputs whole entries
 
     def mapper_init(self):
         """Set up a logger and initialize counters"""
@@ -53,14 +48,10 @@ class MRSaloneMentions(MRJob):
                             filename='./mrtwa.log',
                             filemode='w')
         self.logger = logging.getLogger(__name__)
-        self.increment_counter('wa1', 'file_data_bad', 0)
         self.increment_counter('wa1', 'spam_count', 0)
         self.increment_counter('wa1', 'valid_tweets', 0)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
     def mapper(self, _, line):
         """
@@ -74,38 +65,20 @@ class MRSaloneMentions(MRJob):
         :param str|unicode line: pseudo-tab separated date, size amd file path
         :return tuple: user as key, language, post time, and body as tuple
         """
-        cur_line = line.strip()
-        aws_prefix, aws_path = cur_line.split('//')
-
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
-        resp = requests.get(url)
-
-        data = resp.content
-        if data is None:
-            self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(self.options.gpg_private))
-            self.increment_counter('wa1', 'missing_key', 1)
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
-        for entry in reader:
-            # entries have other info, see other info here:
-            # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
-            #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
+
+    def mapper_final(self):
+        """Analyze the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
+
+    def mapper_feed_entries(self, entries):
+        """
+        Yields entries mentioning Salone or Sierra Leone.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: None, entry
+        """
+        for entry in entries:
             tweet = entry.feed_entry
 
             if tweet.spam_probability > 0.5:
@@ -115,14 +88,8 @@ class MRSaloneMentions(MRJob):
             try:
 
                 body_uni = tweet.title
-                tokens = [x[1:] if x[0] == '#' else x for x in simpleTokenize(body_uni.lower().encode('utf8'))]
-                if 'saloneindependence' in tokens:
-                    yield None, entry
-                elif 'saloneindependance' in tokens:
-                    yield None, entry
-                elif 'salone' in tokens:
-                    yield None, entry
-                elif 'sierraleone' in tokens:
+                tokens = [x[1:] if x[0] == '#' else x for x in self.tokenize(body_uni.lower().encode('utf8'))]
+                if mentions_salone(tokens):
                     yield None, entry
 
                 self.increment_counter('wa1', 'valid_tweets', 1)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Run several analyses in one scan of the corpus.
+Each entry is fetched, decrypted and parsed once, then handed to every
+analyzer selected with --analyzers (see analyzers/). Output lines are
+tab-separated: the analyzer's name, then the line its standalone job
+would have written.
+"""
+import logging
+import os
+
+from mrjob.protocol import PickleProtocol
+from mrjob.protocol import RawProtocol
+
+from analyzers import ANALYZERS
+from analyzers import ParsedTweet
+
+# ingest imports
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+
+
+# The standalone jobs whose helpers the built-in analyzers import
+ANALYZER_JOB_SCRIPTS = ['MRGetTweetGraph.py',
+                        'MRGetUsersUsingKeywords.py',
+                        'MRSaloneMentions.py',
+                        'MRTwitterWestAfricaUsers.py']
+
+
+class MRTrecAnalyzers(MRTrecJob):
+    """
+    Fans each non-spam tweet out to the selected analyzers. Keys are the
+    analyzer's name and its own key, joined by a tab, so the combiner and
+    reducer can hand every key back to the analyzer that made it.
+    """
+    INTERNAL_PROTOCOL = PickleProtocol  # Serialize messages internally
+    OUTPUT_PROTOCOL = RawProtocol  # Output as analyzer name, tab, line
+
+    def configure_options(self):
+        """Configure the analyzer list and every analyzer's options."""
+        super(MRTrecAnalyzers, self).configure_options()
+        self.add_passthrough_option('--analyzers',
+                                    default=','.join(sorted(ANALYZERS)),
+                                    help='comma-separated analyzers to run '
+                                         '(default: all of {})'.format(', '.join(sorted(ANALYZERS))))
+
+        # Remember whose file options are whose, so that only the
+        # selected analyzers' files need to exist and be uploaded.
+        self.analyzer_file_options = {}
+        for name in sorted(ANALYZERS):
+            n_file_options = len(self._file_options)
+            ANALYZERS[name].configure_options(self)
+            self.analyzer_file_options[name] = set(opt.get_opt_string()
+                                                   for opt in self._file_options[n_file_options:])
+
+    def load_options(self, args):
+        """Check the analyzer names."""
+        super(MRTrecAnalyzers, self).load_options(args)
+        self.analyzer_names = [x.strip() for x in self.options.analyzers.split(',') if x.strip()]
+        unknown = [x for x in self.analyzer_names if x not in ANALYZERS]
+        if unknown:
+            self.option_parser.error('unknown analyzers: {}'.format(', '.join(unknown)))
+        self.analyzers = dict((name, ANALYZERS[name](self)) for name in self.analyzer_names)
+
+    def needs_full_entries(self):
+        """Any selected analyzer may need whole entries."""
+        return any(ANALYZERS[x.strip()].full_entries
+                   for x in self.options.analyzers.split(',') if x.strip() in ANALYZERS)
+
+    def generate_file_upload_args(self):
+        """Skip the files of analyzers that aren't running."""
+        skipped = set()
+        for name, opt_strings in self.analyzer_file_options.items():
+            if name not in self.analyzers:
+                skipped |= opt_strings
+        return [(opt_string, path)
+                for opt_string, path in super(MRTrecAnalyzers, self).generate_file_upload_args()
+                if opt_string not in skipped]
+
+    def job_runner_kwargs(self):
+        """Ship the job scripts the analyzers import from."""
+        kwargs = super(MRTrecAnalyzers, self).job_runner_kwargs()
+        job_dir = os.path.dirname(os.path.abspath(__file__))
+        kwargs['upload_files'] = list(kwargs['upload_files'] or []) + \
+            [os.path.join(job_dir, script) for script in ANALYZER_JOB_SCRIPTS]
+        return kwargs
+
+    def mapper_init(self):
+        """Set up a logger, counters, and the selected analyzers"""
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                            datefmt='%m-%d %H:%M',
+                            filename='./mrtwa.log',
+                            filemode='w')
+        self.logger = logging.getLogger(__name__)
+        self.increment_counter('wa1', 'spam_count', 0)
+        self.increment_counter('wa1', 'valid_tweets', 0)
+
+        self.ingest_init()
+
+        for name in self.analyzer_names:
+            self.analyzers[name].mapper_init()
+
+    def mapper(self, _, line):
+        """
+        Takes a line specifying a file in an s3 bucket,
+        connects to and retrieves all tweets from the file,
+        and runs every selected analyzer on each of them.
+        :param _: the line number in the file listing the buckets (ignored)
+        :param str|unicode line: pseudo-tab separated date, size amd file path
+        :return tuple: analyzer name and key, value
+        """
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
+
+    def mapper_final(self):
+        """Analyze the files still being prefetched, then flush the analyzers."""
+        for key, value in self.mapper_feed_entries(self.drain_feed_entries()):
+            yield key, value
+        for name in self.analyzer_names:
+            for key, value in self.analyzers[name].map_final() or ():
+                yield name + '\t' + key, value
+
+    def mapper_feed_entries(self, entries):
+        """
+        Decodes each entry once and hands it to every analyzer.
+        An analyzer that fails on a tweet only loses that tweet.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: analyzer name and key, value
+        """
+        for entry in entries:
+            if entry.feed_entry.spam_probability > 0.5:
+                self.increment_counter('wa1', 'spam_count', 1)
+                continue
+            self.increment_counter('wa1', 'valid_tweets', 1)
+
+            tweet = ParsedTweet(entry, self.tokenize)
+            for name in self.analyzer_names:
+                try:
+                    for key, value in self.analyzers[name].map_tweet(tweet) or ():
+                        yield name + '\t' + key, value
+                except Exception as e:
+                    self.increment_counter(name, 'exception_' + type(e).__name__, 1)
+
+    def combiner(self, name_key, values):
+        """
+        :param str name_key: analyzer name and key
+        :param values: generator of the analyzer's values
+        :return tuple: analyzer name and key, combined value
+        """
+        name, key = name_key.split('\t', 1)
+        for key, value in self.analyzers[name].combine(key, values):
+            yield name + '\t' + key, value
+
+    def reducer(self, name_key, values):
+        """
+        :param str name_key: analyzer name and key
+        :param values: generator of the analyzer's values
+        :return tuple: analyzer name, output line
+        """
+        name, key = name_key.split('\t', 1)
+        for line in self.analyzers[name].reduce(key, values) or ():
+            yield name, line
+
+
+if __name__ == '__main__':
+    MRTrecAnalyzers.run()
@@ -11,22 +11,15 @@ ebola crisis.
 This program extracts users who appear to mention west africa a moderate number of times
 and who on average tweet between 10 AM and 8 PM in UTC 0 (west african time).
 """
-import codecs
-import datetime
+from array import array
 import logging
-import os
-from cStringIO import StringIO
-from urllib2 import urlparse
 
 import dateutil
 import dateutil.parser
 # from mrjob.emr import S3Filesystem
-from mrjob.job import MRJob
 from mrjob.protocol import PickleProtocol
 from mrjob.protocol import RawValueProtocol
 from mrjob.step import MRStep
-import requests
-import sys
 
 # parse code
 # from RawCSVProtocol import RawCSVProtocol
@@ -34,83 +27,342 @@ import sys
 # from sam_trie import load_trie_from_pickle_file
 # from sam_trie import write_gazetteer_to_trie_pickle_file
 from twokenize import simpleTokenize
-import marisa_trie
+import numpy as np
+
+from gazetteer import GazetteerIndex
+from gazetteer import normalize_tokens
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.authors import author_screen_name
+from trec_ingest.manifest import EBOLA_DATE_RANGE
+from trec_ingest.protocol import VarintProtocol
+from trec_ingest.timestamps import DEC_2014
+from trec_ingest.timestamps import FEB_2014
+from trec_ingest.timestamps import SECONDS_PER_DAY
+from trec_ingest.timestamps import epoch_from_timestamp
+from trec_ingest.timestamps import seconds_of_day
+
 
+# Bits of the gazetteer index's labels
+WEST_AFRICA_PLACES = 1
+OTHER_PLACES = 2
+CRISISLEX = 4
 
-def write_gazetteer_to_trie_pickle_file(filename):
+
+def load_gazetteers(west_africa_places, other_places, crisislex):
+    """
+    :param str west_africa_places: gazetteer index, raw gazetteer or .tr trie of west african places
+    :param str other_places: gazetteer index, raw gazetteer or .tr trie of non-west african places
+    :param str crisislex: gazetteer index, raw gazetteer or .tr trie of crisislex terms
+    :return GazetteerIndex: labelled WEST_AFRICA_PLACES, OTHER_PLACES and CRISISLEX
     """
-    Load newline-delimited gazetteer file at `filename` by
-        - Tokenizing by whitespace
-        - Loading n-grams into a trie.
+    return GazetteerIndex.from_files([('west_africa_places', west_africa_places),
+                                      ('other_places', other_places),
+                                      ('crisislex', crisislex)])
 
-    Pickles output
+
+UTC_7 = 7 * 3600  # seconds of day
+
+
+def get_text_features(body_uni, user_name_uni, gazetteers, tweet_tokens=None):
+    """
+    The features of get_tweet_stats() that come from text.
+    :param unicode body_uni: text of the tweet
+    :param unicode user_name_uni: full name of the user
+    :param GazetteerIndex gazetteers: from `load_gazetteers()`
+    :param list tweet_tokens: simpleTokenize(body_uni), if already computed
+    :return tuple:
+        (
+        gazetteer_labels         # bitmask of WEST_AFRICA_PLACES, OTHER_PLACES and CRISISLEX
+        ebola_mention            # 0 or 1
+        name_mentions_w_africa   # 0 or 1
+        )
     """
-    with codecs.open(filename, 'r', 'utf8') as infile:
-        lines = list(set(line.lower().strip() for line in infile))
+    # tokenize tweet
+    if tweet_tokens is None:
+        tweet_tokens = simpleTokenize(body_uni)
+    # mentions = [tok[1:] for tok in tokens if len(tok) > 1 and tok[0] == '@']
+
+    # One pass over the tokens finds the places and crisislex terms; they
+    # are normalized the way the gazetteer entries were compiled
+    gazetteer_labels = gazetteers.match_labels(normalize_tokens(tweet_tokens))
+
+    ############################################
+    # Does the tweet mention keywords or topics related to medicine/Ebola?
+    ############################################
+    # TODO: Mine Ebola and medical synsets from wordnet
+    # TODO: Mine Ebola and medical terms from NELL - weak results so far
+    # Currently just opting for 'ebola'. More might not be worth it.
+    ebola_mention = 1 if 'ebola' in tweet_tokens else 0
+
+    ############################################
+    # Does the user have one of the three afflicted nations
+    # in its username?
+    ############################################
+    name_mentions_west_africa = 0
+    toks = user_name_uni.replace(',', ' ').replace('.', ' ').lower().split()
+    for country in ['liberia', 'guinea']:
+        if country in toks:
+            name_mentions_west_africa = 1
+    if user_name_uni.lower().find('sierra leone') > -1:
+        name_mentions_west_africa = 1
+
+    ############################################
+    # Was the tweet made by an account associated with the disaster?
+    # Define list based on a first pass that sees how many tweets
+    # related to the topic each user makes, choose a threshold.
+    # Define list based on known accounts, such as CDC, doctors
+    # without borders, etc.
+    ############################################
+
+    return gazetteer_labels, ebola_mention, name_mentions_west_africa
 
-    trie = marisa_trie.Trie(lines)
-    trie.save(filename + '.tr')
 
+def get_tweet_stats(tweet_epoch, body_uni, user_name_uni, gazetteers,
+                    tweet_tokens=None):
+    """
+    West Africa time is considered to be 0 to +1 UTC.
+    7AM to 11PM are taken as daylight hours.
+    :param int tweet_epoch: when the tweet was published, in epoch seconds
+    :param unicode body_uni: text of the tweet
+    :param unicode user_name_uni: full name of the user
+    :param GazetteerIndex gazetteers: from `load_gazetteers()`
+    :param list tweet_tokens: simpleTokenize(body_uni), if already computed
+    :return tuple:
+        (
+        count                    # 1
+        is_after_7AM,            # 0 or 1
+        west_africa_loc_mention, # 0 or 1
+        other_loc_mention,       # 0 or 1
+        crisislex_mention        # 0 or 1
+        ebola_mention            # 0 or 1
+        time_of_day_in_seconds   # int
+        name_mentions_w_africa   # 0 or 1
+        )
+    """
+    ############################################
+    # Is the tweet after 7 AM?
+    ############################################
+    time_in_seconds = seconds_of_day(tweet_epoch)
+    is_in_time = int(time_in_seconds >= UTC_7)
+
+    gazetteer_labels, ebola_mention, name_mentions_west_africa = get_text_features(
+        body_uni, user_name_uni, gazetteers, tweet_tokens)
+
+    return (1,
+            is_in_time,
+            int(bool(gazetteer_labels & WEST_AFRICA_PLACES)),
+            int(bool(gazetteer_labels & OTHER_PLACES)),
+            int(bool(gazetteer_labels & CRISISLEX)),
+            ebola_mention,
+            time_in_seconds,
+            name_mentions_west_africa)
+
+
+class TweetStatsBatch(object):
+    """
+    get_tweet_stats() for a batch of tweets, summed per user with NumPy.
+    The text features are found tweet by tweet; the time of day, the flags
+    and the per-user sums are computed for the whole batch at once, so a
+    mapper emits one row per user per batch instead of a tuple per tweet.
+    """
+    def __init__(self, gazetteers, size):
+        """
+        :param GazetteerIndex gazetteers: from `load_gazetteers()`
+        :param int size: tweets to buffer before they are summed
+        """
+        self.gazetteers = gazetteers
+        self.size = size
+        self._clear()
+
+    def _clear(self):
+        self.user_ids = {}
+        self.users = []
+        self.tweet_users = array('i')
+        self.epochs = array('l')
+        self.labels = array('i')
+        self.ebola_mentions = array('b')
+        self.name_mentions = array('b')
+
+    def __len__(self):
+        return len(self.tweet_users)
+
+    def add(self, user, tweet_epoch, body_uni, user_name_uni, tweet_tokens=None):
+        """
+        :param str user: the username
+        :param int tweet_epoch: when the tweet was published, in epoch seconds
+        :param unicode body_uni: text of the tweet
+        :param unicode user_name_uni: full name of the user
+        :param list tweet_tokens: simpleTokenize(body_uni), if already computed
+        :return list: `flush()` if the batch is now full, else nothing
+        """
+        gazetteer_labels, ebola_mention, name_mentions_west_africa = get_text_features(
+            body_uni, user_name_uni, self.gazetteers, tweet_tokens)
+        user_id = self.user_ids.get(user)
+        if user_id is None:
+            user_id = self.user_ids[user] = len(self.users)
+            self.users.append(user)
+        self.tweet_users.append(user_id)
+        self.epochs.append(tweet_epoch)
+        self.labels.append(gazetteer_labels)
+        self.ebola_mentions.append(ebola_mention)
+        self.name_mentions.append(name_mentions_west_africa)
+        if len(self.tweet_users) >= self.size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """
+        :return list: (user, stats) for each user in the batch, where stats
+            sums `get_tweet_stats()` over the user's tweets; the batch is
+            emptied
+        """
+        if not self.tweet_users:
+            return []
+        tweet_users = np.frombuffer(self.tweet_users, dtype=np.intc)
+        seconds = np.frombuffer(self.epochs, dtype=np.int_) % SECONDS_PER_DAY
+        labels = np.frombuffer(self.labels, dtype=np.intc)
+
+        # One row per field of get_tweet_stats(), one column per tweet
+        stats = np.empty((8, len(tweet_users)), dtype=np.int64)
+        stats[0] = 1
+        stats[1] = seconds >= UTC_7
+        stats[2] = (labels & WEST_AFRICA_PLACES) != 0
+        stats[3] = (labels & OTHER_PLACES) != 0
+        stats[4] = (labels & CRISISLEX) != 0
+        stats[5] = np.frombuffer(self.ebola_mentions, dtype=np.int8)
+        stats[6] = seconds
+        stats[7] = np.frombuffer(self.name_mentions, dtype=np.int8)
+
+        # Sum the columns of each user's run of tweets
+        order = np.argsort(tweet_users, kind='mergesort')
+        sorted_users = tweet_users[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_users[1:] != sorted_users[:-1])))
+        sums = np.add.reduceat(stats[:, order], starts, axis=1)
+
+        users = self.users
+        rows = [(users[user_id], list(user_stats))
+                for user_id, user_stats in zip(sorted_users[starts].tolist(), sums.T.tolist())]
+        self._clear()
+        return rows
+
+
+class UserStatsSums(object):
+    """
+    Per-user sums of `get_tweet_stats()` rows, held in the mapper until
+    flushed.
+    """
+    def __init__(self):
+        self.sums = {}
+
+    def __len__(self):
+        return len(self.sums)
 
-def load_trie_from_pickle_file(filename):
-    trie = marisa_trie.Trie()
-    trie.load(filename)
-    return trie
+    def add(self, user, stats):
+        """
+        :param str user: the username
+        :param stats: `get_tweet_stats()` of one tweet, or sums of several
+        """
+        sums = self.sums.get(user)
+        if sums is None:
+            self.sums[user] = list(stats)
+        else:
+            for i, x in enumerate(stats):
+                sums[i] += x
+
+    def flush(self):
+        """
+        :return list: (user, sums) for each user; the sums are emptied
+        """
+        sums, self.sums = self.sums, {}
+        return sums.items()
 
 
-def any_word_subsequence_in_trie(tweet_tokens, trie):
+def user_stats_lines(user, tuples_over_file):
     """
-    :param list|tuple tweet_tokens: tokenized tweet
-    :param marisa_trie.Trie: trie
-    :return bool: True if some subset of the tweet's words are in trie, else False
+    Sum per-file stats for a user, swap mean time of day for total time,
+    and format the user as a csv line if they pass the thresholds.
+    :param str user: The user who made the tweets
+    :param tuples_over_file: per-file sums of `get_tweet_stats()` tuples
+    :return list: csv lines; one for each threshold the user passes
     """
-    if len(tweet_tokens) == 0:
-        return False
-    cur_uni = tweet_tokens[-1]
-    if len(trie.prefixes(cur_uni)) > 0:
-        return True
-    for i in xrange(len(tweet_tokens) - 2, -1, -1):
-        cur_uni = tweet_tokens[i] + ' ' + cur_uni
-        if len(trie.prefixes(cur_uni)) > 0:
-            return True
-    return False
-
-
-class MRTwitterWestAfricaUsers(MRJob):
+    tuples_over_files = map(sum, zip(*tuples_over_file))
+
+    # Swap mean time for total time
+    count, is_in_time, west_africa_mention, other_place_mention, crisislex_mention, ebola_mention, total_time, name_mentions_west_africa = tuples_over_files
+    mean_time = 1. * total_time / count
+    tuples_over_files = count, is_in_time, west_africa_mention, other_place_mention, crisislex_mention, ebola_mention, mean_time, name_mentions_west_africa
+
+    lines = []
+    # Yield users whose names include West African Countries most of the time.
+    if 1. * name_mentions_west_africa / count > 0.5:
+        lines.append(user+','+','.join([str(x) for x in tuples_over_files]))
+
+    # Yield users with at least 10 tweets
+    # who mention West African locations at least three times
+    if count > 9 and west_africa_mention > 3:
+        lines.append(user+','+','.join([str(x) for x in tuples_over_files]))
+    return lines
+
+
+class MRTwitterWestAfricaUsers(MRTrecJob):
     """
     <Temporary empty docstring>
     """
-    # INPUT_PROTOCOL = protocol.RawValueProtocol  # Custom parse tab-delimited values
-    INTERNAL_PROTOCOL = PickleProtocol  # protocol.RawValueProtocol  # Serialize messages internally
+    INTERNAL_PROTOCOL = PickleProtocol  # Serialize tweets internally; stats go as varints (see pick_protocols)
     OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
+    DATE_RANGE = EBOLA_DATE_RANGE  # Only read files from February - November 2014
+    MAX_BUFFERED_USERS = 100000  # Users whose stats a --one-step mapper holds before handing them on
 
     def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
+        """Configure the gazetteer tries."""
         super(MRTwitterWestAfricaUsers, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
         self.add_file_option('--west-africa-places',
-                             default='only_west_africa.csv.tr',
-                             help='path to pickled trie of west african places')
+                             default='only_west_africa.csv.idx',
+                             help='path to gazetteer index of west african places; see gazetteer.compiler')
         self.add_file_option('--other-places',
-                             default='only_other_places.csv.tr',
-                             help='path to pickled trie of non-west african places')
+                             default='only_other_places.csv.idx',
+                             help='path to gazetteer index of non-west african places; see gazetteer.compiler')
         self.add_file_option('--crisislex',
-                             default='CrisisLexRec.csv.tr',
-                             help='path to pickled trie of crisislex terms')
+                             default='CrisisLexRec.csv.idx',
+                             help='path to gazetteer index of crisislex terms; see gazetteer.compiler')
+        self.add_passthrough_option('--stats-batch-size', type='int', default=10000,
+                                    help='tweets per batch when summing per-user stats in the mapper '
+                                         '(default: 10000; 0 for a row per tweet)')
+        self.add_passthrough_option('--one-step', action='store_true', default=False,
+                                    help='sum per-user stats in the mapper that reads the files, so the '
+                                         'shuffle carries integer rows instead of tweets')
+
+    def pick_protocols(self, step_num, step_type):
+        """
+        The last step, the only one with --one-step, shuffles per-user
+        stats, which are serialized as varints; the first of two steps
+        shuffles tweets, which stay pickled.
+        """
+        p_read, p_write = self._pick_protocol_instances(step_num, step_type)
+        if step_num == len(self.steps()) - 1:
+            if step_type in ('combiner', 'reducer'):
+                p_read = VarintProtocol()
+            if step_type in ('mapper', 'combiner'):
+                p_write = VarintProtocol()
+        return p_read.read, p_write.write
 
     def steps(self):
         """
         :return list: The steps to be followed for the job
         """
+        if self.options.one_step:
+            return [
+                # Load files and sum per-user stats as the tweets are read
+                MRStep(
+                    mapper_init=self.mapper_one_step_init,
+                    mapper=self.mapper_one_step,
+                    mapper_final=self.mapper_one_step_final,
+                    combiner=self.combiner_agg_stats_within_files,
+                    reducer=self.reducer_agg_stats_across_files)
+            ]
         return [
             # Load files, getting tweets in date range
             # MRStep(
@@ -118,11 +370,13 @@ class MRTwitterWestAfricaUsers(MRJob):
             # Load files, getting tweets keyed to users
             MRStep(
                 mapper_init=self.mapper_get_tweets_init,
-                mapper=self.mapper_get_tweets_per_user_in_date_range_from_files),
+                mapper=self.mapper_get_tweets_per_user_in_date_range_from_files,
+                mapper_final=self.mapper_get_tweets_final),
             # Get per-file stats
             MRStep(
                 mapper_init=self.mapper_get_user_init,
                 mapper=self.mapper_get_user_stats_from_tweets,
+                mapper_final=self.mapper_get_user_stats_final,
                 combiner=self.combiner_agg_stats_within_files,
                 reducer=self.reducer_agg_stats_across_files)
         ]
@@ -137,15 +391,11 @@ class MRTwitterWestAfricaUsers(MRJob):
         self.logger = logging.getLogger(__name__)
         self.increment_counter('wa1', 'file_date_invalid', 0)
         self.increment_counter('wa1', 'file_date_valid', 0)
-        self.increment_counter('wa1', 'file_data_bad', 0)
         self.increment_counter('wa1', 'tweet_date_valid', 0)
         self.increment_counter('wa1', 'tweet_date_invalid', 0)
         self.increment_counter('wa1', 'spam_count', 0)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
         self.naive_feb_2014 = dateutil.parser.parse('2014-02-01')
         self.naive_dec_2014 = dateutil.parser.parse('2014-12-01')
@@ -164,8 +414,7 @@ class MRTwitterWestAfricaUsers(MRJob):
         :param str|unicode line: pseudo-tab separated date, size amd file path
         :return tuple: user as key, language, post time, and body as tuple
         """
-        cur_line = line.strip()
-        aws_prefix, aws_path = cur_line.split('//')
+        aws_path = aws_path_from_line(line)
         file_date = dateutil.parser.parse(aws_path.split('/')[-2])
 
         file_date_okay = False
@@ -183,51 +432,30 @@ class MRTwitterWestAfricaUsers(MRJob):
             return
 
         self.increment_counter('wa1', 'file_date_valid', 1)
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
-        resp = requests.get(url)
-
-        data = resp.content
-        if data is None:
-            self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(self.options.gpg_private))
-            self.increment_counter('wa1', 'missing_key', 1)
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
+    def mapper_get_tweets_final(self):
+        """Analyze the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
 
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
-        for entry in reader:
-            # entries have other info, see other info here:
-            # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
-            #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
+    def mapper_feed_entries(self, entries):
+        """
+        Yields in-range, non-spam tweets keyed by user.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: user as key, language, post time, and body as tuple
+        """
+        for entry in entries:
             tweet = entry.feed_entry
 
-            tweet_time = dateutil.parser.parse(tweet.last_published)
-            tweet_time_okay = False
             try:
-                tweet_time_okay = self.feb_2014 <= tweet_time < self.dec_2014
-            except TypeError:
-                # Assume that this is caused by naive date times
-                try:
-                    tweet_time_okay = self.naive_feb_2014 <= tweet_time < self.naive_dec_2014
-                except:
-                    self.increment_counter('wa1', 'tweet_date_exception', 1)
-
-            if not tweet_time_okay:
+                tweet_epoch = epoch_from_timestamp(tweet.last_published)
+            except ValueError:
+                self.increment_counter('wa1', 'tweet_date_exception', 1)
+                continue
+
+            if not FEB_2014 <= tweet_epoch < DEC_2014:
                 self.increment_counter('wa1', 'tweet_date_invalid', 1)
-                self.logger.debug('Bad time:{}'.format(tweet_time))
+                self.logger.debug('Bad time:{}'.format(tweet.last_published))
                 continue
             self.increment_counter('wa1', 'tweet_date_valid', 1)
 
@@ -236,8 +464,7 @@ class MRTwitterWestAfricaUsers(MRJob):
                 continue
 
             try:
-                user_link = tweet.author[0].link[0].href
-                user_scrn_uni = urlparse.urlsplit(user_link).path.split('@')[1].lower()
+                user_scrn_encoded = author_screen_name(tweet)
                 user_name_scrn_uni = tweet.author[0].name
                 user_name_uni = ''.join(user_name_scrn_uni.split(' (')[1:])[:-1].lower()
                 # user_scrn_uni = user_name_scrn_uni.split(' (')[0]
@@ -245,7 +472,7 @@ class MRTwitterWestAfricaUsers(MRJob):
                 body_uni = tweet.title
                 lang = tweet.lang[0].code
 
-                yield (user_scrn_uni.encode('utf8'), (tweet_time, body_uni, user_name_uni, lang))
+                yield (user_scrn_encoded, (tweet_epoch, body_uni, user_name_uni, lang))
 
             except:
                 self.increment_counter('wa1', 'other_exception', 1)
@@ -261,20 +488,24 @@ class MRTwitterWestAfricaUsers(MRJob):
         self.increment_counter('wa1', 'line_invalid', 0)
         self.increment_counter('wa1', 'line_valid', 0)
 
-        self.utc_7 = datetime.time(7, 0, 0)
-
-        self.west_africa_places = load_trie_from_pickle_file(self.options.west_africa_places)
-        self.other_places = load_trie_from_pickle_file(self.options.other_places)
+        self.tokenizer_init()
 
-        self.crisislex_grams = load_trie_from_pickle_file(self.options.crisislex)
+        self.gazetteers = load_gazetteers(self.options.west_africa_places,
+                                          self.options.other_places,
+                                          self.options.crisislex)
+        self.stats_batch = None
+        if self.options.stats_batch_size > 0:
+            self.stats_batch = TweetStatsBatch(self.gazetteers, self.options.stats_batch_size)
 
     def mapper_get_user_stats_from_tweets(self, user, tweet_tuple):
         """
         Discards tweets before February 2014 and after November 2014.
         West Africa time is considered to be 0 to +1 UTC.
         7AM to 11PM are taken as daylight hours.
+        With --stats-batch-size, tweets are buffered and each user's stats
+        are yielded summed once the batch is full (see TweetStatsBatch).
         :param str|unicode user: the username
-        :param tuple tweet_tuple: time, body, full user name, and language
+        :param tuple tweet_tuple: epoch time, body, full user name, and language
         :return tuple:
             username,
                 (
@@ -289,7 +520,7 @@ class MRTwitterWestAfricaUsers(MRJob):
                 )
         """
         try:
-            tweet_time, body_uni, user_name_uni, lang = tweet_tuple
+            tweet_epoch, body_uni, user_name_uni, lang = tweet_tuple
         except ValueError:
             self.increment_counter('wa1', 'line_invalid', 1)
             self.logger.debug('Got ValueError:{}'.format(tweet_tuple))
@@ -297,83 +528,60 @@ class MRTwitterWestAfricaUsers(MRJob):
 
         self.increment_counter('wa1', 'line_valid', 1)
 
-        ###
-        # Meta-data features
-        ###
-
-        ############################################
-        # Is the tweet after 7 AM?
-        ############################################
+        tweet_tokens = self.tokenize(body_uni)
+        if self.stats_batch is not None:
+            for user_stats in self.stats_batch.add(user, tweet_epoch, body_uni, user_name_uni, tweet_tokens):
+                yield user_stats
+            return
 
-        is_in_time = int(datetime.time(tweet_time.hour,
-                                       tweet_time.minute,
-                                       tweet_time.second) >= self.utc_7)
+        yield user, get_tweet_stats(tweet_epoch, body_uni, user_name_uni, self.gazetteers,
+                                    tweet_tokens=tweet_tokens)
 
-        ###
-        # Text Features
-        ###
+    def mapper_get_user_stats_final(self):
+        """Sum the stats of the tweets still in the batch, and count the token cache's hits."""
+        if self.stats_batch is not None:
+            for user_stats in self.stats_batch.flush():
+                yield user_stats
+        self.report_token_cache()
 
-        # tokenize tweet
-        tweet_tokens = simpleTokenize(body_uni)
-        # mentions = [tok[1:] for tok in tokens if len(tok) > 1 and tok[0] == '@']
-
-        ############################################
-        # Does the tweet mention places in west africa?
-        ############################################
-        west_africa_mention = \
-            int(any_word_subsequence_in_trie(tweet_tokens,
-                                             self.west_africa_places))
-
-        other_place_mention = \
-            int(any_word_subsequence_in_trie(tweet_tokens,
-                                             self.other_places))
-
-        ############################################
-        # Does the tweet mention keywords or topics related to medicine/Ebola?
-        ############################################
-        # TODO: Mine Ebola and medical synsets from wordnet
-        # TODO: Mine Ebola and medical terms from NELL - weak results so far
-        # Currently just opting for 'ebola'. More might not be worth it.
-        ebola_mention = 1 if 'ebola' in tweet_tokens else 0
-
-        ############################################
-        # Does the tweet contain keywords related to CrisisLex disasters
-        ############################################
-        crisislex_mention = \
-            int(any_word_subsequence_in_trie(tweet_tokens,
-                                             self.crisislex_grams))
-
-        ############################################
-        # Does the user have one of the three afflicted nations
-        # in its username?
-        ############################################
-        name_mentions_west_africa = 0
-        toks = user_name_uni.replace(',', ' ').replace('.', ' ').lower().split()
-        for country in ['liberia', 'guinea']:
-            if country in toks:
-                name_mentions_west_africa = 1
-        if user_name_uni.lower().find('sierra leone') > -1:
-            name_mentions_west_africa = 1
+    def mapper_one_step_init(self):
+        """Set up both steps' mappers, and the per-user sums"""
+        self.mapper_get_tweets_init()
+        self.mapper_get_user_init()
+        self.user_stats = UserStatsSums()
 
-        ############################################
-        # Was the tweet made by an account associated with the disaster?
-        # Define list based on a first pass that sees how many tweets
-        # related to the topic each user makes, choose a threshold.
-        # Define list based on known accounts, such as CDC, doctors
-        # without borders, etc.
-        ############################################
-
-        ############################################
-        # return result
-        ############################################
-        yield user, (1,
-                     is_in_time,
-                     west_africa_mention,
-                     other_place_mention,
-                     crisislex_mention,
-                     ebola_mention,
-                     tweet_time.hour * 3600 + tweet_time.minute * 60 + tweet_time.second,
-                     name_mentions_west_africa)
+    def mapper_one_step(self, _, line):
+        """
+        Reads a file as the first step's mapper does, and sums the stats of
+        its tweets as the second step's mapper does. Sums are only yielded
+        when the mapper holds too many users.
+        :param _: the line number in the file listing the buckets (ignored)
+        :param str|unicode line: pseudo-tab separated date, size amd file path
+        :return tuple: username, summed stats
+        """
+        tweets = self.mapper_get_tweets_per_user_in_date_range_from_files(_, line)
+        return self.mapper_sum_user_stats(tweets or ())
+
+    def mapper_one_step_final(self):
+        """Sum the files still being prefetched and the batch, then hand on the sums."""
+        for user_stats in self.mapper_sum_user_stats(self.mapper_get_tweets_final()):
+            yield user_stats
+        for user, stats in self.mapper_get_user_stats_final():
+            self.user_stats.add(user, stats)
+        for user_stats in self.user_stats.flush():
+            yield user_stats
+
+    def mapper_sum_user_stats(self, tweets):
+        """
+        :param tweets: (user, tweet tuple) from the first step's mapper
+        :return tuple: username, summed stats
+        """
+        for user, tweet_tuple in tweets:
+            for user, stats in self.mapper_get_user_stats_from_tweets(user, tweet_tuple):
+                self.user_stats.add(user, stats)
+            if len(self.user_stats) >= self.MAX_BUFFERED_USERS:
+                for user_stats in self.user_stats.flush():
+                    yield user_stats
 
     def combiner_agg_stats_within_files(self, user, tweet_tuples):
         """
@@ -398,28 +606,13 @@ class MRTwitterWestAfricaUsers(MRJob):
         :param tuple tuples_over_file:
         :return tuple:
         """
-        tuples_over_files = map(sum, zip(*tuples_over_file))
-
-        # Swap mean time for total time
-        count, is_in_time, west_africa_mention, other_place_mention, crisislex_mention, ebola_mention, total_time, name_mentions_west_africa = tuples_over_files
-        mean_time = 1. * total_time / count
-        tuples_over_files = count, is_in_time, west_africa_mention, other_place_mention, crisislex_mention, ebola_mention, mean_time, name_mentions_west_africa
-
-        # Yield users whose names include West African Countries most of the time.
-        if 1. * name_mentions_west_africa / count > 0.5:
-            yield None, user+','+','.join([str(x) for x in tuples_over_files])
-
-        # Yield users with at least 10 tweets
-        # who mention West African locations at least three times
-        if count > 9 and west_africa_mention > 3:
-            yield None, user+','+','.join([str(x) for x in tuples_over_files])
+        for line in user_stats_lines(user, tuples_over_file):
+            yield None, line
 
 
 if __name__ == '__main__':
-    # Set up tries
-    # for fname in ['only_west_africa.csv', 'only_other_places.csv', 'CrisisLexRec.csv']:
-    #    if not os.path.exists(fname + '.tr'):
-    #        write_gazetteer_to_trie_pickle_file(fname)
+    # Build the gazetteer indexes first:
+    #   python -m gazetteer.compiler only_west_africa.csv only_other_places.csv CrisisLexRec.csv
 
     # Start Map Reduce Job
     MRTwitterWestAfricaUsers.run()
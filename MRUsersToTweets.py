@@ -10,42 +10,127 @@ ebola crisis.
 
 This program filters a corpus of Tweets for ones made by someone on a list of Twitter User IDs. 
 
+Matching entries are partitioned by the UTC day they were published and a
+bucket of their author's screen name, and each reducer call writes one
+partition to `<tweets-dir>/<YYYY-MM-DD>/users-<bucket>.xz` as a record file
+of serialized spinn3rApi_pb2.Entry messages (see trec_ingest/records.py).
+The output lists the partitions, one per line: day, bucket, count and path.
+Read one back with
+    for buf in RecordFileReader(path):
+        entry = Entry.FromString(buf)
+
+--tweets-dir is required. On EMR it must be an s3:// URI: reducers run on
+different task nodes, so each writes its partition to a local temporary
+directory and uploads the record file and then its index with boto. A
+local absolute path only works when every task runs on one host, or the
+path is on a filesystem all nodes share.
 """
+import errno
 import logging
 import os
-from cStringIO import StringIO
-
-from mrjob.job import MRJob
+import posixpath
+import shutil
+import tempfile
+import zlib
+
+import boto
+from mrjob.parse import is_s3_uri
+from mrjob.parse import parse_s3_uri
+from mrjob.protocol import PickleProtocol
 from mrjob.protocol import RawValueProtocol
-import requests
-import sys
-from urllib2 import urlparse
 
 # ingest imports
-from streamcorpus import decrypt_and_uncompress
-from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+from trec_ingest import MRTrecJob
+from trec_ingest import aws_path_from_line
+from trec_ingest.authors import author_screen_name
+from trec_ingest.records import INDEX_SUFFIX
+from trec_ingest.records import RECORDS_SUFFIX
+from trec_ingest.records import RecordFileWriter
+from trec_ingest.registry import UserRegistry
+from trec_ingest.store import day_from_epoch
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+USER_BUCKETS = 16
+
+
+def user_bucket(user_scrn_encoded, n_buckets=USER_BUCKETS):
+    """
+    :param str user_scrn_encoded: lowercased screen name, utf8
+    :param int n_buckets: number of buckets
+    :return int: the name's bucket; the same in every process
+    """
+    return (zlib.crc32(user_scrn_encoded) & 0xffffffff) % n_buckets
+
+
+def partition_path(tweets_dir, day, bucket):
+    """
+    :param str tweets_dir: root of the output; a local path or an s3:// URI
+    :param str day: YYYY-MM-DD
+    :param int bucket: bucket of the authors' screen names
+    :return str: path of the partition's record file, without RECORDS_SUFFIX
+    """
+    join = posixpath.join if is_s3_uri(tweets_dir) else os.path.join
+    return join(tweets_dir, day, 'users-{:03d}'.format(bucket))
+
+
+def write_record_file(path, records):
+    """
+    :param str path: path of the record file, without RECORDS_SUFFIX
+    :param records: generator of str records
+    :return int: number of records written
+    """
+    writer = RecordFileWriter(path)
+    for record in records:
+        writer.append(record)
+    return writer.close()
 
-import cbor
-from backports import lzma
 
-class MRUsersToTweets(MRJob):
+def upload_record_file(path, s3_uri):
+    """
+    Copy a record file to s3, the index last, so that a partition whose
+    index is there is complete.
+    :param str path: local record file, without RECORDS_SUFFIX
+    :param str s3_uri: where it goes, without RECORDS_SUFFIX
+    """
+    bucket_name, key_name = parse_s3_uri(s3_uri)
+    bucket = boto.connect_s3().get_bucket(bucket_name, validate=False)
+    for suffix in (RECORDS_SUFFIX, INDEX_SUFFIX):
+        bucket.new_key(key_name + suffix).set_contents_from_filename(path + suffix)
+
+
+class MRUsersToTweets(MRTrecJob):
     """
     This program filters a corpus of Tweets for ones made by someone on a list of Twitter User IDs. 
+    Mappers key each matching entry by (day, bucket); each reducer call
+    streams one partition to its record file.
     """
-    OUTPUT_PROTOCOL = RawValueProtocol  # Output as csv
+    INTERNAL_PROTOCOL = PickleProtocol  # Serialize messages internally
+    OUTPUT_PROTOCOL = RawValueProtocol  # Output as partition list
+    FULL_ENTRIES = True  # Writes serialized entries
 
     def configure_options(self):
-        """
-        Configure default options needed by all jobs.
-        Each job _must_have_ a copy of the key to decrypt the tweets.
-        """
+        """Configure the list of desired users."""
         super(MRUsersToTweets, self).configure_options()
-        self.add_file_option('--gpg-private',
-                             default='trec-kba-2013-centralized.gpg-key.private',
-                             help='path to gpg private key for decrypting the data')
         self.add_file_option('--desired-users',
                 default='seed_usernames.csv',
-                help='path to list of desired usernames.')
+                help='path to user registry (.tr) or list of desired usernames; see trec_ingest.registry')
+        self.add_passthrough_option('--tweets-dir',
+                                    default=None,
+                                    help='s3:// URI of the directory to write the partitions to, or an '
+                                         'absolute path on a filesystem every task node shares (required)')
+        self.add_passthrough_option('--user-buckets', type='int', default=USER_BUCKETS,
+                                    help='buckets to partition each day by, on the screen name '
+                                         '(default: {})'.format(USER_BUCKETS))
+
+    def load_options(self, args):
+        """Tasks don't run in the launch directory, so the output needs a full path or s3 URI."""
+        super(MRUsersToTweets, self).load_options(args)
+        tweets_dir = self.options.tweets_dir
+        if not tweets_dir or not (is_s3_uri(tweets_dir) or os.path.isabs(tweets_dir)):
+            self.option_parser.error('--tweets-dir must be an s3:// URI or an absolute path')
+        if self.options.user_buckets < 1:
+            self.option_parser.error('--user-buckets must be at least 1')
 
     def mapper_init(self):
         """Set up a logger and initialize counters"""
@@ -55,21 +140,12 @@ class MRUsersToTweets(MRJob):
                             filename='./mrtwa.log',
                             filemode='w')
         self.logger = logging.getLogger(__name__)
-        self.increment_counter('wa1', 'file_data_bad', 0)
-        self.increment_counter('wa1', 'missing_key', 0)
         self.increment_counter('wa1', 'matched', 0)
         self.increment_counter('wa1', 'not_matched', 0)
         
-        self.users = set()
-        with open(self.options.desired_users) as f:
-            for user in f:
-                # Add lowercased, stripped users to set
-                self.users.add(user.strip().lower())
+        self.users = UserRegistry(self.options.desired_users)
 
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(
-                self.options.gpg_private))
-            sys.exit(1)
+        self.ingest_init()
 
     def mapper(self, _, line):
         """
@@ -80,43 +156,24 @@ class MRUsersToTweets(MRJob):
         
         :param _: the line number in the file listing the buckets (ignored)
         :param str|unicode line: pseudo-tab separated date, size amd file path
-        :return tuple: tweet ID as key, empty body
+        :return tuple: (day, bucket), serialized entry
 
         """
-        cur_line = line.strip()
-        aws_prefix, aws_path = cur_line.split('//')
+        aws_path = aws_path_from_line(line)
+        return self.mapper_feed_entries(self.feed_entries(aws_path))
 
-        url = os.path.join('http://s3.amazonaws.com', aws_path)
-        try:
-            resp = requests.get(url)
-        except Exception as e:
-            self.increment_counter('resp_exception', type(e).__name__, 1)
-            return
-
-        data = resp.content
-        if data is None:
-            self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        if not os.path.exists(self.options.gpg_private):
-            self.logger.info('Cannot locate key: {}'.format(self.options.gpg_private))
-            self.increment_counter('wa1', 'missing_key', 1)
-            return
-
-        errors, data = decrypt_and_uncompress(data, self.options.gpg_private)
-
-        if errors:
-            self.logger.info('\n'.join(errors))
-        if data is None:
-            self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
-            self.increment_counter('wa1', 'file_data_bad', 1)
-            return
-
-        f = StringIO(data)
-        reader = ProtoStreamReader(f)
+    def mapper_final(self):
+        """Analyze the files still being prefetched when the input ran out."""
+        return self.mapper_feed_entries(self.drain_feed_entries())
+
+    def mapper_feed_entries(self, entries):
+        """
+        Yields entries made by desired users, keyed by their partition.
+        :param entries: feed entries from one or more chunk files
+        :return tuple: (day, bucket), serialized entry
+        """
         try:
-            for entry in reader:
+            for entry in entries:
                 # entries have other info, see other info here:
                 # https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
                 #       streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
@@ -128,9 +185,7 @@ class MRUsersToTweets(MRJob):
 
                     # Extract username from the Twitter author UR
 
-                    user_link = tweet.author[0].link[0].href
-                    user_scrn_uni = urlparse.urlsplit(user_link).path.split('@')[1].lower()
-                    user_scrn_encoded = user_scrn_uni.encode('utf8')
+                    user_scrn_encoded = author_screen_name(tweet)
 
                     if user_scrn_encoded not in self.users:
                         self.increment_counter('wa1', 'not_matched', 1)
@@ -138,8 +193,9 @@ class MRUsersToTweets(MRJob):
 
                     self.increment_counter('wa1', 'matched', 1)
 
-                    # yield the identifier
-                    yield None, str(entry)
+                    day = day_from_epoch(epoch_from_timestamp(tweet.last_published))
+                    bucket = user_bucket(user_scrn_encoded, self.options.user_buckets)
+                    yield (day, bucket), entry.SerializeToString()
 
                 except Exception as e:
                     self.increment_counter('entry_exception', type(e).__name__, 1)
@@ -147,23 +203,31 @@ class MRUsersToTweets(MRJob):
         except Exception as e:
             self.increment_counter('file_exception', type(e).__name__, 1)
 
-    def combiner(self, _, entries):
-        """
-        Combine entries within a file
-        :param _:
-        :param entries: str(entry) generator
-        :return:
-        """
-        yield None, ''.join(entries)
-
-    def reducer(self, _, file_entries):
+    def reducer(self, partition, entries):
         """
-        Combine entries within a file
-        :param _:
-        :param file_entries: joined entries generator
-        :return:
+        :param tuple partition: YYYY-MM-DD, bucket of the authors' screen names
+        :param entries: generator of the partition's serialized entries
+        :return tuple: None, tab-separated day, bucket, count and path of the record file
         """
-        yield None, lzma.compress(cbor.dumps(''.join(file_entries)))
+        day, bucket = partition
+        path = partition_path(self.options.tweets_dir, day, bucket)
+        if is_s3_uri(path):
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                local_path = os.path.join(tmp_dir, os.path.basename(path))
+                count = write_record_file(local_path, entries)
+                upload_record_file(local_path, path)
+            finally:
+                shutil.rmtree(tmp_dir)
+        else:
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            count = write_record_file(path, entries)
+        self.increment_counter('wa1', 'partitions_written', 1)
+        yield None, '\t'.join([day, str(bucket), str(count), path + RECORDS_SUFFIX])
 
 if __name__ == '__main__':
     # Set up tries
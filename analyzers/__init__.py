@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Analyzer plugins for MRTrecAnalyzers, which decodes the corpus once and
+hands every tweet to each analyzer. Importing this package registers the
+built-in analyzers; new ones subclass Analyzer and use @register_analyzer.
+"""
+from analyzers.base import ANALYZERS
+from analyzers.base import Analyzer
+from analyzers.base import register_analyzer
+from analyzers.tweet import ParsedTweet
+import analyzers.builtin
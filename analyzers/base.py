@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Plugin interface for MRTrecAnalyzers.
+
+An analyzer is one of the per-tweet analyses that used to be its own MRJob.
+It gets each non-spam tweet as a ParsedTweet, yields (key, value) pairs,
+and turns the values for a key into output lines. MRTrecAnalyzers prefixes
+keys and output lines with the analyzer's name, so each analyzer has its own
+namespace in the shuffle and in the output.
+"""
+
+
+ANALYZERS = {}
+
+
+def register_analyzer(cls):
+    """
+    Class decorator adding an Analyzer subclass to MRTrecAnalyzers.
+    :param type cls: Analyzer subclass with a unique `name`
+    :return type: cls
+    """
+    if cls.name in ANALYZERS:
+        raise ValueError('Analyzer {} is already registered'.format(cls.name))
+    ANALYZERS[cls.name] = cls
+    return cls
+
+
+class Analyzer(object):
+    """
+    Subclasses set `name`, and override `map_tweet` and `reduce`. Those
+    that need the whole entry of a tweet, not just the fields a tweet store
+    keeps, set `full_entries`.
+    """
+    name = None
+    full_entries = False
+
+    def __init__(self, job):
+        """
+        Cheap setup only; this also runs in combiners and reducers.
+        :param MRTrecAnalyzers job: the running job
+        """
+        self.job = job
+        self.options = job.options
+
+    @classmethod
+    def configure_options(cls, job):
+        """
+        Add the analyzer's options to the job.
+        :param MRTrecAnalyzers job: the job being configured
+        """
+        pass
+
+    def mapper_init(self):
+        """Load whatever `map_tweet` needs."""
+        pass
+
+    def increment_counter(self, counter, amount=1):
+        self.job.increment_counter(self.name, counter, amount)
+
+    def map_tweet(self, tweet):
+        """
+        :param ParsedTweet tweet: a non-spam tweet
+        :return generator: key, value pairs
+        """
+        return ()
+
+    def map_final(self):
+        """
+        :return generator: key, value pairs left over once the input is done
+        """
+        return ()
+
+    def combine(self, key, values):
+        """
+        Combine values within a mapper. Passes them through by default.
+        :param str key: key yielded by `map_tweet`
+        :param values: generator of values for the key
+        :return generator: key, value pairs
+        """
+        for value in values:
+            yield key, value
+
+    def reduce(self, key, values):
+        """
+        :param str key: key yielded by `map_tweet`
+        :param values: generator of values for the key
+        :return generator: output lines
+        """
+        return ()
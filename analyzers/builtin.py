@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+The analyses of the standalone MR*.py jobs, as analyzers for MRTrecAnalyzers.
+Each one reuses its job's helpers, so the output lines match the job's.
+"""
+import base64
+import zlib
+
+from analyzers.base import Analyzer
+from analyzers.base import register_analyzer
+
+from MRGetTweetGraph import MIN_BIDIRECTIONAL_WEIGHT
+from MRGetTweetGraph import get_mentions
+from MRGetTweetGraph import get_tweet_edges
+from MRGetUsersUsingKeywords import get_keyword_counts
+from MRGetUsersUsingKeywords import keyword_counts_line
+from MRGetUsersUsingKeywords import keyword_index
+from MRGetUsersUsingKeywords import load_keywords
+from MRGetUsersUsingKeywords import merge_keyword_counts
+from MRSaloneMentions import mentions_salone
+from MRTwitterWestAfricaUsers import get_tweet_stats
+from MRTwitterWestAfricaUsers import load_gazetteers
+from MRTwitterWestAfricaUsers import user_stats_lines
+from trec_ingest.registry import UserRegistry
+
+
+def sum_values(key, values):
+    """Combiner summing equal-length tuples of counts."""
+    yield key, map(sum, zip(*values))
+
+
+@register_analyzer
+class WestAfricaUsers(Analyzer):
+    """Per-user West Africa stats; see MRTwitterWestAfricaUsers."""
+    name = 'west_africa_users'
+
+    @classmethod
+    def configure_options(cls, job):
+        job.add_file_option('--west-africa-places',
+                            default='only_west_africa.csv.idx',
+                            help='path to gazetteer index of west african places; see gazetteer.compiler')
+        job.add_file_option('--other-places',
+                            default='only_other_places.csv.idx',
+                            help='path to gazetteer index of non-west african places; see gazetteer.compiler')
+        job.add_file_option('--crisislex',
+                            default='CrisisLexRec.csv.idx',
+                            help='path to gazetteer index of crisislex terms; see gazetteer.compiler')
+
+    def mapper_init(self):
+        self.increment_counter('tweet_date_valid', 0)
+        self.increment_counter('tweet_date_invalid', 0)
+        self.gazetteers = load_gazetteers(self.options.west_africa_places,
+                                          self.options.other_places,
+                                          self.options.crisislex)
+
+    def map_tweet(self, tweet):
+        if not tweet.in_date_range:
+            self.increment_counter('tweet_date_invalid')
+            return
+        self.increment_counter('tweet_date_valid')
+
+        yield tweet.encoded_screen_name, get_tweet_stats(tweet.published,
+                                                         tweet.tweet.title,
+                                                         tweet.user_name,
+                                                         self.gazetteers,
+                                                         tweet_tokens=tweet.tokens)
+
+    combine = staticmethod(sum_values)
+
+    def reduce(self, user, tuples_over_file):
+        return user_stats_lines(user, tuples_over_file)
+
+
+@register_analyzer
+class MentionGraph(Analyzer):
+    """Edges between known users and the users they mention; see MRGetTweetGraph."""
+    name = 'mention_graph'
+
+    @classmethod
+    def configure_options(cls, job):
+        job.add_file_option('--graph-users',
+                            default='usernames.csv.tr',
+                            help='path to user registry (.tr) or list of known usernames for the mention graph; '
+                                 'the same default as MRGetTweetGraph --desired-users')
+
+    def mapper_init(self):
+        self.increment_counter('no_mentions', 0)
+        self.increment_counter('has_mentions', 0)
+        self.username_set = UserRegistry(self.options.graph_users)
+
+    def map_tweet(self, tweet):
+        mentions_uni = get_mentions(tweet.tweet.title)
+        if len(mentions_uni) == 0:
+            self.increment_counter('no_mentions')
+            return
+        self.increment_counter('has_mentions')
+
+        for edge in get_tweet_edges(tweet.screen_name, mentions_uni, self.username_set):
+            yield edge
+
+    # Only the reducer sees an edge's total weight, so only it may threshold.
+    combine = staticmethod(sum_values)
+
+    def reduce(self, edge_name, edge_weight_tuples):
+        cur_in, cur_out = map(sum, zip(*edge_weight_tuples))
+        if cur_in >= MIN_BIDIRECTIONAL_WEIGHT and cur_out >= MIN_BIDIRECTIONAL_WEIGHT:
+            yield '\t'.join([edge_name, str(cur_in), str(cur_out)])
+
+
+@register_analyzer
+class Keywords(Analyzer):
+    """Per-user keyword counts for unknown users; see MRGetUsersUsingKeywords."""
+    name = 'keywords'
+
+    def __init__(self, job):
+        super(Keywords, self).__init__(job)
+        self.n_keywords = None
+
+    @classmethod
+    def configure_options(cls, job):
+        job.add_file_option('--keyword-file',
+                            default='seed_keywords.csv',
+                            help='path to list of keywords')
+        job.add_file_option('--known-user-file',
+                            default='seed_usernames.csv',
+                            help='path to user registry (.tr) or list of known usernames')
+
+    def mapper_init(self):
+        self.keyword_index = keyword_index(load_keywords(self.options.keyword_file))
+        self.known_users = UserRegistry(self.options.known_user_file)
+        self.null_tweets = 0
+
+    def map_tweet(self, tweet):
+        # Tweets without keywords are only counted, and emitted in map_final
+        user_scrn_encoded = tweet.encoded_screen_name
+        if user_scrn_encoded in self.known_users:
+            return
+
+        keyword_counts = get_keyword_counts(set(tweet.hashless_lower_tokens), self.keyword_index)
+        if keyword_counts:
+            yield user_scrn_encoded, (1, keyword_counts)
+        else:
+            self.null_tweets += 1
+
+    def map_final(self):
+        if self.null_tweets > 0:
+            yield 'Null User', (self.null_tweets, [])
+
+    def combine(self, user, values):
+        yield user, merge_keyword_counts(values)
+
+    def reduce(self, user, tuples_over_file):
+        if self.n_keywords is None:
+            # Reducers don't run mapper_init
+            self.n_keywords = len(load_keywords(self.options.keyword_file))
+        n_tweets, keyword_counts = merge_keyword_counts(tuples_over_file)
+        yield keyword_counts_line(user, n_tweets, keyword_counts, self.n_keywords)
+
+
+@register_analyzer
+class SaloneMentions(Analyzer):
+    """Entries mentioning Salone or Sierra Leone; see MRSaloneMentions."""
+    name = 'salone'
+    full_entries = True
+
+    def map_tweet(self, tweet):
+        if mentions_salone(tweet.hashless_lower_tokens):
+            # One line per entry; base64 of the serialized spinn3rApi_pb2.Entry
+            yield tweet.encoded_screen_name, base64.b64encode(tweet.entry.SerializeToString())
+
+    def reduce(self, user, entries):
+        return entries
+
+
+@register_analyzer
+class UserTweets(Analyzer):
+    """Raw content of tweets by desired users; see MRGetTweetsByUsers."""
+    name = 'user_tweets'
+
+    @classmethod
+    def configure_options(cls, job):
+        job.add_file_option('--desired-users',
+                            default='usernames.csv.tr',
+                            help='path to user registry (.tr) or list of desired usernames')
+
+    def mapper_init(self):
+        self.username_trie = UserRegistry(self.options.desired_users)
+
+    def map_tweet(self, tweet):
+        if not tweet.in_date_range:
+            return
+        if tweet.encoded_screen_name in self.username_trie:
+            raw = zlib.decompress(tweet.tweet.content.data).decode('utf8').encode('utf8')
+            yield tweet.encoded_screen_name, raw
+
+    def reduce(self, user, raws):
+        return raws
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+A feed entry whose commonly used fields are decoded at most once, however
+many analyzers look at them.
+"""
+from twokenize import simpleTokenize
+
+from gazetteer.normalize import normalize_text
+from gazetteer.normalize import strip_hashtag
+
+from trec_ingest.authors import author_screen_name
+from trec_ingest.timestamps import DEC_2014
+from trec_ingest.timestamps import FEB_2014
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+class cached_property(object):
+    """Property computed on first access and then stored on the instance."""
+    def __init__(self, fget):
+        self.fget = fget
+        self.__doc__ = fget.__doc__
+        self.__name__ = fget.__name__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = obj.__dict__[self.__name__] = self.fget(obj)
+        return value
+
+
+class ParsedTweet(object):
+    """
+    Wraps a spinn3rApi_pb2.Entry. Fields raise the same exceptions the jobs
+    used to catch, but only when an analyzer asks for them.
+    """
+    def __init__(self, entry, tokenize=simpleTokenize):
+        """
+        :param spinn3rApi_pb2.Entry entry: entry from the protostream
+        :param tokenize: simpleTokenize, or a trec_ingest.tokens.TokenCache
+            in front of it
+        """
+        self.entry = entry
+        self.tweet = entry.feed_entry
+        self.tokenize = tokenize
+
+    @cached_property
+    def encoded_screen_name(self):
+        """Lowercased screen name, utf8; see trec_ingest.authors."""
+        return author_screen_name(self.tweet)
+
+    @cached_property
+    def screen_name(self):
+        """Lowercased screen name."""
+        return self.encoded_screen_name.decode('utf8')
+
+    @cached_property
+    def user_name(self):
+        """Lowercased full name of the user."""
+        user_name_scrn_uni = self.tweet.author[0].name
+        return ''.join(user_name_scrn_uni.split(' (')[1:])[:-1].lower()
+
+    @cached_property
+    def published(self):
+        """When the tweet was published, in epoch seconds."""
+        return epoch_from_timestamp(self.tweet.last_published)
+
+    @cached_property
+    def in_date_range(self):
+        """True if the tweet was published from February through November 2014."""
+        return FEB_2014 <= self.published < DEC_2014
+
+    @cached_property
+    def tokens(self):
+        """simpleTokenize() of the tweet."""
+        return self.tokenize(self.tweet.title)
+
+    @cached_property
+    def hashless_lower_tokens(self):
+        """Tokens of the normalized tweet, with hashmarks stripped from hashtags."""
+        return [strip_hashtag(x) for x in self.tokenize(normalize_text(self.tweet.title))]
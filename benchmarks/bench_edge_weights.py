@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Count the records and bytes one MRGetTweetGraph mapper hands to the shuffle,
+yielding every edge as found and summing edges in an EdgeWeights of several
+sizes.
+
+Edges are drawn with a skewed distribution, so that a few (mentions of news
+accounts and the like) are found many times and most only once or twice.
+
+Usage: python benchmarks/bench_edge_weights.py [n_edges [n_distinct]]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MRGetTweetGraph import EdgeWeights
+from trec_ingest.protocol import VarintProtocol
+
+
+def make_edges(n, n_distinct):
+    rng = random.Random(1)
+    edges = []
+    for _ in xrange(n):
+        i = min(int(rng.paretovariate(0.4)), n_distinct)
+        edges.append(('news{}@user{}'.format(i % 100, i), (1, 0) if rng.random() < 0.5 else (0, 1)))
+    return edges
+
+
+def totals(records):
+    weights = {}
+    for edge_name, (w_in, w_out) in records:
+        cur_in, cur_out = weights.get(edge_name, (0, 0))
+        weights[edge_name] = cur_in + w_in, cur_out + w_out
+    return weights
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    edges = make_edges(n, n_distinct)
+    expected = totals(edges)
+    print 'edges: {}  distinct: {}'.format(n, len(expected))
+    protocol = VarintProtocol()
+
+    def unbuffered():
+        return list(edges)
+
+    def buffered(size):
+        def f():
+            edge_weights = EdgeWeights(size)
+            records = []
+            for edge_name, edge_weight in edges:
+                records.extend(edge_weights.add(edge_name, edge_weight))
+            records.extend(edge_weights.flush())
+            return records
+        f.__name__ = 'size {}'.format(size)
+        return f
+
+    results = []
+    for f in [unbuffered] + [buffered(size) for size in [1000, 10000, 100000]]:
+        records = f()
+        assert totals(records) == expected
+        n_bytes = sum(len(protocol.write(k, v)) + 1 for k, v in records)
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(n_bytes)
+        print '  {:<12} {:8.3f}s  {:8} records  {:10} bytes  {:4.1f}x'.format(f.__name__, seconds, len(records),
+                                                                            n_bytes, float(results[0]) / n_bytes)
+
+
+if __name__ == '__main__':
+    main()
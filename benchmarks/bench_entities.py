@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time finding the mentions of tweets, as MRGetTweetGraph does:
+    tokenize    '@' tokens of simpleTokenize(), as the job had it
+    scan        trec_ingest.entities.scan_mentions
+
+Tweets are made up as in bench_twokenize.py, and only some of them have
+pieces with an '@' or '#' in them. The two are checked against each other.
+
+Usage: python benchmarks/bench_entities.py [n_tweets [share_with_entities]]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_twokenize import make_tweets
+from trec_ingest.entities import scan_mentions
+from twokenize import simpleTokenize
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    rng = random.Random(2)
+    tweets = [text if rng.random() < share else text.replace(u'@', u'').replace(u'#', u'')
+              for text in make_tweets(n)]
+
+    def tokenize():
+        return [[tok[1:] for tok in simpleTokenize(text) if tok[0] == '@'] for text in tweets]
+
+    def scan():
+        return [scan_mentions(text) for text in tweets]
+
+    assert tokenize() == scan()
+    print 'tweets: {}  with mentions: {}'.format(n, sum(1 for mentions in scan() if mentions))
+    results = []
+    for f in [tokenize, scan]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(seconds)
+        print '  {:<10} {:8.3f}s  {:6.2f}us/tweet  {:5.1f}x'.format(f.__name__, seconds, 1e6 * seconds / n,
+                                                                  results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time the three gazetteer checks of get_tweet_stats:
+    any_word_subsequence_in_trie, a marisa prefix lookup per suffix, per gazetteer
+    gazetteer.TokenMatcher.any_match, one pass over the tokens per gazetteer
+    gazetteer.GazetteerIndex.match_labels, one pass for all three
+
+only_other_places.csv isn't checked in, so westAfrica.csv stands in for it.
+Tweets are made up from the gazetteers' own words plus filler, so both
+hits and misses are timed.
+
+Usage: python benchmarks/bench_gazetteer_matcher.py [n_tweets]
+"""
+import os
+import random
+import sys
+import timeit
+
+import marisa_trie
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gazetteer import GazetteerIndex
+from gazetteer import TokenMatcher
+from gazetteer import read_gazetteer
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAZETTEERS = ['only_west_africa.csv.tr', 'westAfrica.csv', 'CrisisLexRec.csv.tr']
+FILLER = u'RT @who : the ebola outbreak is spreading , stay safe and wash your hands http://t.co/abc :)'.split()
+
+
+def any_word_subsequence_in_trie(tweet_tokens, trie):
+    """
+    The check TokenMatcher replaced: a marisa prefix lookup on each suffix.
+    :param list|tuple tweet_tokens: tokenized tweet
+    :param marisa_trie.Trie trie: trie of phrases
+    :return bool: True if some suffix of the tweet starts with a phrase, else False
+    """
+    if len(tweet_tokens) == 0:
+        return False
+    cur_uni = tweet_tokens[-1]
+    if len(trie.prefixes(cur_uni)) > 0:
+        return True
+    for i in xrange(len(tweet_tokens) - 2, -1, -1):
+        cur_uni = tweet_tokens[i] + ' ' + cur_uni
+        if len(trie.prefixes(cur_uni)) > 0:
+            return True
+    return False
+
+
+def make_tweets(gazetteers, n):
+    rng = random.Random(0)
+    words = [word for phrases in gazetteers for phrase in rng.sample(sorted(phrases), 200)
+             for word in phrase.split(u' ')]
+    return [[rng.choice(words) if rng.random() < 0.1 else rng.choice(FILLER)
+             for _ in xrange(rng.randint(5, 25))]
+            for _ in xrange(n)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    gazetteers = [read_gazetteer(os.path.join(REPO_DIR, name)) for name in GAZETTEERS]
+    tries = [marisa_trie.Trie(phrases) for phrases in gazetteers]
+    matchers = [TokenMatcher(phrases) for phrases in gazetteers]
+    index = GazetteerIndex(zip(GAZETTEERS, gazetteers))
+    tweets = make_tweets(gazetteers, n)
+
+    def marisa_bits():
+        return [[any_word_subsequence_in_trie(tokens, trie) for trie in tries] for tokens in tweets]
+
+    def matcher_bits():
+        return [[matcher.any_match(tokens) for matcher in matchers] for tokens in tweets]
+
+    def index_bits():
+        bits = []
+        for tokens in tweets:
+            labels = index.match_labels(tokens)
+            bits.append([bool(labels & (1 << i)) for i in xrange(len(GAZETTEERS))])
+        return bits
+
+    bits = index_bits()
+    assert marisa_bits() == bits
+    assert matcher_bits() == bits
+    print 'tweets: {}  hits per gazetteer: {}'.format(n, map(sum, zip(*bits)))
+
+    results = []
+    for f in [marisa_bits, matcher_bits, index_bits]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(seconds)
+        print '{:<16} {:8.3f}s  {:6.2f}us/tweet  {:4.1f}x'.format(f.__name__, seconds, 1e6 * seconds / n,
+                                                                results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time a spam + author filter over a protostream, old and new:
+    ProtoStreamReader, which parses every Entry in full
+    LazyProtoStreamReader, which decodes only the fields the filter reads
+
+Usage: python benchmarks/bench_lazy_entries.py [n_entries]
+"""
+import os
+import random
+import sys
+import timeit
+import zlib
+from StringIO import StringIO
+
+from google.protobuf.internal.encoder import _VarintBytes
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streamcorpus_pipeline._spinn3r.protoStream_pb2 import ProtoStreamDelimiter
+from streamcorpus_pipeline._spinn3r.protoStream_pb2 import ProtoStreamHeader
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Entry
+from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+
+from trec_ingest.lazy import LazyProtoStreamReader
+
+
+USERS = ['user{}'.format(i) for i in xrange(1000)]
+WANTED = set(USERS[:10])
+
+
+def block(message):
+    data = message.SerializeToString()
+    return _VarintBytes(len(data)) + data
+
+
+def make_protostream(n):
+    rng = random.Random(0)
+    blocks = [block(ProtoStreamHeader(version='1', default_entry_type='Entry'))]
+    for i in xrange(n):
+        entry = Entry()
+        tweet = entry.feed_entry
+        user = rng.choice(USERS)
+        author = tweet.author.add()
+        author.name = u'{0} ({0})'.format(user)
+        author.link.add().href = 'http://twitter.com/' + user
+        tweet.title = u' '.join(rng.choice(USERS) for _ in xrange(12))
+        tweet.last_published = '2014-03-01T12:34:56Z'
+        tweet.spam_probability = rng.random()
+        tweet.lang.add().code = 'en'
+        tweet.content.mime_type = 'text/html'
+        tweet.content.data = zlib.compress(('<p>' + tweet.title.encode('utf8') + '</p>') * 20)
+        blocks.append(block(ProtoStreamDelimiter(delimiter_type=ProtoStreamDelimiter.ENTRY)))
+        blocks.append(block(entry))
+    blocks.append(block(ProtoStreamDelimiter(delimiter_type=ProtoStreamDelimiter.END)))
+    return ''.join(blocks)
+
+
+def count_wanted(reader_cls, data):
+    n_wanted = 0
+    for entry in reader_cls(StringIO(data)):
+        tweet = entry.feed_entry
+        if tweet.spam_probability > 0.5:
+            continue
+        if tweet.author[0].link[0].href.split('/')[-1] in WANTED:
+            n_wanted += len(zlib.decompress(tweet.content.data)) > 0
+    return n_wanted
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    data = make_protostream(n)
+    assert count_wanted(ProtoStreamReader, data) == count_wanted(LazyProtoStreamReader, data)
+
+    results = []
+    for reader_cls in [ProtoStreamReader, LazyProtoStreamReader]:
+        seconds = min(timeit.repeat(lambda: count_wanted(reader_cls, data), number=1, repeat=3))
+        results.append(seconds)
+        print '{:<24} {:8.3f}s  {:6.2f}us/entry'.format(reader_cls.__name__, seconds, 1e6 * seconds / n)
+    print 'speedup: {:.2f}x'.format(results[0] / results[1])
+
+
+if __name__ == '__main__':
+    main()
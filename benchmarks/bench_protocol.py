@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time writing and reading the shuffled records of the aggregation jobs with
+mrjob's PickleProtocol and with VarintProtocol, and compare their size:
+    stats      MRTwitterWestAfricaUsers --one-step: user, 8 summed stats
+    edges      MRGetTweetGraph: edge name, (in, out) weights
+    keywords   MRGetUsersUsingKeywords: user, (tweets, [(keyword id, count), ...])
+
+Records are made up; sums are over a mapper's worth of tweets per user.
+
+Usage: python benchmarks/bench_protocol.py [n_records]
+"""
+import os
+import random
+import sys
+import timeit
+
+from mrjob.protocol import PickleProtocol
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MRGetUsersUsingKeywords import KeywordCountsProtocol
+from trec_ingest.protocol import VarintProtocol
+
+
+def make_records(n):
+    rng = random.Random(0)
+    users = ['user_{}'.format(i) for i in xrange(n)]
+    stats = []
+    edges = []
+    keywords = []
+    for user in users:
+        count = int(rng.paretovariate(1.2))
+        stats.append((user, [count, rng.randint(0, count), rng.randint(0, count), rng.randint(0, count),
+                             rng.randint(0, count), rng.randint(0, count), count * rng.randrange(86400),
+                             rng.randint(0, count)]))
+        edges.append((user + '@' + rng.choice(users), (rng.randint(0, 3), rng.randint(0, 3))))
+        keywords.append((user, (count, sorted((keyword_id, rng.randint(1, count))
+                                              for keyword_id in rng.sample(xrange(300), rng.randint(1, 6))))))
+    return [('stats', VarintProtocol, stats), ('edges', VarintProtocol, edges),
+            ('keywords', KeywordCountsProtocol, keywords)]
+
+
+def expected(protocol, records):
+    """VarintProtocol reads tuples of ints back as lists."""
+    if type(protocol) is VarintProtocol:
+        return [(key, list(value)) for key, value in records]
+    return records
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for name, protocol_class, records in make_records(n):
+        print '{}: {} records'.format(name, n)
+        results = []
+        for protocol in [PickleProtocol(), protocol_class()]:
+            lines = [protocol.write(key, value) for key, value in records]
+            assert map(protocol.read, lines) == expected(protocol, records)
+
+            def write():
+                return [protocol.write(key, value) for key, value in records]
+
+            def read():
+                return [protocol.read(line) for line in lines]
+
+            write_seconds = min(timeit.repeat(write, number=1, repeat=3))
+            read_seconds = min(timeit.repeat(read, number=1, repeat=3))
+            n_bytes = sum(len(line) + 1 for line in lines)
+            results.append((write_seconds, read_seconds, n_bytes))
+            print '  {:<22} write {:5.2f}us  read {:5.2f}us  {:6.1f} bytes/record  {:4.1f}x smaller'.format(
+                type(protocol).__name__, 1e6 * write_seconds / n, 1e6 * read_seconds / n, 1. * n_bytes / n,
+                1. * results[0][2] / n_bytes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time writing the matched entries of MRUsersToTweets as its one reducer used
+to, joining them and compressing the whole in memory, against streaming
+them to record files, as one partition or as several written in parallel.
+
+The entries are made-up tweets from bench_twokenize.py, utf8-encoded.
+
+Usage: python benchmarks/bench_records.py [n_entries [n_partitions]]
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backports import lzma
+import cbor
+
+from bench_twokenize import make_tweets
+from trec_ingest.records import RecordFileReader
+from trec_ingest.records import RecordFileWriter
+
+
+def write_partition(args):
+    path, entries = args
+    writer = RecordFileWriter(path)
+    for entry in entries:
+        writer.append(entry)
+    writer.close()
+    return os.path.getsize(path + '.xz')
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_partitions = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    entries = [text.encode('utf8') for text in make_tweets(n)]
+    print 'entries: {}  bytes: {}  partitions: {}'.format(n, sum(map(len, entries)), n_partitions)
+    tmp_dir = tempfile.mkdtemp()
+    pool = multiprocessing.Pool(n_partitions)
+    try:
+        def in_memory():
+            return len(lzma.compress(cbor.dumps(''.join(entries))))
+
+        def one_partition():
+            return write_partition((os.path.join(tmp_dir, 'all'), entries))
+
+        def partitioned():
+            return sum(pool.map(write_partition, [(os.path.join(tmp_dir, str(i)), entries[i::n_partitions])
+                                                  for i in xrange(n_partitions)]))
+
+        results = []
+        for f in [in_memory, one_partition, partitioned]:
+            n_bytes = f()
+            seconds = min(timeit.repeat(f, number=1, repeat=3))
+            results.append(seconds)
+            print '  {:<14} {:8.3f}s  {:10} bytes  {:4.1f}x'.format(f.__name__, seconds, n_bytes,
+                                                                    results[0] / seconds)
+
+        assert list(RecordFileReader(os.path.join(tmp_dir, 'all'))) == entries
+        seconds = min(timeit.repeat(lambda: sum(1 for _ in RecordFileReader(os.path.join(tmp_dir, 'all'))),
+                                    number=1, repeat=3))
+        print '  read back      {:8.3f}s  {:6.2f}us/entry'.format(seconds, 1e6 * seconds / n)
+    finally:
+        pool.close()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time sam_trie's TokenTrie against the recursive nested-dict trie it replaced:
+    build    trie_append of every n-gram, vs. TokenTrie.add and the layout
+    load     cPickle of the dicts, vs. TokenTrie.frombytes of its flat buffer
+    match    trie_subseq over every start (the old one sliced at each), vs.
+             TokenTrie.any_subsequence
+
+The n-grams are those of only_west_africa.csv; tweets are made up from their
+words plus filler, so both hits and misses are timed.
+
+Usage: python benchmarks/bench_sam_trie.py [n_tweets]
+"""
+import cPickle as pickle
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gazetteer.compiler import read_phrases
+from sam_trie import TokenTrie
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAZETTEER = 'only_west_africa.csv'
+FILLER = u'RT @who : the ebola outbreak is spreading , stay safe and wash your hands http://t.co/abc :)'.split()
+
+
+# The recursive functions sam_trie had before TokenTrie, as the baseline
+def dict_trie_append(parts, trie):
+    x, rest = parts[0], parts[1:]
+    if len(rest) == 1:
+        trie[x] = {rest[0]: None}
+        return trie
+    try:
+        trie[x] = dict_trie_append(rest, trie[x])
+    except KeyError:
+        trie[x] = dict_trie_append(rest, {})
+    return trie
+
+
+def dict_trie_check(tokens, trie, end_delim='$'):
+    if end_delim in trie:
+        return True
+    try:
+        x, rest = tokens[0], tokens[1:]
+    except IndexError:
+        return False
+    try:
+        return dict_trie_check(rest, trie[x])
+    except (KeyError, TypeError):
+        return False
+
+
+def dict_trie_subseq(seq, trie):
+    for i in range(len(seq)):
+        if dict_trie_check(seq[i:], trie):
+            return True
+    return False
+
+
+def make_tweets(sequences, n):
+    rng = random.Random(0)
+    words = [word for tokens in rng.sample(sequences, 500) for word in tokens]
+    return [[rng.choice(words) if rng.random() < 0.1 else rng.choice(FILLER)
+             for _ in xrange(rng.randint(5, 25))]
+            for _ in xrange(n)]
+
+
+def report(name, seconds, baseline, unit=''):
+    print '{:<24} {:8.3f}s {} {:6.1f}x'.format(name, seconds, unit, baseline / seconds)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    sequences = sorted(phrase.split(u' ') for phrase in read_phrases(os.path.join(REPO_DIR, GAZETTEER)))
+    tweets = make_tweets(sequences, n)
+
+    def build_dict():
+        trie = {}
+        for tokens in sequences:
+            dict_trie_append(tokens + ['$'], trie)
+        return trie
+
+    def build_token_trie():
+        trie = TokenTrie(sequences)
+        trie.tobytes()
+        return trie
+
+    dict_trie = build_dict()
+    token_trie = build_token_trie()
+    pickled = pickle.dumps(dict_trie, pickle.HIGHEST_PROTOCOL)
+    data = token_trie.tobytes()
+    print 'n-grams: {}  slots: {}  pickle: {} bytes  buffer: {} bytes'.format(
+        len(token_trie), len(token_trie.check), len(pickled), len(data))
+
+    seconds = [min(timeit.repeat(f, number=1, repeat=3)) for f in [build_dict, build_token_trie]]
+    report('build dict', seconds[0], seconds[0])
+    report('build TokenTrie', seconds[1], seconds[0])
+
+    seconds = [min(timeit.repeat(f, number=1, repeat=3))
+               for f in [lambda: pickle.loads(pickled), lambda: TokenTrie.frombytes(data)]]
+    report('load pickle', seconds[0], seconds[0])
+    report('load TokenTrie', seconds[1], seconds[0])
+
+    def dict_hits():
+        return [dict_trie_subseq(tokens, dict_trie) for tokens in tweets]
+
+    def token_trie_hits():
+        return [token_trie.any_subsequence(tokens) for tokens in tweets]
+
+    hits = token_trie_hits()
+    assert dict_hits() == hits
+    print 'tweets: {}  hits: {}'.format(n, sum(hits))
+    seconds = [min(timeit.repeat(f, number=1, repeat=3)) for f in [dict_hits, token_trie_hits]]
+    for name, s in zip(['match dict', 'match TokenTrie'], seconds):
+        report(name, s, seconds[0], '{:6.2f}us/tweet'.format(1e6 * s / n))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time screen-name extraction from author links:
+    split_at      urlsplit(href).path.split('@')[1], as MRTwitterWestAfricaUsers had it
+    split_slash   href.split('/')[-1], as MRGetTweetGraph had it
+    parse         trec_ingest.authors.parse_screen_name, uncached
+    cached        trec_ingest.authors.author_screen_name's ScreenNameCache
+
+Each old way is checked against the new one on the links it handled. Links
+are drawn from n_authors authors with a skewed distribution, as in a chunk.
+
+Usage: python benchmarks/bench_screen_names.py [n_links [n_authors]]
+"""
+import os
+import random
+import sys
+import timeit
+from urllib2 import urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trec_ingest.authors import ScreenNameCache
+from trec_ingest.authors import parse_screen_name
+
+
+def split_at(href):
+    return urlparse.urlsplit(href).path.split('@')[1].lower().encode('utf8')
+
+
+def split_slash(href):
+    return href.split('/')[-1].lower().decode('utf8').encode('utf8')
+
+
+def make_links(n, n_authors, prefix):
+    rng = random.Random(0)
+    authors = ['User_{}'.format(i) for i in xrange(n_authors)]
+    return [prefix + authors[min(int(rng.paretovariate(0.3)) - 1, n_authors - 1)] for _ in xrange(n)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_authors = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    for old, prefix in [(split_at, 'http://twitter.com/@'), (split_slash, 'http://twitter.com/')]:
+        links = make_links(n, n_authors, prefix)
+        assert [old(href) for href in links] == [parse_screen_name(href) for href in links]
+        print 'links: {}  distinct: {}  like {}'.format(n, len(set(links)), links[0])
+
+        def cached():
+            cache = ScreenNameCache()
+            return [cache(href) for href in links]
+
+        def uncached():
+            return [parse_screen_name(href) for href in links]
+
+        def old_way():
+            return [old(href) for href in links]
+        old_way.__name__ = old.__name__
+
+        results = []
+        for f in [old_way, uncached, cached]:
+            seconds = min(timeit.repeat(f, number=1, repeat=3))
+            results.append(seconds)
+            print '  {:<12} {:8.3f}s  {:6.2f}us/link  {:4.1f}x'.format(f.__name__, seconds, 1e6 * seconds / n,
+                                                                    results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time the per-tweet date window check, old and new:
+    dateutil.parser.parse + aware/naive datetime comparison
+    trec_ingest.timestamps.epoch_from_timestamp + integer comparison
+
+Usage: python benchmarks/bench_timestamps.py [n_timestamps]
+"""
+import os
+import random
+import sys
+import timeit
+
+import dateutil
+import dateutil.parser
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trec_ingest.timestamps import DEC_2014
+from trec_ingest.timestamps import FEB_2014
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+FEB_2014_DT = dateutil.parser.parse('2014-02-01 00:00:00+00:00')
+DEC_2014_DT = dateutil.parser.parse('2014-12-01 00:00:00+00:00')
+NAIVE_FEB_2014_DT = dateutil.parser.parse('2014-02-01')
+NAIVE_DEC_2014_DT = dateutil.parser.parse('2014-12-01')
+
+
+def make_timestamps(n):
+    rng = random.Random(0)
+    return ['2014-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z'.format(rng.randint(1, 12), rng.randint(1, 28),
+                                                               rng.randint(0, 23), rng.randint(0, 59),
+                                                               rng.randint(0, 59))
+            for _ in xrange(n)]
+
+
+def dateutil_window(timestamps):
+    n_in_range = 0
+    for timestamp in timestamps:
+        tweet_time = dateutil.parser.parse(timestamp)
+        try:
+            n_in_range += FEB_2014_DT <= tweet_time < DEC_2014_DT
+        except TypeError:
+            n_in_range += NAIVE_FEB_2014_DT <= tweet_time < NAIVE_DEC_2014_DT
+    return n_in_range
+
+
+def epoch_window(timestamps):
+    n_in_range = 0
+    for timestamp in timestamps:
+        n_in_range += FEB_2014 <= epoch_from_timestamp(timestamp) < DEC_2014
+    return n_in_range
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    timestamps = make_timestamps(n)
+    assert dateutil_window(timestamps) == epoch_window(timestamps)
+
+    results = []
+    for f in [dateutil_window, epoch_window]:
+        seconds = min(timeit.repeat(lambda: f(timestamps), number=1, repeat=3))
+        results.append(seconds)
+        print '{:<16} {:8.3f}s  {:6.2f}us/tweet'.format(f.__name__, seconds, 1e6 * seconds / n)
+    print 'speedup: {:.1f}x'.format(results[0] / results[1])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time tokenizing a burst of tweets with and without a TokenCache.
+
+A share of the tweets are retweets, drawn from the earlier tweets with a
+skewed distribution, as in a crisis burst; the rest are new texts, made up
+as in bench_twokenize.py.
+
+Usage: python benchmarks/bench_token_cache.py [n_tweets [retweet_share [cache_size]]]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_twokenize import make_tweets
+from trec_ingest.tokens import TokenCache
+from twokenize import simpleTokenize
+
+
+def make_burst(n, retweet_share):
+    rng = random.Random(1)
+    originals = make_tweets(n)
+    tweets = []
+    for text in originals:
+        if tweets and rng.random() < retweet_share:
+            text = tweets[-min(int(rng.paretovariate(0.5)), len(tweets))]
+            if not text.startswith(u'RT '):
+                text = u'RT @someone: ' + text
+        tweets.append(text)
+    return tweets
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    retweet_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    cache_size = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    tweets = make_burst(n, retweet_share)
+    print 'tweets: {}  distinct: {}  cache size: {}'.format(n, len(set(tweets)), cache_size)
+
+    def uncached():
+        return [simpleTokenize(text) for text in tweets]
+
+    def cached():
+        cache = TokenCache(cache_size)
+        tokens = [cache(text) for text in tweets]
+        cached.hits, cached.misses = cache.hits, cache.misses
+        return tokens
+
+    assert uncached() == cached()
+    print '  hits: {}  misses: {}  ({:.0%} of tokenizer calls avoided)'.format(
+        cached.hits, cached.misses, float(cached.hits) / n)
+    results = []
+    for f in [uncached, cached]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(seconds)
+        print '  {:<10} {:8.3f}s  {:6.2f}us/tweet  {:4.1f}x'.format(f.__name__, seconds, 1e6 * seconds / n,
+                                                                 results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time twokenize.simpleTokenize against simpleTokenizeReference, the
+tokenizer as it was, and check that every tweet gets the same tokens.
+
+Tweets are read from a file, one per line in utf8 (e.g. the titles dumped
+from a chunk), or made up from the usual pieces of a tweet: words, mentions,
+hashtags, links, numbers, quotes and emoticons.
+
+Usage: python benchmarks/bench_twokenize.py [tweets.txt | n_tweets]
+"""
+import codecs
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twokenize import simpleTokenize
+from twokenize import simpleTokenizeReference
+
+
+WORDS = (u'ebola outbreak in west africa the is a of to and for on with cases death toll health workers '
+         u'Liberia Sierra Leone Guinea Monrovia Freetown Conakry MSF WHO CDC stay safe wash your hands').split()
+PIECES = [u'RT', u'@who', u'@MSF_USA:', u'#ebola', u'#Liberia', u'http://t.co/AbC123xyZ', u'www.who.int', u'1,234',
+          u'3.5%', u'12:30', u':)', u':(', u':D', u'<3', u'...', u'!!', u'?', u'"we', u'need"', u"don't", u"they're",
+          u'(via', u'@nytimes)', u'-', u'&amp;', u'U.S.', u'Dr.', u'❤', u'😷']
+
+
+def make_tweets(n):
+    rng = random.Random(0)
+    return [u' '.join(rng.choice(PIECES) if rng.random() < 0.25 else rng.choice(WORDS)
+                      for _ in xrange(rng.randint(3, 22)))
+            for _ in xrange(n)]
+
+
+def read_tweets(path):
+    with codecs.open(path, 'r', 'utf8') as f:
+        return [line.rstrip(u'\n') for line in f]
+
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else '20000'
+    tweets = make_tweets(int(arg)) if arg.isdigit() else read_tweets(arg)
+    mismatches = sum(1 for text in tweets if simpleTokenize(text) != simpleTokenizeReference(text))
+    print 'tweets: {}  mismatched: {}'.format(len(tweets), mismatches)
+
+    def reference():
+        return [simpleTokenizeReference(text) for text in tweets]
+
+    def fast():
+        return [simpleTokenize(text) for text in tweets]
+
+    results = []
+    for f in [reference, fast]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(seconds)
+        print '  {:<10} {:8.3f}s  {:6.2f}us/tweet  {:4.1f}x'.format(f.__name__, seconds, 1e6 * seconds / len(tweets),
+                                                                 results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
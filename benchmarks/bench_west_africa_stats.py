@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Time the second step of MRTwitterWestAfricaUsers on the mapper side: stats
+for each tweet, then the combiner's per-user sums, pickled as they would be
+for the shuffle.
+    per tweet   get_tweet_stats() tuples, summed with map(sum, zip(*...))
+    batched     TweetStatsBatch rows, one per user per batch
+
+only_other_places.csv isn't checked in, so westAfrica.csv stands in for it.
+Tweets are made up from the gazetteers' own words plus filler, spread over
+n_users users. They are tokenized beforehand: simpleTokenize() costs the same
+either way, and would drown out the difference.
+
+Usage: python benchmarks/bench_west_africa_stats.py [n_tweets [n_users]]
+"""
+import cPickle as pickle
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MRTwitterWestAfricaUsers import TweetStatsBatch
+from MRTwitterWestAfricaUsers import get_tweet_stats
+from MRTwitterWestAfricaUsers import load_gazetteers
+from twokenize import simpleTokenize
+from trec_ingest.timestamps import FEB_2014
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAZETTEERS = ['only_west_africa.csv.idx', 'westAfrica.csv', 'CrisisLexRec.csv.idx']
+FILLER = u'RT @who : the ebola outbreak is spreading , stay safe and wash your hands http://t.co/abc :)'.split()
+
+
+def make_tweets(gazetteers, n, n_users):
+    rng = random.Random(0)
+    words = [word for phrase in rng.sample(gazetteers.entries, 600) for word in phrase.split(u' ')]
+    return [('user{}'.format(rng.randrange(n_users)),
+             (FEB_2014 + rng.randrange(300 * 86400),
+              u' '.join(rng.choice(words) if rng.random() < 0.1 else rng.choice(FILLER)
+                        for _ in xrange(rng.randint(5, 25))),
+              rng.choice([u'someone', u'liberia news', u'a. sierra leone']),
+              'en'))
+            for _ in xrange(n)]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    gazetteers = load_gazetteers(*[os.path.join(REPO_DIR, name) for name in GAZETTEERS])
+    tweets = make_tweets(gazetteers, n, n_users)
+    tokens = [simpleTokenize(body_uni) for _, (_, body_uni, _, _) in tweets]
+    n_records = []
+
+    def combine(rows):
+        n_records.append(len(rows))
+        by_user = {}
+        for user, stats in rows:
+            by_user.setdefault(user, []).append(pickle.loads(pickle.dumps(stats, 2)))
+        return dict((user, map(sum, zip(*user_rows))) for user, user_rows in by_user.iteritems())
+
+    def per_tweet():
+        rows = []
+        for (user, (tweet_epoch, body_uni, user_name_uni, _)), tweet_tokens in zip(tweets, tokens):
+            rows.append((user, get_tweet_stats(tweet_epoch, body_uni, user_name_uni, gazetteers,
+                                               tweet_tokens=tweet_tokens)))
+        return combine(rows)
+
+    def batched():
+        batch = TweetStatsBatch(gazetteers, 10000)
+        rows = []
+        for (user, (tweet_epoch, body_uni, user_name_uni, _)), tweet_tokens in zip(tweets, tokens):
+            rows.extend(batch.add(user, tweet_epoch, body_uni, user_name_uni, tweet_tokens))
+        rows.extend(batch.flush())
+        return combine(rows)
+
+    assert per_tweet() == batched()
+    print 'tweets: {}  users: {}  mapper records: {} per tweet, {} batched'.format(n, n_users, *n_records)
+    results = []
+    for f in [per_tweet, batched]:
+        seconds = min(timeit.repeat(f, number=1, repeat=3))
+        results.append(seconds)
+        print '{:<10} {:8.3f}s  {:6.2f}us/tweet  {:4.1f}x'.format(f.__name__, seconds, 1e6 * seconds / n,
+                                                              results[0] / seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Gazetteers of places and terms, compiled for matching against tokenized
+tweets.
+"""
+from gazetteer.compiler import GazetteerError
+from gazetteer.compiler import compile_gazetteer
+from gazetteer.compiler import read_gazetteer
+from gazetteer.matcher import GazetteerIndex
+from gazetteer.matcher import TokenMatcher
+from gazetteer.normalize import normalize_phrase
+from gazetteer.normalize import normalize_text
+from gazetteer.normalize import normalize_tokens
+from gazetteer.normalize import strip_hashtag
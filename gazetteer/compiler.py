@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Compile newline-delimited gazetteers into checksummed indexes, and read
+gazetteers back for matching.
+
+Every line goes through `normalize_phrase()`, the normalization that
+`normalize_tokens()` gives tweet tokens before matching, and the distinct
+phrases are saved as a marisa trie in `<gazetteer>.idx`:
+    TRECGAZ\\n                 magic
+    {"version": ..., ...}\\n   JSON header: format and normalization versions,
+                              sha1 of the source file, entry count, and sha1
+                              of the trie bytes
+    <trie bytes>
+An intact index whose header records the current versions and the source's
+sha1 is up to date and isn't rebuilt. Loading an index checks the trie bytes against
+the header's checksum, so a truncated or stale upload fails the mapper
+instead of silently matching nothing.
+
+Usage:
+    python -m gazetteer.compiler only_west_africa.csv CrisisLexRec.csv
+"""
+import argparse
+import codecs
+import hashlib
+import json
+import os
+import sys
+
+import marisa_trie
+
+from gazetteer.normalize import NORMALIZATION_VERSION
+from gazetteer.normalize import normalize_phrase
+
+
+INDEX_VERSION = 1
+INDEX_MAGIC = 'TRECGAZ\n'
+INDEX_SUFFIX = '.idx'
+
+
+class GazetteerError(ValueError):
+    """Raised for an index that is corrupt or was built by another version."""
+    pass
+
+
+def index_path(source):
+    """
+    :param str source: path of a gazetteer
+    :return str: path of its compiled index
+    """
+    return source + INDEX_SUFFIX
+
+
+def file_sha1(path):
+    """
+    :param str path: any file
+    :return str: hex sha1 of its contents
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), ''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_phrases(source):
+    """
+    :param str source: newline-delimited gazetteer, utf8
+    :return set: its distinct normalized phrases, without blank lines
+    """
+    with codecs.open(source, 'r', 'utf8') as infile:
+        phrases = set(normalize_phrase(line) for line in infile)
+    phrases.discard(u'')
+    return phrases
+
+
+def _read_header(f, path):
+    if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+        raise GazetteerError('{} is not a gazetteer index'.format(path))
+    try:
+        header = json.loads(f.readline())
+    except ValueError:
+        raise GazetteerError('{} has a corrupt header'.format(path))
+    if header.get('version') != INDEX_VERSION:
+        raise GazetteerError('{} is index version {}, not {}'.format(path, header.get('version'), INDEX_VERSION))
+    if header.get('normalization') != NORMALIZATION_VERSION:
+        raise GazetteerError('{} was normalized with version {}, not {}; rebuild it'.format(
+            path, header.get('normalization'), NORMALIZATION_VERSION))
+    return header
+
+
+def read_index_header(path):
+    """
+    :param str path: compiled index
+    :return dict: its header
+    :raise GazetteerError: if it isn't an index of the current versions
+    """
+    with open(path, 'rb') as f:
+        return _read_header(f, path)
+
+
+def _read_index(path):
+    with open(path, 'rb') as f:
+        header = _read_header(f, path)
+        data = f.read()
+    if hashlib.sha1(data).hexdigest() != header['checksum']:
+        raise GazetteerError('{} failed its checksum; rebuild or re-upload it'.format(path))
+    return header, data
+
+
+def load_index(path):
+    """
+    :param str path: compiled index
+    :return set: its phrases
+    :raise GazetteerError: if it is corrupt or of another version
+    """
+    header, data = _read_index(path)
+    phrases = set(marisa_trie.Trie().frombytes(data).keys())
+    if len(phrases) != header['entries']:
+        raise GazetteerError('{} has {} entries, not {}'.format(path, len(phrases), header['entries']))
+    return phrases
+
+
+def read_gazetteer(filename):
+    """
+    :param str filename: compiled index, a marisa trie saved as `<gazetteer>.tr`
+        by the old jobs, or a newline-delimited gazetteer
+    :return set: its phrases
+    :raise GazetteerError: for a bad index
+    """
+    if filename.endswith(INDEX_SUFFIX):
+        return load_index(filename)
+    if filename.endswith('.tr'):
+        trie = marisa_trie.Trie()
+        trie.load(filename)
+        return set(trie.keys())
+    return read_phrases(filename)
+
+
+def is_up_to_date(source, output, source_sha1=None):
+    """
+    :param str source: path of a gazetteer
+    :param str output: path of its index
+    :param str source_sha1: `file_sha1(source)`, if already known
+    :return bool: True if `output` is intact and was compiled from this
+        `source` by this version
+    """
+    if not os.path.exists(output):
+        return False
+    try:
+        header, _ = _read_index(output)
+    except GazetteerError:
+        return False
+    return header.get('source_sha1') == (source_sha1 or file_sha1(source))
+
+
+def compile_gazetteer(source, output=None, force=False):
+    """
+    :param str source: path of a gazetteer
+    :param str output: path of the index; see `index_path()` for the default
+    :param bool force: rebuild even if the index is up to date
+    :return tuple: path of the index, and whether it was rebuilt
+    """
+    output = output or index_path(source)
+    source_sha1 = file_sha1(source)
+    if not force and is_up_to_date(source, output, source_sha1):
+        return output, False
+
+    phrases = read_phrases(source)
+    data = marisa_trie.Trie(phrases).tobytes()
+    header = {'version': INDEX_VERSION,
+              'normalization': NORMALIZATION_VERSION,
+              'source': os.path.basename(source),
+              'source_sha1': source_sha1,
+              'entries': len(phrases),
+              'checksum': hashlib.sha1(data).hexdigest()}
+
+    tmp_output = '{}.tmp-{}'.format(output, os.getpid())
+    with open(tmp_output, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(json.dumps(header, sort_keys=True) + '\n')
+        f.write(data)
+    os.rename(tmp_output, output)
+    return output, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile gazetteers into checksummed indexes.')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild indexes even if their gazetteer has not changed')
+    parser.add_argument('sources', nargs='+',
+                        help='newline-delimited gazetteers; each is compiled to <gazetteer>{}'.format(INDEX_SUFFIX))
+    args = parser.parse_args(argv)
+
+    for source in args.sources:
+        output, rebuilt = compile_gazetteer(source, force=args.force)
+        if rebuilt:
+            sys.stderr.write('compiled {} ({} entries)\n'.format(output, read_index_header(output)['entries']))
+        else:
+            sys.stderr.write('{} is up to date\n'.format(output))
+
+
+if __name__ == '__main__':
+    main()
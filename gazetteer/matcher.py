@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Find gazetteer phrases in a tokenized tweet with a token-level Aho-Corasick
+automaton, in one pass over the tokens.
+
+The matches are the ones get_tweet_stats used to find with a marisa prefix
+lookup on each suffix: a phrase matches at token i if it is a prefix of
+`u' '.join(tokens[i:])`. So every word of a phrase but the last has to equal
+a token, while the last word only has to start one ('liberia' matches
+'liberian'). Tokens are compared as they are; gazetteer entries are
+normalized when read (see gazetteer.normalize).
+
+The automaton walks the tokens over a trie of the phrases' leading words.
+Each state keeps the last words that end a phrase there, and a link to the
+next state down its failure chain that ends any, so a token is checked
+against every phrase ending at it without restarting from each suffix.
+Every chain ends at the root, whose last words are the one-word phrases;
+since tweets reuse a small vocabulary, the root's hits are memoized by token.
+
+Each phrase is an entry with an id and a bitmask of labels, so one
+automaton can hold several gazetteers (see GazetteerIndex) and a single
+pass says which of them a tweet mentions.
+"""
+import bisect
+
+from gazetteer.compiler import read_gazetteer
+
+
+ROOT = 0
+ROOT_HITS_CACHE_SIZE = 100000
+NO_HITS = (0, ())
+
+
+class TokenMatcher(object):
+    """
+    Compiled automaton for a list of entries.
+    """
+    def __init__(self, phrases, entry_labels=None):
+        """
+        :param phrases: iterable of unicode phrases, words separated by spaces
+        :param list entry_labels: label bitmask of each phrase, in order, if
+            the phrases are distinct; otherwise they are deduplicated and
+            sorted, and all get label 1
+        """
+        if entry_labels is None:
+            self.entries = sorted(set(phrases))
+            self.entry_labels = [1] * len(self.entries)
+        else:
+            self.entries = list(phrases)
+            self.entry_labels = list(entry_labels)
+        self.all_labels = reduce(int.__or__, self.entry_labels, 0)
+        self.entry_ids = dict((phrase, entry_id) for entry_id, phrase in enumerate(self.entries))
+        self.phrase_lengths = sorted(set(len(phrase) for phrase in self.entries))
+
+        # goto[state] maps a token to the next state; tails[state] maps the
+        # last word of each entry ending at the state to (n_words, entry_id)
+        self.goto = [{}]
+        self.tails = [{}]
+        for entry_id, phrase in enumerate(self.entries):
+            words = phrase.split(u' ')
+            state = ROOT
+            for word in words[:-1]:
+                next_state = self.goto[state].get(word)
+                if next_state is None:
+                    next_state = self.goto[state][word] = len(self.goto)
+                    self.goto.append({})
+                    self.tails.append({})
+                state = next_state
+            self.tails[state].setdefault(words[-1], []).append((len(words), entry_id))
+        self.tail_lengths = [sorted(set(len(word) for word in tails)) for tails in self.tails]
+
+        # Breadth-first, so a state's failure target is done before the state
+        self.fail = [ROOT] * len(self.goto)
+        self.output = [None] * len(self.goto)
+        queue = list(self.goto[ROOT].values())
+        for state in queue:
+            for word, next_state in self.goto[state].iteritems():
+                fail_state = self.fail[state]
+                while fail_state != ROOT and word not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                self.fail[next_state] = self.goto[fail_state].get(word, ROOT)
+                queue.append(next_state)
+        for state in queue:
+            fail_state = self.fail[state]
+            if fail_state != ROOT:
+                self.output[state] = fail_state if self.tails[fail_state] else self.output[fail_state]
+
+        # The root ends every failure chain, so it is checked apart from them
+        self.root_hits = {}
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        :param str filename: see `read_gazetteer()`
+        :return TokenMatcher:
+        """
+        return cls(read_gazetteer(filename))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _state_hits(self, state, token):
+        """
+        :return list: (n_words, entry_id) of each entry ending at `state`
+            whose last word starts `token`
+        """
+        hits = []
+        tails = self.tails[state]
+        n_chars = len(token)
+        for length in self.tail_lengths[state]:
+            if length > n_chars:
+                break
+            state_hits = tails.get(token[:length])
+            if state_hits is not None:
+                hits.extend(state_hits)
+        return hits
+
+    def _root_hits(self, token):
+        """
+        :return tuple: label bitmask and `_state_hits()` of the root, memoized
+        """
+        try:
+            return self.root_hits[token]
+        except KeyError:
+            if len(self.root_hits) >= ROOT_HITS_CACHE_SIZE:
+                self.root_hits.clear()
+            hits = self._state_hits(ROOT, token)
+            if hits:
+                labels = 0
+                for _, entry_id in hits:
+                    labels |= self.entry_labels[entry_id]
+                root_hits = self.root_hits[token] = (labels, tuple(hits))
+            else:
+                root_hits = self.root_hits[token] = NO_HITS
+            return root_hits
+
+    def _tail_hits(self, state, token):
+        """
+        :return generator: (n_words, entry_id) of each entry ending with
+            `token` after the words that led to `state`
+        """
+        if state != ROOT:
+            tail_state = state if self.tails[state] else self.output[state]
+            while tail_state is not None:
+                for hit in self._state_hits(tail_state, token):
+                    yield hit
+                tail_state = self.output[tail_state]
+        for hit in self._root_hits(token)[1]:
+            yield hit
+
+    def entry_matches(self, tokens):
+        """
+        :param list|tuple tokens: tokenized tweet
+        :return generator: (start, end, entry_id) for every entry found, where
+            tokens[start:end] are the tokens it covers
+        """
+        if u' ' in u''.join(tokens):
+            # A phrase word can't line up with part of a token
+            for match in self._joined_matches(tokens):
+                yield match
+            return
+
+        state = ROOT
+        for end, token in enumerate(tokens, 1):
+            for n_words, entry_id in self._tail_hits(state, token):
+                yield end - n_words, end, entry_id
+            while state != ROOT and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, ROOT)
+
+    def _joined_matches(self, tokens):
+        """The same matches, found by trying each phrase length at each token."""
+        text = u' '.join(tokens)
+        ends = []
+        offset = -1
+        for token in tokens:
+            offset += len(token) + 1
+            ends.append(offset)
+        start_offset = 0
+        for start, token in enumerate(tokens):
+            for length in self.phrase_lengths:
+                if start_offset + length > len(text):
+                    break
+                entry_id = self.entry_ids.get(text[start_offset:start_offset + length])
+                if entry_id is not None:
+                    end = bisect.bisect_left(ends, start_offset + length - 1) + 1
+                    yield start, end, entry_id
+            start_offset += len(token) + 1
+
+    def find_hits(self, tokens, hits):
+        """
+        Append every entry found to `hits` as three ints: entry_id, then the
+        start and end of the tokens it covers. Nothing is allocated per hit,
+        so a caller can reuse one array('i') across tweets.
+        :param list|tuple tokens: tokenized tweet
+        :param array.array hits: flat array (or list) of ints to append to
+        :return int: number of hits appended
+        """
+        n_ints = len(hits)
+        append = hits.append
+        if u' ' in u''.join(tokens):
+            for start, end, entry_id in self._joined_matches(tokens):
+                append(entry_id)
+                append(start)
+                append(end)
+            return (len(hits) - n_ints) // 3
+
+        # entry_matches(), unrolled; hits come out in the same order
+        goto = self.goto
+        fail = self.fail
+        tails = self.tails
+        output = self.output
+        root_goto = goto[ROOT]
+        root_hits = self.root_hits
+        state = ROOT
+        for end, token in enumerate(tokens, 1):
+            if state != ROOT:
+                tail_state = state if tails[state] else output[state]
+                while tail_state is not None:
+                    for n_words, entry_id in self._state_hits(tail_state, token):
+                        append(entry_id)
+                        append(end - n_words)
+                        append(end)
+                    tail_state = output[tail_state]
+                while state != ROOT and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, ROOT)
+            else:
+                state = root_goto.get(token, ROOT)
+
+            token_hits = root_hits.get(token)
+            if token_hits is None:
+                token_hits = self._root_hits(token)
+            if token_hits[0]:
+                for _, entry_id in token_hits[1]:
+                    append(entry_id)
+                    append(end - 1)
+                    append(end)
+        return (len(hits) - n_ints) // 3
+
+    def matches(self, tokens):
+        """
+        :param list|tuple tokens: tokenized tweet
+        :return generator: (start, end, phrase) for every phrase found
+        """
+        for start, end, entry_id in self.entry_matches(tokens):
+            yield start, end, self.entries[entry_id]
+
+    def scan(self, tokens):
+        """
+        :param list|tuple tokens: tokenized tweet
+        :return tuple: label bitmask of the entries found, and their ids
+        """
+        labels = 0
+        entry_ids = []
+        for _, _, entry_id in self.entry_matches(tokens):
+            labels |= self.entry_labels[entry_id]
+            entry_ids.append(entry_id)
+        return labels, entry_ids
+
+    def match_labels(self, tokens):
+        """
+        :param list|tuple tokens: tokenized tweet
+        :return int: label bitmask of the entries found; stops looking once
+            every label has been seen
+        """
+        # entry_matches(), unrolled
+        if u' ' in u''.join(tokens):
+            labels = 0
+            for _, _, entry_id in self._joined_matches(tokens):
+                labels |= self.entry_labels[entry_id]
+            return labels
+
+        all_labels = self.all_labels
+        entry_labels = self.entry_labels
+        goto = self.goto
+        fail = self.fail
+        root_goto = goto[ROOT]
+        root_hits = self.root_hits
+        labels = 0
+        state = ROOT
+        for token in tokens:
+            hits = root_hits.get(token)
+            if hits is None:
+                hits = self._root_hits(token)
+            labels |= hits[0]
+            if state == ROOT:
+                state = root_goto.get(token, ROOT)
+            else:
+                tail_state = state if self.tails[state] else self.output[state]
+                while tail_state is not None:
+                    for _, entry_id in self._state_hits(tail_state, token):
+                        labels |= entry_labels[entry_id]
+                    tail_state = self.output[tail_state]
+                while state != ROOT and token not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(token, ROOT)
+            if labels == all_labels:
+                break
+        return labels
+
+    def any_match(self, tokens):
+        """
+        :param list|tuple tokens: tokenized tweet
+        :return bool: True if some phrase is in the tweet, else False
+        """
+        return self.match_labels(tokens) != 0
+
+
+class GazetteerIndex(TokenMatcher):
+    """
+    Several gazetteers in one automaton. Gazetteer i sets bit `1 << i` of an
+    entry's labels; a phrase in more than one gazetteer is one entry.
+    """
+    def __init__(self, gazetteers):
+        """
+        :param list gazetteers: (label, phrases) pairs
+        """
+        self.labels = [label for label, _ in gazetteers]
+        entry_labels = {}
+        for i, (_, phrases) in enumerate(gazetteers):
+            for phrase in phrases:
+                entry_labels[phrase] = entry_labels.get(phrase, 0) | (1 << i)
+        entries = sorted(entry_labels)
+        super(GazetteerIndex, self).__init__(entries, [entry_labels[phrase] for phrase in entries])
+
+    @classmethod
+    def from_files(cls, labeled_filenames):
+        """
+        :param list labeled_filenames: (label, filename) pairs; see `read_gazetteer()`
+        :return GazetteerIndex:
+        """
+        return cls([(label, read_gazetteer(filename)) for label, filename in labeled_filenames])
+
+    def label_bit(self, label):
+        """
+        :param str label: name of one of the gazetteers
+        :return int: its bit in label bitmasks
+        """
+        return 1 << self.labels.index(label)
+
+    def label_names(self, labels):
+        """
+        :param int labels: label bitmask
+        :return list: names of the labels set in it
+        """
+        return [label for i, label in enumerate(self.labels) if labels & (1 << i)]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+The text normalization shared by gazetteer entries and tweet tokens, so that
+an entry is compiled into the form a token will be in when it is matched.
+"""
+import unicodedata
+
+
+# Bump when the normalization changes, so compiled indexes get rebuilt
+NORMALIZATION_VERSION = 1
+
+
+def normalize_text(text):
+    """
+    :param unicode text: tweet or gazetteer line
+    :return unicode: NFC-normalized and lowercased
+    """
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def strip_hashtag(token):
+    """
+    :param unicode token: a single token
+    :return unicode: the token without its hashmark, if it's a hashtag
+    """
+    return token[1:] if token[:1] == u'#' else token
+
+
+def normalize_tokens(tokens):
+    """
+    :param list|tuple tokens: tokenized tweet
+    :return list: the tokens normalized and hashless, as the words of a
+        gazetteer entry are
+    """
+    return [strip_hashtag(normalize_text(token)) for token in tokens]
+
+
+def normalize_phrase(line):
+    """
+    :param unicode line: line of a gazetteer
+    :return unicode: its words, normalized and hashless, separated by single
+        spaces; empty for a blank line
+    """
+    words = [strip_hashtag(word) for word in normalize_text(line).split()]
+    return u' '.join(word for word in words if word)
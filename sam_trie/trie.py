@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Prefix tree of token sequences (n-grams), for finding any gazetteer n-gram
+in a tokenized tweet.
+
+TokenTrie maps each token to an integer id and keeps its nodes in a double
+array: the child of node s for token id c is slot t = base[s] + c, and it
+exists if check[t] == s. A lookup step is a dict lookup for the token's id
+and two array reads, nothing is sliced or recursed into, and the whole trie
+is three flat arrays and the token list, saved to and loaded from a single
+buffer.
+
+Sequences are added to a dict-of-dicts staging tree; the double array is
+laid out again, breadth first, the next time the trie is searched or saved.
+
+The dict-based functions the jobs used before (trie_append, _trie_check and
+trie_subseq) are kept, now iterative, for tries that are still nested dicts.
+"""
+from array import array
+import codecs
+from itertools import chain
+from itertools import count
+from itertools import islice
+from itertools import izip
+import struct
+import sys
+
+from gazetteer.normalize import normalize_phrase
+
+
+ROOT = 0
+FREE = -1
+END_DELIM = '$'
+MAGIC = 'SAMTRIE1'
+HEADER = struct.Struct('<8sIII')
+
+
+class TokenTrie(object):
+    """
+    Double-array trie of token sequences.
+    """
+    def __init__(self, sequences=()):
+        """
+        :param sequences: iterable of token sequences to add; tokens are unicode
+        """
+        self.token_ids = {}
+        self.tokens = [None]  # token ids start at 1
+        self.n_sequences = 0
+        self.base = array('i', [0])
+        self.check = array('i', [ROOT])
+        self.terminal = array('b', [0])
+        self.staging = None
+        for tokens in sequences:
+            self.add(tokens)
+
+    def __len__(self):
+        return self.n_sequences
+
+    def _staging_tree(self):
+        """
+        :return dict: the trie as nested dicts of token ids; the key None
+            marks the end of a sequence
+        """
+        if self.staging is None:
+            nodes = {ROOT: {}}
+            if self.terminal[ROOT]:
+                nodes[ROOT][None] = True
+            # A child's slot can come before its parent's, so make every
+            # node's dict first and link them after
+            for t, parent in enumerate(self.check):
+                if t != ROOT and parent != FREE:
+                    nodes[t] = {None: True} if self.terminal[t] else {}
+            for t, parent in enumerate(self.check):
+                if t != ROOT and parent != FREE:
+                    nodes[parent][t - self.base[parent]] = nodes[t]
+            self.staging = nodes[ROOT]
+        return self.staging
+
+    def add(self, tokens):
+        """
+        :param list|tuple tokens: sequence to add
+        :return bool: True if it wasn't already in the trie
+        """
+        node = self._staging_tree()
+        for token in tokens:
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                token_id = self.token_ids[token] = len(self.tokens)
+                self.tokens.append(token)
+            child = node.get(token_id)
+            if child is None:
+                child = node[token_id] = {}
+            node = child
+        if None in node:
+            return False
+        node[None] = True
+        self.n_sequences += 1
+        self.base = None
+        return True
+
+    def _layout(self):
+        """Lay out the staging tree as a double array."""
+        base = array('i', [0])
+        check = array('i', [ROOT])
+        terminal = array('b', [1 if None in self.staging else 0])
+        # next_free[t] leads, through occupied slots, to the first free slot
+        # at or after t; it is path-compressed as it is followed
+        next_free = [1]
+
+        def find_free(t):
+            if t >= len(next_free):
+                return t
+            root = t
+            while root < len(next_free) and next_free[root] != root:
+                root = next_free[root]
+            while t < len(next_free) and next_free[t] != t:
+                next_free[t], t = root, next_free[t]
+            return root
+
+        queue = [(ROOT, self.staging)]
+        for s, node in queue:
+            labels = sorted(label for label in node if label is not None)
+            if not labels:
+                continue
+
+            # Lowest base at which every child's slot is free, trying only
+            # bases that put the first child in a free slot
+            first = labels[0]
+            t = find_free(first + 1)
+            while True:
+                b = t - first
+                for label in labels[1:]:
+                    u = b + label
+                    if u < len(check) and check[u] != FREE:
+                        break
+                else:
+                    break
+                t = find_free(t + 1)
+
+            last = b + labels[-1]
+            if last >= len(check):
+                grow = last + 1 - len(check)
+                base.extend([0] * grow)
+                check.extend([FREE] * grow)
+                terminal.extend([0] * grow)
+                next_free.extend(xrange(len(next_free), len(check)))
+            base[s] = b
+            for label in labels:
+                t = b + label
+                check[t] = s
+                next_free[t] = t + 1
+                child = node[label]
+                terminal[t] = 1 if None in child else 0
+                queue.append((t, child))
+
+        self.base = base
+        self.check = check
+        self.terminal = terminal
+        # add() rebuilds it from the arrays if it's needed again
+        self.staging = None
+
+    def _arrays(self):
+        if self.base is None:
+            self._layout()
+        return self.base, self.check, self.terminal
+
+    def prefix_match(self, tokens, start=0):
+        """
+        :param list|tuple tokens: tokenized text
+        :param int start: where to start matching
+        :return int: end of the shortest sequence in the trie that starts
+            tokens[start:], or -1 if there is none
+        """
+        base, check, terminal = self._arrays()
+        token_ids = self.token_ids
+        n_slots = len(check)
+        s = ROOT
+        for end in xrange(start, len(tokens)):
+            if terminal[s]:
+                return end
+            token_id = token_ids.get(tokens[end])
+            if token_id is None:
+                return -1
+            t = base[s] + token_id
+            if t >= n_slots or check[t] != s:
+                return -1
+            s = t
+        return len(tokens) if terminal[s] else -1
+
+    def __contains__(self, tokens):
+        """
+        :param list|tuple tokens: sequence
+        :return bool: True if exactly this sequence was added
+        """
+        base, check, terminal = self._arrays()
+        s = ROOT
+        for token in tokens:
+            token_id = self.token_ids.get(token)
+            if token_id is None:
+                return False
+            t = base[s] + token_id
+            if t >= len(check) or check[t] != s:
+                return False
+            s = t
+        return bool(terminal[s])
+
+    def any_subsequence(self, tokens):
+        """
+        :param list|tuple tokens: tokenized text
+        :return bool: True if some run of tokens is a sequence in the trie
+        """
+        # prefix_match() from every start, with each token's id looked up once
+        base, check, terminal = self._arrays()
+        n_slots = len(check)
+        token_ids = self.token_ids
+        ids = [token_ids.get(token, 0) for token in tokens]
+        for start in xrange(len(ids)):
+            s = ROOT
+            for token_id in islice(ids, start, None):
+                if terminal[s]:
+                    return True
+                if not token_id:
+                    break
+                t = base[s] + token_id
+                if t >= n_slots or check[t] != s:
+                    break
+                s = t
+            else:
+                if terminal[s]:
+                    return True
+        return False
+
+    def tobytes(self):
+        """
+        :return str: the trie as one flat buffer: a header, the base, check
+            and terminal arrays, the tokens' end offsets, then the tokens,
+            concatenated and utf8-encoded
+        """
+        base, check, terminal = self._arrays()
+        tokens = self.tokens[1:]
+        ends = array('i')
+        end = 0
+        for token in tokens:
+            end += len(token)
+            ends.append(end)
+        arrays = [base, check, terminal, ends]
+        if sys.byteorder != 'little':
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        return ''.join([HEADER.pack(MAGIC, len(check), len(tokens), self.n_sequences)] +
+                       [a.tostring() for a in arrays] + [u''.join(tokens).encode('utf8')])
+
+    @classmethod
+    def frombytes(cls, data):
+        """
+        :param str data: buffer from `tobytes()`
+        :return TokenTrie:
+        :raise ValueError: if it isn't one
+        """
+        if len(data) < HEADER.size:
+            raise ValueError('Not a TokenTrie buffer')
+        magic, n_slots, n_tokens, n_sequences = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a TokenTrie buffer')
+        pos = HEADER.size
+        arrays = []
+        for typecode, n_items in [('i', n_slots), ('i', n_slots), ('b', n_slots), ('i', n_tokens)]:
+            a = array(typecode)
+            end = pos + n_items * a.itemsize
+            if end > len(data):
+                raise ValueError('Truncated TokenTrie buffer')
+            a.fromstring(data[pos:end])
+            if sys.byteorder != 'little':
+                a.byteswap()
+            arrays.append(a)
+            pos = end
+        text = data[pos:].decode('utf8')
+        ends = arrays[3]
+        if ends and ends[-1] != len(text):
+            raise ValueError('Truncated TokenTrie buffer')
+
+        trie = cls()
+        trie.base, trie.check, trie.terminal = arrays[:3]
+        starts = chain([0], ends)
+        trie.tokens.extend(text[start:end] for start, end in izip(starts, ends))
+        trie.token_ids = dict(izip(islice(trie.tokens, 1, None), count(1)))
+        trie.n_sequences = n_sequences
+        return trie
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.tobytes())
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            return cls.frombytes(f.read())
+
+    @classmethod
+    def from_gazetteer(cls, filename):
+        """
+        :param str filename: gazetteer with one or more comma-separated
+            n-grams per line
+        :return TokenTrie: of the normalized n-grams, split on spaces
+        """
+        trie = cls()
+        with codecs.open(filename, 'r', 'utf8') as f:
+            for line in f:
+                for part in line.split(u','):
+                    phrase = normalize_phrase(part)
+                    if phrase:
+                        trie.add(phrase.split(u' '))
+        return trie
+
+
+def write_gazetteer_to_trie_file(filename):
+    """
+    Build a TokenTrie of the gazetteer at `filename` and save it as
+    `<filename>.st`.
+    """
+    TokenTrie.from_gazetteer(filename).save(filename + '.st')
+
+
+def load_trie_from_file(filename):
+    return TokenTrie.load(filename)
+
+
+def trie_append(parts, trie):
+    """
+    Append a list of tokens, ending with the end delimiter, to a trie of
+    nested dicts. Destructive.
+    Assumes tokens are at least len 2.
+    """
+    node = trie
+    last = len(parts) - 2
+    for i, x in enumerate(parts[:-1]):
+        if i == last:
+            node.setdefault(x, {})[parts[-1]] = None
+        else:
+            node = node.setdefault(x, {})
+    return trie
+
+
+def _trie_check(tokens, trie, end_delim=END_DELIM, start=0):
+    """
+    Check whether a sequence in the trie of nested dicts starts tokens[start:].
+    Greedily quits when an end delimiter is found.
+    """
+    node = trie
+    for i in xrange(start, len(tokens)):
+        # End delimiter is found
+        if end_delim in node:
+            return True
+        node = node.get(tokens[i])
+        if not node:
+            return False
+    return end_delim in node
+
+
+def trie_subseq(seq, trie):
+    """
+    Checks for any matching subsequence in seq in the trie of nested dicts.
+    """
+    for i in xrange(len(seq)):
+        if _trie_check(seq, trie, start=i):
+            return True
+    return False
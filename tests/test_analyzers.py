@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from analyzers import ANALYZERS
+
+
+class FakeJob(object):
+    options = None
+
+
+def test_builtin_analyzers_registered():
+    nose.tools.eq_(sorted(ANALYZERS),
+                   ['keywords', 'mention_graph', 'salone', 'user_tweets', 'west_africa_users'])
+
+
+def test_mention_graph_thresholds_only_in_reduce():
+    analyzer = ANALYZERS['mention_graph'](FakeJob())
+    # Per-mapper partial weights are kept whatever their size
+    nose.tools.eq_(list(analyzer.combine('a@b', [(1, 0), (0, 1)])), [('a@b', [1, 1])])
+
+    fixtures = (
+        ([(1, 1), (1, 1)], ['a@b\t2\t2']),
+        ([(1, 1), (1, 0)], []),
+    )
+    for (values, lines) in fixtures:
+        yield nose.tools.eq_, list(analyzer.reduce('a@b', values)), lines
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+from urllib2 import urlparse
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.authors import ScreenNameCache
+from trec_ingest.authors import parse_screen_name
+
+
+def test_parse_screen_name():
+    fixtures = (
+        ('http://twitter.com/SomeOne', 'someone'),
+        ('http://twitter.com/@SomeOne', 'someone'),
+        (u'https://twitter.com/@SomeOne/', 'someone'),
+        ('http://twitter.com/@SomeOne?lang=en', 'someone'),
+        (u'http://twitter.com/K\xc9L\xc9', 'k\xc3\xa9l\xc3\xa9'),
+        ('http://twitter.com/K\xc3\x89L\xc3\x89', 'k\xc3\xa9l\xc3\xa9'),
+    )
+    for (href, name) in fixtures:
+        yield nose.tools.eq_, parse_screen_name(href), name
+    for href in ['http://twitter.com', 'http://twitter.com/', 'http://twitter.com/@']:
+        yield nose.tools.assert_raises, ValueError, parse_screen_name, href
+
+
+def test_agrees_with_old_extraction():
+    # The two ways the jobs used to do it, each on the links it handled
+    def split_at(href):
+        return urlparse.urlsplit(href).path.split('@')[1].lower().encode('utf8')
+
+    def split_slash(href):
+        return href.split('/')[-1].lower().decode('utf8').encode('utf8')
+
+    for name in ['cnn', 'Boo_Boot', 'who']:
+        yield nose.tools.eq_, parse_screen_name('http://twitter.com/@' + name), split_at('http://twitter.com/@' + name)
+        yield nose.tools.eq_, parse_screen_name('http://twitter.com/' + name), split_slash('http://twitter.com/' + name)
+
+
+def test_screen_name_cache():
+    cache = ScreenNameCache(4)
+    for i in xrange(10):
+        nose.tools.eq_(cache('http://twitter.com/User{}'.format(i % 6)), 'user{}'.format(i % 6))
+        nose.tools.ok_(len(cache) <= 4)
+    # A link used again stays cached as others come and go
+    for i in xrange(10):
+        cache('http://twitter.com/Hot')
+        cache('http://twitter.com/Cold{}'.format(i))
+        nose.tools.ok_('http://twitter.com/Hot' in cache.young or 'http://twitter.com/Hot' in cache.old)
+    nose.tools.assert_raises(ValueError, cache, 'http://twitter.com/')
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.cache import ChunkCache
+
+
+def put(cache, aws_path, data):
+    f = cache.create()
+    f.write(data)
+    cache.commit(f, aws_path).close()
+
+
+def test_cache_round_trip():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = ChunkCache(cache_dir, 1000)
+        nose.tools.eq_(cache.open('bucket/a.xz.gpg'), None)
+
+        put(cache, 'bucket/a.xz.gpg', 'abc')
+        f = cache.open('bucket/a.xz.gpg')
+        nose.tools.eq_(f.read(), 'abc')
+        f.close()
+
+        # No temporary files are left behind by a commit
+        names = [name for _, _, names in os.walk(cache_dir) for name in names]
+        nose.tools.eq_(sorted(names), sorted(['.evict.lock', os.path.basename(cache.path('bucket/a.xz.gpg'))]))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+def test_cache_evicts_least_recently_used():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cache = ChunkCache(cache_dir, 25)
+        put(cache, 'a', 'x' * 10)
+        os.utime(cache.path('a'), (1, 1))
+        put(cache, 'b', 'x' * 10)
+        os.utime(cache.path('b'), (2, 2))
+
+        # A hit makes 'a' the most recently used
+        cache.open('a').close()
+        put(cache, 'c', 'x' * 10)
+
+        fixtures = (
+            ('a', True),
+            ('b', False),
+            ('c', True),
+        )
+        for (aws_path, present) in fixtures:
+            yield nose.tools.eq_, os.path.exists(cache.path(aws_path)), present
+    finally:
+        shutil.rmtree(cache_dir)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from MRGetTweetGraph import EdgeWeights
+from MRGetTweetGraph import MRGetTweetGraph
+
+
+def test_edge_weights():
+    weights = EdgeWeights()
+    nose.tools.eq_(weights.add('a@b', (1, 0)), [])
+    nose.tools.eq_(weights.add('a@c', (0, 1)), [])
+    nose.tools.eq_(weights.add('a@b', (0, 1)), [])
+    nose.tools.eq_(len(weights), 2)
+    nose.tools.eq_(sorted(weights.flush()), [('a@b', [1, 1]), ('a@c', [0, 1])])
+    nose.tools.eq_(len(weights), 0)
+    nose.tools.eq_(weights.flush(), [])
+
+
+def test_edge_weights_eviction():
+    weights = EdgeWeights(4)
+    records = []
+    for edge_name, edge_weight in [('news@a', (1, 0)), ('news@a', (0, 1)), ('news@a', (1, 0)),
+                                   ('b@news', (0, 1)), ('b@news', (1, 0)),
+                                   ('c@news', (1, 0)), ('d@news', (0, 1))]:
+        records.extend(weights.add(edge_name, edge_weight))
+    # The lighter half is handed on when the fourth edge comes in
+    nose.tools.eq_(sorted(records), [('c@news', [1, 0]), ('d@news', [0, 1])])
+    nose.tools.eq_(sorted(weights.flush()), [('b@news', [1, 1]), ('news@a', [2, 1])])
+
+
+def test_combiner_keeps_light_edges():
+    # Edges below the threshold in one mapper may pass it across all of them
+    job = MRGetTweetGraph(args=[])
+    nose.tools.eq_(list(job.combiner('a@b', [(1, 0), (0, 1)])), [('a@b', [1, 1])])
+    nose.tools.eq_(list(job.reducer('a@b', [[1, 1], [1, 0]])), [])
+    nose.tools.eq_(list(job.reducer('a@b', [[1, 1], [1, 1]])), [(None, 'a@b\t2\t2')])
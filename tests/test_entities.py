@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import random
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.entities import scan_entities
+from trec_ingest.entities import scan_mentions
+from twokenize import simpleTokenize
+
+
+def twokenize_entities(text):
+    tokens = simpleTokenize(text)
+    return [tok[1:] for tok in tokens if tok[0] == '@'], [tok[1:] for tok in tokens if tok[0] == '#']
+
+
+def test_agrees_with_twokenize():
+    fixtures = [
+        u'RT @WHO: #Ebola outbreak in #Liberia - 1,234 cases http://t.co/AbC123 :(',
+        u'"We need more beds" says MSF doctor (via @nytimes)',
+        u'.@CDCgov: wash your hands! #ebola #SaloneStrong',
+        u'RT@foo @Bar_1, @baz... #tag2go',
+        u'stay safe everyone',
+        u'',
+    ]
+    rng = random.Random(0)
+    words = [u'ebola', u'in', u'Liberia', u'@who', u'@MSF_USA:', u'#ebola', u'#Sierra_Leone!', u'(@nytimes)',
+             u'RT', u'http://t.co/x', u'12:30', u':)', u'...', u'"quote"', u'U.S.', u'❤', u'-']
+    fixtures.extend(u' '.join(rng.choice(words) for _ in xrange(rng.randint(1, 15))) for _ in xrange(200))
+    for text in fixtures:
+        yield nose.tools.eq_, scan_entities(text), twokenize_entities(text)
+
+
+def test_twitter_rules():
+    fixtures = (
+        (u"@user's hat", ([u'user'], [])),
+        (u'me@example.com @foo@bar @_@ a @ b', ([], [])),
+        (u'@' + u'a' * 20 + u' @' + u'a' * 21, ([u'a' * 20], [])),
+        (u'#1 #a#b &#39; x#tag', ([], [])),
+        (u'#Guinée', ([], [u'Guinée'])),
+        (u'＠fullwidth ＃fullwidth', ([u'fullwidth'], [u'fullwidth'])),
+        ('RT @WHO: #ebola'.encode('utf8'), ([u'WHO'], [u'ebola'])),
+    )
+    for (text, entities) in fixtures:
+        yield nose.tools.eq_, scan_entities(text), entities
+        yield nose.tools.eq_, scan_mentions(text), entities[0]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from gazetteer.compiler import GazetteerError
+from gazetteer.compiler import compile_gazetteer
+from gazetteer.compiler import load_index
+from gazetteer.normalize import normalize_phrase
+
+
+def test_normalize_phrase():
+    fixtures = (
+        (u'Sierra Leone\n', u'sierra leone'),
+        (u'  #Ebola   outbreak ', u'ebola outbreak'),
+        (u'Conakry # Guinea', u'conakry guinea'),
+        # Decomposed e + combining acute accent
+        (u'Kouassi-Aflékro', u'kouassi-afl\xe9kro'),
+        (u'\n', u''),
+    )
+    for (line, phrase) in fixtures:
+        yield nose.tools.eq_, normalize_phrase(line), phrase
+
+
+def write_gazetteer(path, lines):
+    with codecs.open(path, 'w', 'utf8') as f:
+        f.write(u'\n'.join(lines) + u'\n')
+
+
+def test_compile_gazetteer():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'places.csv')
+        write_gazetteer(source, [u'Monrovia', u'#Freetown', u'', u'monrovia'])
+
+        output, rebuilt = compile_gazetteer(source)
+        nose.tools.eq_(output, source + '.idx')
+        nose.tools.ok_(rebuilt)
+        nose.tools.eq_(load_index(output), set([u'monrovia', u'freetown']))
+
+        # Unchanged source: the index is kept
+        nose.tools.eq_(compile_gazetteer(source), (output, False))
+        nose.tools.eq_(compile_gazetteer(source, force=True), (output, True))
+
+        write_gazetteer(source, [u'Monrovia', u'Kenema'])
+        nose.tools.eq_(compile_gazetteer(source), (output, True))
+        nose.tools.eq_(load_index(output), set([u'monrovia', u'kenema']))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_corrupt_index():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'places.csv')
+        write_gazetteer(source, [u'Monrovia', u'Freetown'])
+        output, _ = compile_gazetteer(source)
+        with open(output, 'rb') as f:
+            data = f.read()
+        with open(output, 'wb') as f:
+            f.write(data[:-10])
+        nose.tools.assert_raises(GazetteerError, load_index, output)
+        # A damaged index gets rebuilt even though the source is unchanged
+        nose.tools.eq_(compile_gazetteer(source), (output, True))
+        nose.tools.eq_(load_index(output), set([u'monrovia', u'freetown']))
+    finally:
+        shutil.rmtree(tmp_dir)
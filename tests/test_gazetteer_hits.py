@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from gazetteer import GazetteerIndex
+from MRGazetteerHits import HitCounter
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+def test_hit_counter():
+    counter = HitCounter(GazetteerIndex([('places', [u'guinea', u'sierra leone']),
+                                         ('terms', [u'ebola', u'guinea'])]))
+    day = epoch_from_timestamp('2014-08-01T12:00:00Z')
+    next_day = epoch_from_timestamp('2014-08-02T00:00:00Z')
+    nose.tools.eq_(counter.add_tweet(u'ebola in guinea , guinea'.split(), day), 3)
+    nose.tools.eq_(counter.add_tweet(u'guinea'.split(), day), 1)
+    nose.tools.eq_(counter.add_tweet(u'sierra leone'.split(), next_day), 1)
+    nose.tools.eq_(counter.add_tweet(u'nothing here'.split(), next_day), 0)
+    nose.tools.eq_(len(counter), 3)
+
+    nose.tools.eq_(sorted(counter.flush()),
+                   [('2014-08-01\tplaces,terms\tguinea', [3, 2]),
+                    ('2014-08-01\tterms\tebola', [1, 1]),
+                    ('2014-08-02\tplaces\tsierra leone', [1, 1])])
+    nose.tools.eq_(len(counter), 0)
+
+
+def test_hit_counter_normalizes_tokens():
+    counter = HitCounter(GazetteerIndex([('places', [u'monrovia', u'liberia', u'afl\xe9kro'])]))
+    day = epoch_from_timestamp('2014-08-01T12:00:00Z')
+    nose.tools.eq_(counter.add_tweet([u'Monrovia', u',', u'#Liberia', u'Afle\u0301kro'], day), 3)
+
+
+def test_text_features_normalize_tokens():
+    from MRTwitterWestAfricaUsers import WEST_AFRICA_PLACES
+    from MRTwitterWestAfricaUsers import get_text_features
+
+    gazetteers = GazetteerIndex([('west africa', [u'liberia']), ('other places', []), ('crisislex', [])])
+    for text in [u'News from Liberia', u'#LIBERIA today']:
+        nose.tools.eq_(get_text_features(text, u'someone', gazetteers)[0], WEST_AFRICA_PLACES)
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+from array import array
+import os
+import sys
+
+import marisa_trie
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from gazetteer import GazetteerIndex
+from gazetteer import TokenMatcher
+
+
+PHRASES = [u'sierra leone', u'guinea', u'new york city', u'york', u'lib', u'west africa ebola']
+
+
+def any_word_subsequence_in_trie(tweet_tokens, trie):
+    """
+    The check TokenMatcher replaced: a marisa prefix lookup on each suffix.
+    :param list|tuple tweet_tokens: tokenized tweet
+    :param marisa_trie.Trie trie: trie of phrases
+    :return bool: True if some suffix of the tweet starts with a phrase, else False
+    """
+    if len(tweet_tokens) == 0:
+        return False
+    cur_uni = tweet_tokens[-1]
+    if len(trie.prefixes(cur_uni)) > 0:
+        return True
+    for i in xrange(len(tweet_tokens) - 2, -1, -1):
+        cur_uni = tweet_tokens[i] + ' ' + cur_uni
+        if len(trie.prefixes(cur_uni)) > 0:
+            return True
+    return False
+
+
+def test_matches():
+    matcher = TokenMatcher(PHRASES)
+    fixtures = (
+        (u'in sierra leone today', [(1, 3, u'sierra leone')]),
+        # The last word of a phrase only has to start a token
+        (u'sierra leonean doctors', [(0, 2, u'sierra leone')]),
+        (u'liberian', [(0, 1, u'lib')]),
+        (u'new york city', [(0, 3, u'new york city'), (1, 2, u'york')]),
+        (u'west africa west africa ebola', [(2, 5, u'west africa ebola')]),
+        # Tokens aren't lowercased
+        (u'Guinea', []),
+        (u'', []),
+        (u'leone sierra', []),
+    )
+    for (text, matches) in fixtures:
+        yield nose.tools.eq_, sorted(matcher.matches(text.split())), matches
+
+
+def test_any_match_agrees_with_trie():
+    matcher = TokenMatcher(PHRASES)
+    trie = marisa_trie.Trie(PHRASES)
+    fixtures = (
+        [u'going', u'to', u'new', u'york'],
+        [u'new', u'yorkers'],
+        [u'new', u'jersey', u'city'],
+        [u'guineapig'],
+        [u'the', u'west', u'africa', u'ebolavirus'],
+        [u'sierra', u'le'],
+        [],
+        # Tokens with spaces in them, e.g. from twokenize's protected spans
+        [u'sierra leone'],
+        [u'in', u'sierra', u'leone x'],
+        [u'x new', u'york', u'city'],
+    )
+    for tokens in fixtures:
+        yield nose.tools.eq_, matcher.any_match(tokens), any_word_subsequence_in_trie(tokens, trie)
+
+
+def test_gazetteer_index():
+    index = GazetteerIndex([('places', [u'sierra leone', u'guinea', u'york']),
+                            ('terms', [u'ebola', u'york'])])
+    nose.tools.eq_(index.label_bit('terms'), 2)
+    fixtures = (
+        (u'ebola in guinea', 3, [u'ebola', u'guinea']),
+        (u'new york', 3, [u'york']),
+        (u'sierra leone', 1, [u'sierra leone']),
+        (u'nothing here', 0, []),
+    )
+    for (text, labels, phrases) in fixtures:
+        tokens = text.split()
+        scan_labels, entry_ids = index.scan(tokens)
+        yield nose.tools.eq_, scan_labels, labels
+        yield nose.tools.eq_, index.match_labels(tokens), labels
+        yield nose.tools.eq_, [index.entries[entry_id] for entry_id in entry_ids], phrases
+
+
+def test_find_hits():
+    matcher = TokenMatcher(PHRASES)
+    hits = array('i')
+    fixtures = (
+        [u'new', u'york', u'city'],
+        [u'sierra', u'leonean', u'doctors', u'in', u'guinea'],
+        [u'nothing', u'here'],
+        [u'x new', u'york', u'city'],
+    )
+    for tokens in fixtures:
+        del hits[:]
+        n_hits = matcher.find_hits(tokens, hits)
+        triples = [(hits[i + 1], hits[i + 2], hits[i]) for i in xrange(0, len(hits), 3)]
+        yield nose.tools.eq_, n_hits, len(triples)
+        yield nose.tools.eq_, triples, list(matcher.entry_matches(tokens))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest import stream
+from trec_ingest.stream import DecryptedStream
+from trec_ingest.stream import GpgKeyring
+from trec_ingest.stream import IngestError
+
+
+@nose.tools.raises(IngestError)
+def test_missing_key():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        GpgKeyring(os.path.join(tmp_dir, 'nope.private'), tmp_dir, shared=True).home()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_shared_home_must_be_private():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        key_path = os.path.join(tmp_dir, 'key.private')
+        with open(key_path, 'w') as f:
+            f.write('not really a key')
+        nose.tools.assert_raises_regexp(IngestError, 'gpg --import failed',
+                                        GpgKeyring(key_path, tmp_dir, shared=True).home)
+
+        homes = [name for name in os.listdir(tmp_dir) if name.startswith('trec-ingest-gpg-')]
+        nose.tools.eq_(len(homes), 1)
+        os.chmod(os.path.join(tmp_dir, homes[0]), 0755)
+        nose.tools.assert_raises_regexp(IngestError, 'not a private directory',
+                                        GpgKeyring(key_path, tmp_dir, shared=True).home)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+class SleepingKeyring(object):
+    """Stands in for a GpgKeyring whose gpg writes its pid and waits."""
+    def __init__(self, pid_path):
+        self.pid_path = pid_path
+
+    def decrypt_command(self):
+        return [sys.executable, '-c',
+                'import os, time; open({!r}, "w").write(str(os.getpid())); time.sleep(60)'.format(self.pid_path)]
+
+
+def test_missing_decompressor_reaps_gpg():
+    tmp_dir = tempfile.mkdtemp()
+    stream.DECOMPRESSORS['.nope'] = [os.path.join(tmp_dir, 'no-such-decompressor')]
+    try:
+        pid_path = os.path.join(tmp_dir, 'gpg.pid')
+        with tempfile.TemporaryFile() as encrypted_f:
+            nose.tools.assert_raises_regexp(IngestError, 'could not start',
+                                            DecryptedStream, encrypted_f, SleepingKeyring(pid_path),
+                                            'chunk.nope.gpg')
+        if os.path.exists(pid_path):
+            with open(pid_path) as f:
+                pid = int(f.read())
+            with nose.tools.assert_raises(OSError) as cm:
+                os.kill(pid, 0)
+            nose.tools.eq_(cm.exception.errno, errno.ESRCH)
+    finally:
+        del stream.DECOMPRESSORS['.nope']
+        shutil.rmtree(tmp_dir)
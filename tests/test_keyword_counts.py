@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from MRGetUsersUsingKeywords import get_keyword_counts
+from MRGetUsersUsingKeywords import keyword_counts_line
+from MRGetUsersUsingKeywords import keyword_index
+from MRGetUsersUsingKeywords import keyword_tokens
+from MRGetUsersUsingKeywords import load_keywords
+from MRGetUsersUsingKeywords import merge_keyword_counts
+
+
+def test_load_keywords():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tmp_dir, 'keywords.csv')
+        with codecs.open(filename, 'w', 'utf8') as f:
+            f.write(u'Conakry\nguinéenews\n\nconakry\nsalone\n')
+        nose.tools.eq_(load_keywords(filename), [u'conakry', u'guin\xe9enews', u'salone'])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_keyword_tokens():
+    index = keyword_index([u'conakry', u'guin\xe9enews'])
+    tokens = keyword_tokens(u'#Conakry via GUINE\u0301ENEWS')
+    nose.tools.eq_(tokens, set([u'conakry', u'via', u'guin\xe9enews']))
+    nose.tools.eq_(get_keyword_counts(tokens, index), [(0, 1), (1, 1)])
+
+
+def test_keyword_counts():
+    keywords = [u'conakry', u'ebola', u'salone']
+    index = keyword_index(keywords)
+    fixtures = (
+        (set([u'salone', u'in', u'conakry']), [(0, 1), (2, 1)]),
+        (set([u'nothing', u'here']), []),
+    )
+    for (tokens, counts) in fixtures:
+        yield nose.tools.eq_, get_keyword_counts(tokens, index), counts
+
+    merged = merge_keyword_counts([(1, [(0, 1), (2, 1)]), (1, [(2, 1)]), (5, [])])
+    yield nose.tools.eq_, merged, (7, [(0, 1), (2, 2)])
+    # Partial sums merge the same way again
+    yield nose.tools.eq_, merge_keyword_counts([merged, (1, [(1, 1)])]), (8, [(0, 1), (1, 1), (2, 2)])
+    yield nose.tools.eq_, keyword_counts_line('who', 7, merged[1], len(keywords)), 'who,7,1,0,2'
+    yield nose.tools.eq_, keyword_counts_line('Null User', 3, [], len(keywords)), 'Null User,3,0,0,0'
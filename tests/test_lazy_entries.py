@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+import zlib
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Entry
+
+from trec_ingest.lazy import LazyEntry
+
+
+def make_entry():
+    entry = Entry()
+    tweet = entry.feed_entry
+    author = tweet.author.add()
+    author.name = u'who (World Health Organization)'
+    author.link.add().href = 'http://twitter.com/who'
+    tweet.title = u'#Ebola à Conakry @cnn'
+    tweet.last_published = '2014-03-01T12:34:56Z'
+    tweet.spam_probability = 0.25
+    tweet.hashcode = 'abc'
+    tweet.lang.add().code = 'fr'
+    tweet.content.mime_type = 'text/plain'
+    tweet.content.data = zlib.compress('x' * 1000)
+    return entry
+
+
+def test_lazy_entry_fields():
+    entry = make_entry()
+    lazy = LazyEntry(entry.SerializeToString())
+    fixtures = (
+        ('title', entry.feed_entry.title),
+        ('last_published', entry.feed_entry.last_published),
+        ('spam_probability', entry.feed_entry.spam_probability),
+        ('author', list(entry.feed_entry.author)),
+        ('lang', list(entry.feed_entry.lang)),
+        ('content', entry.feed_entry.content),
+        ('hashcode', entry.feed_entry.hashcode),
+    )
+    for (name, value) in fixtures:
+        yield nose.tools.eq_, getattr(lazy.feed_entry, name), value
+
+
+def test_lazy_entry_skipped_bytes():
+    entry = make_entry()
+    lazy = LazyEntry(entry.SerializeToString())
+    nose.tools.eq_(lazy.skipped_bytes(), len(entry.SerializeToString()))
+
+    lazy.feed_entry.spam_probability
+    lazy.feed_entry.author
+    skipped = lazy.skipped_bytes()
+    nose.tools.ok_(skipped > len(entry.feed_entry.content.SerializeToString()))
+
+    lazy.feed_entry.content
+    nose.tools.ok_(lazy.skipped_bytes() < skipped - len(entry.feed_entry.content.data))
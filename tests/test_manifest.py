@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import datetime
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.manifest import ManifestError
+from trec_ingest.manifest import filter_manifest
+from trec_ingest.manifest import parse_date_range
+
+
+def test_parse_date_range():
+    fixtures = (
+        ('2014-02-01:2014-11-30', (datetime.date(2014, 2, 1), datetime.date(2014, 11, 30))),
+        ('2014-02-01:', (datetime.date(2014, 2, 1), None)),
+        (':2014-11-30', (None, datetime.date(2014, 11, 30))),
+    )
+    for (date_range, parsed) in fixtures:
+        yield nose.tools.eq_, parse_date_range(date_range), parsed
+
+
+@nose.tools.raises(ManifestError)
+def test_parse_date_range_backwards():
+    parse_date_range('2014-11-30:2014-02-01')
+
+
+def test_filter_manifest():
+    lines = [
+        '2014-01-31\t10\ts3://bucket/2014-01-31-23/a.xz.gpg\n',
+        '2014-02-01\t10\ts3://bucket/2014-02-01-00/b.xz.gpg\n',
+        '2014-11-30 23:10:00  30  s3://bucket/2014-11-30-23/c.xz.gpg\n',
+        '2014-12-01\t99\ts3://bucket/2014-12-01-00/d.xz.gpg\n',
+        'not a line\n',
+        '2014-06-01\t20\ts3://bucket/2014-06-01-00/e.xz.gpg',
+    ]
+    kept, n_out_of_range, malformed = filter_manifest(lines, datetime.date(2014, 2, 1), datetime.date(2014, 11, 30))
+    nose.tools.eq_([line.split()[-1][-8:] for line in kept], ['c.xz.gpg', 'e.xz.gpg', 'b.xz.gpg'])
+    nose.tools.eq_(n_out_of_range, 2)
+    nose.tools.eq_(malformed, ['not a line\n'])
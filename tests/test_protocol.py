@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from mrjob.protocol import PickleProtocol
+
+from MRGetUsersUsingKeywords import KeywordCountsProtocol
+from MRTwitterWestAfricaUsers import MRTwitterWestAfricaUsers
+from trec_ingest.protocol import VarintProtocol
+from trec_ingest.protocol import decode_varints
+from trec_ingest.protocol import encode_varints
+
+
+def test_varints():
+    fixtures = (
+        [],
+        [0, 1, 9, 10, 13, 63],
+        [64, 4095, 4096, 86400 * 365, 2 ** 70],
+    )
+    for ints in fixtures:
+        data = encode_varints(ints)
+        yield nose.tools.eq_, decode_varints(data), ints
+        yield nose.tools.ok_, not set('\t\n\r') & set(data)
+    yield nose.tools.eq_, len(encode_varints([63, 64, 4095, 4096])), 1 + 2 + 2 + 3
+    yield nose.tools.assert_raises, ValueError, encode_varints, [1, -1]
+    for data in ['\n', '\xc0', '\x41']:
+        yield nose.tools.assert_raises, ValueError, decode_varints, data
+
+
+def test_varint_protocol():
+    protocol = VarintProtocol()
+    line = protocol.write(u'guinée', (3, 1, 3600))
+    nose.tools.eq_(line.split('\t')[0], 'guin\xc3\xa9e')
+    nose.tools.eq_(protocol.read(line), ('guin\xc3\xa9e', [3, 1, 3600]))
+    nose.tools.assert_raises(ValueError, protocol.write, 'a\tb', [1])
+
+    protocol = KeywordCountsProtocol()
+    for value in [(7, [(0, 1), (2, 2)]), (3, [])]:
+        nose.tools.eq_(protocol.read(protocol.write('who', value)), ('who', value))
+
+
+def test_west_africa_stats_shuffle_as_varints():
+    for args, stats_step in [([], 1), (['--one-step'], 0)]:
+        job = MRTwitterWestAfricaUsers(args=args)
+        read, write = job.pick_protocols(stats_step, 'mapper')
+        nose.tools.eq_(write.im_class, VarintProtocol)
+        for step_type in ('combiner', 'reducer'):
+            read, write = job.pick_protocols(stats_step, step_type)
+            nose.tools.eq_(read.im_class, VarintProtocol)
+    # The first of two steps shuffles tweets
+    read, write = MRTwitterWestAfricaUsers(args=[]).pick_protocols(0, 'mapper')
+    nose.tools.eq_(write.im_class, PickleProtocol)
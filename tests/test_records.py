@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+from backports import lzma
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from MRUsersToTweets import MRUsersToTweets
+from MRUsersToTweets import partition_path
+from MRUsersToTweets import user_bucket
+from trec_ingest.records import RecordFileReader
+from trec_ingest.records import RecordFileWriter
+
+
+def write_records(path, records, block_bytes):
+    writer = RecordFileWriter(path, block_bytes)
+    for record in records:
+        writer.append(record)
+    return writer.close()
+
+
+def test_record_files():
+    records = ['', 'a', 'tab\tand\nnewline', '\x00' * 100000] + ['record {}'.format(i) for i in xrange(500)]
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'records')
+        for block_bytes in [1, 1000, 1 << 20]:
+            nose.tools.eq_(write_records(path, records, block_bytes), len(records))
+            reader = RecordFileReader(path + '.xz')
+            nose.tools.eq_(len(reader), len(records))
+            nose.tools.eq_(list(reader), records)
+            for start in [0, 3, 4, 250, 503, 504]:
+                nose.tools.eq_(list(reader.records(start)), records[start:])
+
+            # The blocks read as one xz file
+            with open(path + '.xz', 'rb') as f:
+                data = lzma.decompress(f.read())
+            nose.tools.eq_(len(data), sum(4 + len(record) for record in records))
+        nose.tools.eq_(sorted(os.listdir(tmp_dir)), ['records.idx', 'records.xz'])
+
+        nose.tools.eq_(write_records(path, [], 1000), 0)
+        nose.tools.eq_(list(RecordFileReader(path)), [])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_truncated_record_file():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'records')
+        write_records(path, ['record {}'.format(i) for i in xrange(100)], 1 << 20)
+        with open(path + '.xz', 'rb') as f:
+            data = f.read()
+        with open(path + '.xz', 'wb') as f:
+            f.write(data[:-20])
+        nose.tools.assert_raises(ValueError, list, RecordFileReader(path))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_partitions():
+    nose.tools.eq_(user_bucket('someone', 1), 0)
+    buckets = [user_bucket('user{}'.format(i)) for i in xrange(1000)]
+    nose.tools.eq_(set(buckets), set(range(16)))
+    # crc32 is the same on every platform and in every process
+    nose.tools.eq_(user_bucket('ebola_alert', 1 << 32), 0x9a4ee8f5)
+    nose.tools.eq_(partition_path('/out', '2014-03-01', 7), '/out/2014-03-01/users-007')
+    nose.tools.eq_(partition_path('s3://bucket/out', '2014-03-01', 7), 's3://bucket/out/2014-03-01/users-007')
+
+
+def test_tweets_dir():
+    nose.tools.eq_(MRUsersToTweets(args=['--tweets-dir', 's3://bucket/out']).options.tweets_dir, 's3://bucket/out')
+    nose.tools.eq_(MRUsersToTweets(args=['--tweets-dir', '/out']).options.tweets_dir, '/out')
+    for args in [[], ['--tweets-dir', 'out']]:
+        nose.tools.assert_raises(ValueError, MRUsersToTweets, args=args)
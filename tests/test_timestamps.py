@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import calendar
+import os
+import sys
+
+import dateutil
+import dateutil.parser
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+def dateutil_epoch(timestamp):
+    return calendar.timegm(dateutil.parser.parse(timestamp).utctimetuple())
+
+
+def test_epoch_from_timestamp_matches_dateutil():
+    fixtures = (
+        '2014-03-01T12:34:56Z',
+        u'2014-11-30T23:59:59Z',
+        '1970-01-01T00:00:00Z',
+        '2012-02-29T06:00:00Z',
+        '2000-03-01T00:00:00Z',
+        '2014-03-01 12:34:56',
+        '2014-03-01T12:34:56.250Z',
+        '2014-03-01T12:34:56+01:00',
+        '2014-03-01T00:34:56-0530',
+        'Sat, 01 Mar 2014 12:34:56 GMT',
+    )
+    for timestamp in fixtures:
+        yield nose.tools.eq_, epoch_from_timestamp(timestamp), dateutil_epoch(timestamp)
+
+
+@nose.tools.raises(ValueError)
+def test_epoch_from_timestamp_invalid_date():
+    epoch_from_timestamp('2014-02-29T00:00:00Z')
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.tokens import TokenCache
+from twokenize import simpleTokenize
+
+
+def test_token_cache():
+    cache = TokenCache(100)
+    texts = [u'RT @who: #ebola in Liberia http://t.co/x', u'stay safe', u'RT @who: #ebola in Liberia http://t.co/x']
+    for text in texts:
+        yield nose.tools.eq_, cache(text), simpleTokenize(text)
+    nose.tools.eq_((cache.hits, cache.misses), (1, 2))
+
+
+def test_token_cache_is_bounded():
+    calls = []
+
+    def tokenize(text):
+        calls.append(text)
+        return text.split()
+
+    cache = TokenCache(4, tokenize)
+    for i in xrange(20):
+        cache(u'hot tweet')
+        cache(u'tweet {}'.format(i))
+        nose.tools.ok_(len(cache) <= 4)
+    # The text seen every other call is only tokenized once
+    nose.tools.eq_(calls.count(u'hot tweet'), 1)
+    nose.tools.eq_((cache.hits, cache.misses), (19, 21))
@@ -8,6 +8,7 @@ import nose
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
+from sam_trie.trie import TokenTrie
 from sam_trie.trie import trie_append, _trie_check, trie_subseq
 
 def test_trie_append():
@@ -79,4 +80,48 @@ def test_trie_subseq():
         z = trie_subseq(x, trie)
 
         yield nose.tools.eq_, z, y
-    
+
+
+def test_token_trie():
+    def tokenize(s):
+        return s.split(' ')
+
+    trie = TokenTrie([tokenize(u'Green Eggs'), tokenize(u'Green Balls'), tokenize(u'Red')])
+    dict_trie = {}
+    for phrase in [u'Green Eggs', u'Green Balls', u'Red']:
+        trie_append(tokenize(phrase) + ['$'], dict_trie)
+
+    fixtures = (
+            (tokenize(u'Good Morning Green Demon'), False),
+            (tokenize(u'Hello Green Balls There'), True),
+            (tokenize(u'Green Balls'), True),
+            (tokenize(u'Green'), False),
+            (tokenize(u'Seeing Red'), True),
+            ([], False)
+            )
+    # Saved and loaded, or added to after loading, it finds the same
+    loaded = TokenTrie.frombytes(trie.tobytes())
+    grown = TokenTrie.frombytes(trie.tobytes())
+    grown.add(tokenize(u'Blue \u00e9clair'))
+    for (x, y) in fixtures:
+        yield nose.tools.eq_, trie.any_subsequence(x), y
+        yield nose.tools.eq_, trie_subseq(x, dict_trie), y
+        yield nose.tools.eq_, loaded.any_subsequence(x), y
+        yield nose.tools.eq_, grown.any_subsequence(x), y
+    yield nose.tools.ok_, grown.any_subsequence(tokenize(u'a Blue \u00e9clair'))
+    yield nose.tools.eq_, len(grown), 4
+
+
+def test_token_trie_contains():
+    trie = TokenTrie([(u'Green', u'Eggs'), (u'Green',)])
+    fixtures = (
+            ((u'Green', u'Eggs'), True),
+            ((u'Green',), True),
+            ((u'Eggs',), False),
+            ((), False),
+            )
+    for (x, y) in fixtures:
+        yield nose.tools.eq_, x in trie, y
+    yield nose.tools.eq_, trie.prefix_match([u'Green', u'Eggs']), 1
+    yield nose.tools.eq_, trie.prefix_match([u'Red', u'Green', u'Eggs'], 1), 2
+    yield nose.tools.assert_raises, ValueError, TokenTrie.frombytes, trie.tobytes()[:-2]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.store import TweetStore
+from trec_ingest.store import TweetStoreWriter
+from trec_ingest.store import day_table_path
+
+
+def test_tweet_store_round_trip():
+    store_dir = tempfile.mkdtemp()
+    try:
+        records = [
+            (u'http://twitter.com/cnn', u'cnn (CNN)', 1393632000, u'#Ebola in Guinée', u'fr', 0.25, 'x\x00y'),
+            (u'http://twitter.com/who', u'who (WHO)', 1393632061, u'', u'en', 0.75, ''),
+            (u'http://twitter.com/cnn', u'cnn (CNN)', 1393718399, u'@who hi', u'en', 0.0, 'z'),
+        ]
+        writer = TweetStoreWriter(store_dir, '2014-03-01')
+        for record in records:
+            writer.append(record)
+        nose.tools.eq_(writer.close(), 3)
+
+        store = TweetStore(day_table_path(store_dir, '2014-03-01'))
+        nose.tools.eq_(store.decoded_dictionary('users'), [u'http://twitter.com/cnn', u'http://twitter.com/who'])
+        for (entry, record) in zip(store.entries(), records):
+            tweet = entry.feed_entry
+            yield nose.tools.eq_, (tweet.author[0].link[0].href,
+                                   tweet.author[0].name,
+                                   tweet.title,
+                                   tweet.lang[0].code,
+                                   tweet.spam_probability,
+                                   tweet.content.data), record[:2] + record[3:]
+        nose.tools.eq_([entry.feed_entry.last_published for entry in store.entries()],
+                       ['2014-03-01T00:00:00Z', '2014-03-01T00:01:01Z', '2014-03-01T23:59:59Z'])
+    finally:
+        shutil.rmtree(store_dir)
+
+
+def test_tweet_store_empty_day():
+    store_dir = tempfile.mkdtemp()
+    try:
+        TweetStoreWriter(store_dir, '2014-03-02').close()
+        store = TweetStore(day_table_path(store_dir, '2014-03-02'))
+        nose.tools.eq_(list(store.entries()), [])
+    finally:
+        shutil.rmtree(store_dir)
+
+
+def test_whole_entry_jobs_refuse_tweet_store():
+    from MRGetTweetGraph import MRGetTweetGraph
+    from MRTrecAnalyzers import MRTrecAnalyzers
+    from MRUsersToTweets import MRUsersToTweets
+
+    nose.tools.ok_(MRGetTweetGraph(args=['--tweet-store']).options.tweet_store)
+    nose.tools.ok_(MRTrecAnalyzers(args=['--tweet-store', '--analyzers', 'mention_graph']).options.tweet_store)
+    for job_class, args in [(MRUsersToTweets, ['--tweets-dir', '/tmp']),
+                            (MRTrecAnalyzers, ['--analyzers', 'mention_graph,salone'])]:
+        nose.tools.assert_raises(ValueError, job_class, args=['--tweet-store'] + args)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import random
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from twokenize import simpleTokenize
+from twokenize import simpleTokenizeReference
+
+
+# Pieces of text that Protected and the edge punct passes care about
+PIECES = [u' ', u' ', u' ', u'  ', u'\t', u'\n', u'\xa0', u'a', u'U', u'S', u'o', u'x', u't', u'D', u'P', u'RT', u'www',
+          u'com', u'uk', u'3', u'0', u'12', u'.', u'..', u',', u':', u';', u'=', u'-', u'--', u'_', u'~', u'<', u'>',
+          u'&', u'&amp;', u'&lt;', u'#', u'@', u'＠', u"'", u'"', u'“', u'’', u'(', u')', u'[', u'{', u'*', u'/',
+          u'\\', u'|', u'^', u'$', u'%', u'!', u'?', u'…', u'«', u'♥', u'★', u'—', u'→', u'ƪ', u'ヽ', u'ノ', u'é',
+          u'٣', u'http://', u'https://t.co/x', u'Mr.', u"n't", u'ebola']
+
+
+def test_simple_tokenize():
+    fixtures = (
+        (u'stay safe everyone', [u'stay', u'safe', u'everyone']),
+        (u'  stay\tsafe \n', [u'stay\tsafe']),
+        (u'RT @WHO: 1,234 cases http://t.co/AbC123 :(',
+         [u'RT', u'@WHO', u':', u'1,234', u'cases', u'http://t.co/AbC123', u':(']),
+        (u'"We need beds" (via @nytimes)', [u'"', u'We', u'need', u'beds', u'"', u'(', u'via', u'@nytimes', u')']),
+        (u"I don't know... U.S. #ebola", [u'I', u"don't", u'know', u'...', u'U.S.', u'#ebola']),
+        (u'in the U.S', [u'in', u'the', u'U.S']),
+        (u'', []),
+    )
+    for (text, tokens) in fixtures:
+        yield nose.tools.eq_, simpleTokenize(text), tokens
+        yield nose.tools.eq_, simpleTokenizeReference(text), tokens
+
+
+def test_simple_tokenize_matches_reference():
+    rng = random.Random(0)
+    for _ in xrange(20):
+        texts = [u''.join(rng.choice(PIECES) for _ in xrange(rng.randint(0, 30))) for _ in xrange(100)]
+        texts.extend([text.encode('utf8') for text in texts])
+        yield nose.tools.eq_, map(simpleTokenize, texts), map(simpleTokenizeReference, texts)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import codecs
+import os
+import shutil
+import sys
+import tempfile
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from trec_ingest.registry import UserRegistry
+from trec_ingest.registry import compile_user_registry
+from trec_ingest.stream import IngestError
+
+
+def write_usernames(path, lines):
+    with codecs.open(path, 'w', 'utf8') as f:
+        f.write(u'\n'.join(lines) + u'\n')
+
+
+def test_user_registry():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'users.csv')
+        write_usernames(source, [u'CNN', u' who ', u'', u'kélé'])
+        output = compile_user_registry(source)
+        nose.tools.eq_(output, source + '.tr')
+
+        registry = UserRegistry(output)
+        nose.tools.eq_(sorted(registry), [u'cnn', u'k\xe9l\xe9', u'who'])
+        fixtures = (
+            (u'cnn', True),
+            ('who', True),
+            (u'k\xe9l\xe9'.encode('utf8'), True),
+            ('k\xe9l\xe9', False),
+            (u'CNN', False),
+            (u'someone', False),
+        )
+        for (user, present) in fixtures:
+            yield nose.tools.eq_, user in registry, present
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_list_is_compiled_once():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'users.csv')
+        write_usernames(source, [u'cnn', u'who'])
+        registry = UserRegistry(source, tmp_dir)
+        nose.tools.ok_(registry.path.startswith(tmp_dir))
+        nose.tools.ok_(registry.path.endswith('.tr'))
+        nose.tools.ok_(u'who' in registry)
+        nose.tools.eq_(UserRegistry(source, tmp_dir).path, registry.path)
+
+        # A changed list is compiled again
+        write_usernames(source, [u'cnn'])
+        changed = UserRegistry(source, tmp_dir)
+        nose.tools.assert_not_equal(changed.path, registry.path)
+        nose.tools.eq_(list(changed), [u'cnn'])
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_cache_must_be_private():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(tmp_dir, 'users.csv')
+        write_usernames(source, [u'cnn'])
+        os.mkdir(os.path.join(tmp_dir, 'trec-user-registry-{}'.format(os.getuid())), 0755)
+        nose.tools.assert_raises_regexp(IngestError, 'not a private directory', UserRegistry, source, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_default_registry_is_lowercased():
+    registry = UserRegistry(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'usernames.csv.tr'))
+    nose.tools.eq_(len(registry), 1339)
+    nose.tools.eq_([name for name in registry if name != name.lower()], [])
+    nose.tools.ok_('alfabang' in registry)
+    nose.tools.ok_(u'alfieldreeves' in registry)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+
+import os
+import random
+import sys
+
+import nose
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from gazetteer import GazetteerIndex
+from MRTwitterWestAfricaUsers import TweetStatsBatch
+from MRTwitterWestAfricaUsers import UserStatsSums
+from MRTwitterWestAfricaUsers import get_tweet_stats
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+def test_user_stats_sums():
+    sums = UserStatsSums()
+    sums.add('alice', (1, 1, 0, 0, 1, 0, 3600, 0))
+    sums.add('bob', (1, 0, 1, 0, 0, 1, 100, 1))
+    sums.add('alice', [2, 1, 1, 0, 0, 2, 7200, 0])
+    nose.tools.eq_(len(sums), 2)
+    nose.tools.eq_(sorted(sums.flush()), [('alice', [3, 2, 1, 0, 1, 2, 10800, 0]),
+                                          ('bob', [1, 0, 1, 0, 0, 1, 100, 1])])
+    nose.tools.eq_(len(sums), 0)
+    nose.tools.eq_(sums.flush(), [])
+
+
+def make_tweets(n):
+    rng = random.Random(1)
+    words = [u'ebola', u'Liberia', u'#monrovia', u'paris', u'outbreak', u'quarantine', u'hello', u'world']
+    start = epoch_from_timestamp('2014-08-01T00:00:00Z')
+    tweets = []
+    for _ in xrange(n):
+        user = 'user{}'.format(rng.randrange(13))
+        epoch = start + rng.randrange(10 * 86400)
+        body = u' '.join(rng.choice(words) for _ in xrange(rng.randrange(1, 6)))
+        name = rng.choice([u'Some One', u'Liberia News', u'Guinea, Conakry', u'Sierra Leone Daily'])
+        tweets.append((user, epoch, body, name))
+    return tweets
+
+
+def test_tweet_stats_batch():
+    gazetteers = GazetteerIndex([('west africa', [u'liberia', u'monrovia']),
+                                 ('other places', [u'paris']),
+                                 ('crisislex', [u'outbreak', u'quarantine'])])
+    tweets = make_tweets(500)
+    expected = UserStatsSums()
+    for user, epoch, body, name in tweets:
+        expected.add(user, get_tweet_stats(epoch, body, name, gazetteers))
+    expected = sorted(expected.flush())
+
+    for size in [1, 7, 10000]:
+        batch = TweetStatsBatch(gazetteers, size)
+        sums = UserStatsSums()
+        for user, epoch, body, name in tweets:
+            for user_stats in batch.add(user, epoch, body, name):
+                sums.add(*user_stats)
+        for user_stats in batch.flush():
+            sums.add(*user_stats)
+        yield nose.tools.eq_, sorted(sums.flush()), expected
+        yield nose.tools.eq_, len(batch), 0
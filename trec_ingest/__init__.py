@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Shared ingest layer for the encrypted Spinn3r tweet chunks on s3.
+Every job gets its feed entries from here, so a fix to the
+fetch / decrypt / parse path only has to land once.
+"""
+from trec_ingest.cache import ChunkCache
+from trec_ingest.store import TweetStore
+from trec_ingest.store import TweetStoreWriter
+from trec_ingest.stream import ChunkIngestor
+from trec_ingest.stream import DecryptedStream
+from trec_ingest.stream import GpgKeyring
+from trec_ingest.stream import IngestError
+from trec_ingest.stream import aws_path_from_line
+from trec_ingest.stream import download_to_file
+from trec_ingest.authors import author_screen_name
+from trec_ingest.job import MRTrecJob
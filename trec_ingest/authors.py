@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+The screen name of a tweet's author, found the same way by every job.
+
+The author's link is either http://twitter.com/SomeOne or
+http://twitter.com/@SomeOne. The screen name is the last segment of the
+link's path, without an '@', lowercased and utf8-encoded; splitting on '/'
+alone kept the '@', and splitting on '@' alone failed on links without one.
+
+Authors repeat heavily within a chunk, so names are memoized by link.
+"""
+from urllib2 import urlparse
+
+
+SCREEN_NAME_CACHE_SIZE = 4096
+
+
+def parse_screen_name(href):
+    """
+    :param str|unicode href: link of a feed entry's author
+    :return str: lowercased screen name, utf8
+    :raise ValueError: if the link has no screen name
+    """
+    if isinstance(href, str):
+        href = href.decode('utf8')
+    scheme_end = href.find(u'://')
+    if scheme_end > 0 and u'?' not in href and u'#' not in href:
+        path = href[scheme_end + 3:].partition(u'/')[2]
+    else:
+        path = urlparse.urlsplit(href).path
+    name = path.rstrip(u'/').rsplit(u'/', 1)[-1]
+    if name[:1] == u'@':
+        name = name[1:]
+    if not name:
+        raise ValueError('No screen name in author link {!r}'.format(href))
+    return name.lower().encode('utf8')
+
+
+class ScreenNameCache(object):
+    """
+    `parse_screen_name()`, memoized by link, keeping about the `size` most
+    recently used links. Links live in a young and an old generation: a
+    link found in the old one moves to the young one, and when the young
+    one is full the old one is dropped and the young one takes its place.
+    """
+    def __init__(self, size=SCREEN_NAME_CACHE_SIZE):
+        """
+        :param int size: links to keep, across both generations
+        """
+        self.generation_size = max(size // 2, 1)
+        self.young = {}
+        self.old = {}
+
+    def __len__(self):
+        return len(self.young) + len(self.old)
+
+    def __call__(self, href):
+        """
+        :param str|unicode href: link of a feed entry's author
+        :return str: lowercased screen name, utf8
+        :raise ValueError: if the link has no screen name
+        """
+        name = self.young.get(href)
+        if name is not None:
+            return name
+        name = self.old.get(href)
+        if name is None:
+            name = parse_screen_name(href)
+        if len(self.young) >= self.generation_size:
+            self.old = self.young
+            self.young = {}
+        self.young[href] = name
+        return name
+
+
+screen_name_from_href = ScreenNameCache()
+
+
+def author_screen_name(feed_entry):
+    """
+    :param spinn3rApi_pb2.FeedEntry feed_entry: a tweet
+    :return str: lowercased screen name of its first author, utf8
+    :raise IndexError: if it has no author or the author no link
+    :raise ValueError: if the link has no screen name
+    """
+    return screen_name_from_href(feed_entry.author[0].link[0].href)
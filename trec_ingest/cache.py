@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+On-disk cache of decrypted, uncompressed chunk files, shared by every job
+and every mapper process on a node.
+
+Entries are named by the sha1 of their aws_path, written under a temporary
+name in the cache directory and renamed into place, so a reader only ever
+sees complete files. Hits bump the file's mtime, and whenever a new entry
+lands the oldest entries are deleted until the cache fits its byte budget.
+A reader that already has an entry open keeps reading it after eviction.
+"""
+import errno
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+
+
+TMP_PREFIX = '.tmp-'
+LOCK_NAME = '.evict.lock'
+STALE_TMP_SECONDS = 6 * 3600
+
+
+class ChunkCache(object):
+    """
+    Byte-bounded LRU cache of decrypted chunk files, keyed by aws_path.
+    """
+    def __init__(self, cache_dir, max_bytes):
+        """
+        :param str cache_dir: node-local directory holding the cache
+        :param int max_bytes: budget for the total size of cached chunks
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(cache_dir)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def path(self, aws_path):
+        """
+        :param str aws_path: path of the file within the s3 bucket
+        :return str: where the decrypted chunk is cached
+        """
+        key = hashlib.sha1(aws_path).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + '.pb')
+
+    def open(self, aws_path):
+        """
+        :param str aws_path: path of the file within the s3 bucket
+        :return file: the cached chunk opened for reading, or None on a miss
+        """
+        path = self.path(aws_path)
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # Evicted between open and utime; the open file is still good.
+            pass
+        return f
+
+    def create(self):
+        """
+        :return file: temporary file in the cache directory to decrypt into
+        """
+        return tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=TMP_PREFIX, delete=False)
+
+    def commit(self, tmp_f, aws_path):
+        """
+        Atomically move a completed temporary file into the cache, then
+        evict down to the budget.
+        :param file tmp_f: file returned by `create()`, fully written
+        :param str aws_path: path of the file within the s3 bucket
+        :return file: `tmp_f`, rewound for reading
+        """
+        path = self.path(aws_path)
+        try:
+            os.mkdir(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        tmp_f.flush()
+        os.rename(tmp_f.name, path)
+        tmp_f.seek(0)
+        self.evict()
+        return tmp_f
+
+    def discard(self, tmp_f):
+        """
+        :param file tmp_f: file returned by `create()` that should not be kept
+        """
+        tmp_f.close()
+        try:
+            os.remove(tmp_f.name)
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in
+        `max_bytes`. Only one process on the node evicts at a time; the
+        others skip it, since the winner brings the whole cache under budget.
+        """
+        with open(os.path.join(self.cache_dir, LOCK_NAME), 'a') as lock_f:
+            try:
+                fcntl.flock(lock_f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                return
+            try:
+                self._evict()
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        total = 0
+        for dir_path, dir_names, file_names in os.walk(self.cache_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith(TMP_PREFIX):
+                    # Left behind by a mapper that died mid-write.
+                    if now - st.st_mtime > STALE_TMP_SECONDS:
+                        self._remove(path)
+                    continue
+                if name == LOCK_NAME:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+@mentions and #hashtags of a tweet, found without tokenizing it.
+
+The graph job only needs the mentions, and most tweets have none, so
+`scan_entities()` returns at once for text without an '@' or '#' and
+otherwise makes one regex pass over it, following Twitter's rules
+(twitter-text's extractor):
+    a mention is '@' and 1-20 of [A-Za-z0-9_], not preceded by a letter,
+        digit or one of _!#$%&*@ (except as in "RT@user"), and not followed
+        by another name character, '@', an accented Latin letter or '://'
+    a hashtag is '#' and letters, digits and underscores with at least one
+        letter, not preceded by a letter, digit, '_' or '&', and not
+        followed by '#' or '://'
+Fullwidth '＠' and '＃' count too.
+
+These agree with the '@' and '#' tokens of simpleTokenize on ordinary text.
+They differ where twokenize's rules are looser: "@user's" is the mention
+"user", not "user's"; "me@example.com", "@foo@bar", "@_@", a lone "@" and
+names over 20 characters mention no one; "#1", "#a#b" and "&#39;" hold no
+hashtag, and "#Guinée" is "Guinée", not "Guin".
+"""
+import re
+
+
+MENTION = (u"(?:(?<![A-Za-z0-9_!#$%&*@\uff20])|(?<=[Rr][Tt])(?<![A-Za-z0-9_+~.\\-][Rr][Tt]))"
+           u"[@\uff20]([A-Za-z0-9_]{1,20})(?![A-Za-z0-9_@\uff20\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f]|://)")
+# Not followed by a variation selector or keycap: "#\ufe0f\u20e3" is the keycap emoji
+HASHTAG = u"(?<![&\\w])[#\uff03](?![\ufe0f\u20e3])(\\w*[^\\W\\d_]\\w*)(?![#\uff03]|://)"
+
+Entities = re.compile(u'{}|{}'.format(MENTION, HASHTAG), re.UNICODE)
+Mentions = re.compile(MENTION, re.UNICODE)
+
+
+def _decode(text):
+    if isinstance(text, str):
+        return text.decode('utf8')
+    return text
+
+
+def scan_mentions(text):
+    """
+    :param str|unicode text: text of a tweet; a str is taken to be utf8
+    :return list: the screen names it mentions, without '@', in order
+    """
+    text = _decode(text)
+    if u'@' not in text and u'＠' not in text:
+        return []
+    return Mentions.findall(text)
+
+
+def scan_entities(text):
+    """
+    :param str|unicode text: text of a tweet; a str is taken to be utf8
+    :return tuple: list of the screen names it mentions, without '@', and
+        list of its hashtags, without '#', each in order
+    """
+    text = _decode(text)
+    mentions = []
+    hashtags = []
+    if u'@' not in text and u'#' not in text and u'＠' not in text and u'＃' not in text:
+        return mentions, hashtags
+    for mention, hashtag in Entities.findall(text):
+        if mention:
+            mentions.append(mention)
+        else:
+            hashtags.append(hashtag)
+    return mentions, hashtags
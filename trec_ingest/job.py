@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Base job for everything that reads Spinn3r chunks listed in
+`list_of_trec_files.txt`.
+"""
+import atexit
+import os
+import sys
+import tempfile
+
+from mrjob.job import MRJob
+
+from twokenize import simpleTokenize
+
+from trec_ingest.cache import ChunkCache
+from trec_ingest.manifest import ManifestError
+from trec_ingest.manifest import filter_manifest
+from trec_ingest.manifest import parse_date_range
+from trec_ingest.prefetch import Prefetcher
+from trec_ingest.store import TweetStore
+from trec_ingest.stream import ChunkIngestor
+from trec_ingest.stream import LAZY_ENTRIES
+from trec_ingest.tokens import TokenCache
+
+
+class MRTrecJob(MRJob):
+    """
+    Holds the options and the fetch/decrypt/parse path shared by all jobs.
+    Subclasses call `ingest_init()` from the mapper_init of any step that
+    reads chunk files, then iterate `feed_entries(aws_path)`.
+
+    With --tweet-store the input lines name days of a tweet store written by
+    MRConvertToTweetStore, and the entries are read from local disk. The
+    store only keeps the fields the jobs read, so jobs that hand on whole
+    entries set FULL_ENTRIES and refuse --tweet-store.
+
+    With --prefetch the entries handed back for an aws_path belong to an
+    earlier file, so the same step needs a mapper_final that iterates
+    `drain_feed_entries()` through the same per-entry code.
+
+    With --token-cache-size, `self.tokenize` memoizes simpleTokenize() by
+    text (see trec_ingest.tokens), and its hits and misses are counted each
+    time a file's entries run out. `ingest_init()` sets it up; steps that
+    tokenize without reading chunk files call `tokenizer_init()`.
+
+    With --date-range the input file lists are filtered by their date column
+    before the job is launched, so out-of-range files never reach a mapper.
+    Jobs set DATE_RANGE to filter by default.
+    """
+    DATE_RANGE = None
+    FULL_ENTRIES = False
+
+    def configure_options(self):
+        """
+        Configure default options needed by all jobs.
+        Each job _must_have_ a copy of the key to decrypt the tweets.
+        """
+        super(MRTrecJob, self).configure_options()
+        self.add_file_option('--gpg-private',
+                             default='trec-kba-2013-centralized.gpg-key.private',
+                             help='path to gpg private key for decrypting the data')
+        self.add_passthrough_option('--prefetch', type='int', default=0,
+                                    help='download and decrypt this many input files ahead '
+                                         'of the one being analyzed (default: 0, no prefetch)')
+        self.add_passthrough_option('--chunk-cache-dir', default=None,
+                                    help='node-local directory for caching decrypted chunk files '
+                                         'across jobs (default: no cache)')
+        self.add_passthrough_option('--chunk-cache-bytes', type='int', default=50 * 1024 ** 3,
+                                    help='size budget of the chunk cache, in bytes')
+        self.add_passthrough_option('--tweet-store', action='store_true', default=False,
+                                    help='input lines name days of a local tweet store written by '
+                                         'MRConvertToTweetStore.py instead of encrypted s3 chunks')
+        self.add_passthrough_option('--shared-keyring', dest='shared_keyring', action='store_true',
+                                    default=True,
+                                    help='import the key once per node and keep its gpg-agent running '
+                                         'for later tasks (default)')
+        self.add_passthrough_option('--no-shared-keyring', dest='shared_keyring', action='store_false',
+                                    help='import the key into a temporary gpg home for each task')
+        self.add_passthrough_option('--lazy-entries', type='choice', choices=['auto', 'always', 'never'],
+                                    default='auto',
+                                    help='decode entry fields only when a job reads them; by default only '
+                                         'with the pure-Python protobuf, which is slower at full parses')
+        self.add_passthrough_option('--token-cache-size', type='int', default=0,
+                                    help='memoize the tokens of this many distinct tweet texts per mapper, '
+                                         'for retweets and duplicates (default: 0, no cache)')
+        self.add_passthrough_option('--date-range', default=self.DATE_RANGE,
+                                    help='only read input files dated START:END (YYYY-MM-DD:YYYY-MM-DD, '
+                                         'both included; empty for all files; default: {})'.format(self.DATE_RANGE))
+
+    def load_options(self, args):
+        """Check the date range."""
+        super(MRTrecJob, self).load_options(args)
+        self.date_range = None
+        if self.options.date_range:
+            try:
+                self.date_range = parse_date_range(self.options.date_range)
+            except ManifestError as e:
+                self.option_parser.error(str(e))
+        if self.options.tweet_store and self.needs_full_entries():
+            self.option_parser.error('--tweet-store only keeps some fields of each entry, and this job '
+                                     'needs whole entries; read the encrypted chunks instead')
+
+    def needs_full_entries(self):
+        """
+        :return bool: True if the job serializes or hands on whole entries
+        """
+        return self.FULL_ENTRIES
+
+    def job_runner_kwargs(self):
+        """Swap the input file lists for a manifest of the files in the date range."""
+        kwargs = super(MRTrecJob, self).job_runner_kwargs()
+        if self.date_range is not None:
+            kwargs['input_paths'] = [self.write_date_range_manifest(kwargs['input_paths'] or ['-'])]
+        return kwargs
+
+    def write_date_range_manifest(self, input_paths):
+        """
+        :param list input_paths: local file lists, or '-' for stdin
+        :return str: path of a temporary manifest of the files in the date
+            range, largest first; it is removed when this process exits
+        """
+        lines = []
+        for path in input_paths:
+            if path == '-':
+                lines.extend(self.stdin)
+            elif '://' in path:
+                self.option_parser.error('--date-range needs local file lists, got {}'.format(path))
+            else:
+                with open(path) as f:
+                    lines.extend(f)
+
+        start, end = self.date_range
+        kept, n_out_of_range, malformed = filter_manifest(lines, start, end)
+        for line in malformed:
+            sys.stderr.write('Skipping malformed file list line: {!r}\n'.format(line))
+        sys.stderr.write('Date range {}: kept {} files, skipped {} out of range\n'.format(
+            self.options.date_range, len(kept), n_out_of_range))
+
+        fd, manifest_path = tempfile.mkstemp(prefix='trec-manifest-', suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(kept)
+        atexit.register(os.remove, manifest_path)
+        return manifest_path
+
+    def generate_file_upload_args(self):
+        """Reading the tweet store needs no key."""
+        file_upload_args = super(MRTrecJob, self).generate_file_upload_args()
+        if self.options.tweet_store:
+            file_upload_args = [(opt, path) for opt, path in file_upload_args if opt != '--gpg-private']
+        return file_upload_args
+
+    def ingest_init(self):
+        """Check for the key and set up the chunk reader. Needs self.logger."""
+        self.increment_counter('wa1', 'file_data_bad', 0)
+        self.increment_counter('wa1', 'missing_key', 0)
+
+        self.tokenizer_init()
+
+        self.ingestor = None
+        self.prefetcher = None
+        if self.options.tweet_store:
+            return
+
+        if not os.path.exists(self.options.gpg_private):
+            self.logger.info('Cannot locate key: {}'.format(
+                self.options.gpg_private))
+            sys.exit(1)
+
+        cache = None
+        if self.options.chunk_cache_dir:
+            cache = ChunkCache(self.options.chunk_cache_dir, self.options.chunk_cache_bytes)
+
+        self.ingestor = ChunkIngestor(self.options.gpg_private,
+                                      self.increment_counter,
+                                      self.logger,
+                                      cache=cache,
+                                      lazy_entries={'auto': LAZY_ENTRIES,
+                                                    'always': True,
+                                                    'never': False}[self.options.lazy_entries],
+                                      shared_keyring=self.options.shared_keyring)
+        # Mappers have no teardown hook that runs on every exit path
+        atexit.register(self.ingestor.close)
+        if self.options.prefetch > 0:
+            self.prefetcher = Prefetcher(self.ingestor, self.options.prefetch)
+
+    def tokenizer_init(self):
+        """Set up `self.tokenize`, memoized if --token-cache-size is set."""
+        self.token_cache = None
+        self.tokenize = simpleTokenize
+        if self.options.token_cache_size > 0:
+            self.token_cache = self.tokenize = TokenCache(self.options.token_cache_size)
+            self.reported_token_counts = (0, 0)
+            self.increment_counter('wa1', 'token_cache_hits', 0)
+            self.increment_counter('wa1', 'token_cache_misses', 0)
+
+    def report_token_cache(self):
+        """Count the token cache's hits and misses since the last report."""
+        if self.token_cache is None:
+            return
+        hits, misses = self.token_cache.hits, self.token_cache.misses
+        reported_hits, reported_misses = self.reported_token_counts
+        if hits > reported_hits:
+            self.increment_counter('wa1', 'token_cache_hits', hits - reported_hits)
+        if misses > reported_misses:
+            self.increment_counter('wa1', 'token_cache_misses', misses - reported_misses)
+        self.reported_token_counts = (hits, misses)
+
+    def _reporting_token_cache(self, entries):
+        for entry in entries:
+            yield entry
+        self.report_token_cache()
+
+    def feed_entries(self, aws_path):
+        """
+        :param str aws_path: path of the file within the s3 bucket
+        :return generator: feed entries; see
+            https://github.com/trec-kba/streamcorpus-pipeline/blob/master/
+                streamcorpus_pipeline/_spinn3r_feed_storage.py#L269
+        """
+        if self.options.tweet_store:
+            entries = TweetStore(aws_path).entries()
+        elif self.prefetcher is not None:
+            entries = self.prefetcher.entries(aws_path)
+        else:
+            entries = self.ingestor.entries(aws_path)
+        if self.token_cache is not None:
+            entries = self._reporting_token_cache(entries)
+        return entries
+
+    def drain_feed_entries(self):
+        """
+        :return generator: feed entries of files still being prefetched
+        """
+        if self.prefetcher is None:
+            return iter(())
+        entries = self.prefetcher.drain()
+        if self.token_cache is not None:
+            entries = self._reporting_token_cache(entries)
+        return entries
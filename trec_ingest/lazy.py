@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Lazy views of the spinn3rApi_pb2.Entry blocks in a protostream.
+
+Most jobs look at a tweet's spam probability and author, and only read the
+title, let alone the compressed content, for the tweets that pass those
+filters. LazyEntry keeps an entry's serialized bytes and only notes where
+each field of its feed_entry starts and ends; a field is decoded the first
+time it is read. Anything not covered here falls back to parsing the whole
+message, so a LazyEntry can stand in for an Entry anywhere.
+"""
+import struct
+
+from google.protobuf.internal.decoder import _DecodeVarint
+from google.protobuf.message import DecodeError
+
+from streamcorpus_pipeline._spinn3r.protoStream_pb2 import ProtoStreamDelimiter
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Author
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Content
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Entry
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import FeedEntry
+from streamcorpus_pipeline._spinn3r.spinn3rApi_pb2 import Lang
+from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+
+
+FEED_ENTRY_FIELD = Entry.DESCRIPTOR.fields_by_name['feed_entry'].number
+FEED_ENTRY_FIELDS = dict((f.name, f.number) for f in FeedEntry.DESCRIPTOR.fields)
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_FIXED32 = 5
+
+
+def scan_fields(buf, pos, end):
+    """
+    Note where each field of a serialized message is, without decoding any.
+    :param str buf: buffer holding the message
+    :param int pos: offset of the message in `buf`
+    :param int end: offset of the end of the message
+    :return dict: field number to a list of (start, end) offsets of its values
+    :raise ValueError: for wire types this doesn't handle, or a bad message
+    """
+    fields = {}
+    while pos < end:
+        # Tags and lengths are almost always one-byte varints
+        tag = ord(buf[pos])
+        if tag < 0x80:
+            pos += 1
+        else:
+            tag, pos = _DecodeVarint(buf, pos)
+        wire_type = tag & 7
+        if wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length = ord(buf[pos])
+            if length < 0x80:
+                start = pos + 1
+            else:
+                length, start = _DecodeVarint(buf, pos)
+            pos = start + length
+        elif wire_type == WIRETYPE_FIXED32:
+            start = pos
+            pos += 4
+        elif wire_type == WIRETYPE_VARINT:
+            start = pos
+            _, pos = _DecodeVarint(buf, pos)
+        elif wire_type == WIRETYPE_FIXED64:
+            start = pos
+            pos += 8
+        else:
+            raise ValueError('Unsupported wire type {}'.format(wire_type))
+        number = tag >> 3
+        if number in fields:
+            fields[number].append((start, pos))
+        else:
+            fields[number] = [(start, pos)]
+    if pos != end:
+        raise ValueError('Truncated message')
+    return fields
+
+
+class LazyFeedEntry(object):
+    """
+    View of a serialized FeedEntry. Counts how many bytes of field values
+    were decoded, so the rest can be reported as skipped.
+    """
+    def __init__(self, buf, start, end):
+        """
+        :param str buf: buffer holding the message
+        :param int start: offset of the message in `buf`
+        :param int end: offset of the end of the message
+        """
+        self._buf = buf
+        self._start = start
+        self._end = end
+        self._values = {}
+        self._full = None
+        self._decoded_bytes = 0
+        self._fields = scan_fields(buf, start, end)
+
+    def _spans(self, name):
+        spans = self._fields.get(FEED_ENTRY_FIELDS[name], ())
+        self._decoded_bytes += sum(end - start for start, end in spans)
+        return spans
+
+    def _string(self, name):
+        spans = self._spans(name)
+        if not spans:
+            return u''
+        start, end = spans[-1]
+        return self._buf[start:end].decode('utf8')
+
+    def _float(self, name):
+        spans = self._spans(name)
+        if not spans:
+            return 0.0
+        start, end = spans[-1]
+        return struct.unpack('<f', self._buf[start:end])[0]
+
+    def _messages(self, name, cls):
+        return [cls.FromString(self._buf[start:end]) for start, end in self._spans(name)]
+
+    def _message(self, name, cls):
+        # A singular message that appears more than once is merged
+        return cls.FromString(''.join(self._buf[start:end] for start, end in self._spans(name)))
+
+    def _get(self, name, decode, *args):
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = decode(name, *args)
+            return value
+
+    @property
+    def title(self):
+        return self._get('title', self._string)
+
+    @property
+    def last_published(self):
+        return self._get('last_published', self._string)
+
+    @property
+    def spam_probability(self):
+        return self._get('spam_probability', self._float)
+
+    @property
+    def author(self):
+        return self._get('author', self._messages, Author)
+
+    @property
+    def lang(self):
+        return self._get('lang', self._messages, Lang)
+
+    @property
+    def content(self):
+        return self._get('content', self._message, Content)
+
+    def __getattr__(self, name):
+        # Anything else comes from the fully parsed message
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._full is None:
+            self._full = FeedEntry.FromString(self._buf[self._start:self._end])
+        return getattr(self._full, name)
+
+    def skipped_bytes(self):
+        """
+        :return int: bytes of field values that were never decoded
+        """
+        if self._full is not None:
+            return 0
+        value_bytes = sum(end - start for spans in self._fields.itervalues() for start, end in spans)
+        return max(value_bytes - self._decoded_bytes, 0)
+
+
+class LazyEntry(object):
+    """
+    View of a serialized Entry whose feed_entry is a LazyFeedEntry.
+    """
+    def __init__(self, buf):
+        """
+        :param str buf: the serialized Entry
+        """
+        self._buf = buf
+        self._full = None
+        self._feed_entry = None
+
+    @property
+    def feed_entry(self):
+        if self._feed_entry is None:
+            try:
+                spans = scan_fields(self._buf, 0, len(self._buf)).get(FEED_ENTRY_FIELD)
+                if spans is None:
+                    self._feed_entry = LazyFeedEntry('', 0, 0)
+                else:
+                    start, end = spans[-1]
+                    self._feed_entry = LazyFeedEntry(self._buf, start, end)
+            except (DecodeError, IndexError, ValueError):
+                # Let protobuf decide what to make of it
+                self._feed_entry = self.__getattr__('feed_entry')
+        return self._feed_entry
+
+    def SerializeToString(self):
+        return self._buf
+
+    def __getattr__(self, name):
+        # Anything else comes from the fully parsed message
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._full is None:
+            self._full = Entry.FromString(self._buf)
+        return getattr(self._full, name)
+
+    def skipped_bytes(self):
+        """
+        :return int: bytes of feed_entry field values that were never decoded
+        """
+        if self._feed_entry is None:
+            return len(self._buf)
+        if self._full is not None:
+            return 0
+        return self._feed_entry.skipped_bytes()
+
+
+class LazyProtoStreamReader(ProtoStreamReader):
+    """ProtoStreamReader yielding a LazyEntry for each entry block."""
+    def __iter__(self):
+        if self._header is None:
+            self._bootstrap()
+        while True:
+            delim = self._read_a(ProtoStreamDelimiter)
+            if delim.delimiter_type == ProtoStreamDelimiter.END:
+                return
+            assert delim.delimiter_type == ProtoStreamDelimiter.ENTRY
+            yield LazyEntry(self._read_block())
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Filter a file list like list_of_trec_files.txt down to a date range before
+any mapper runs, so out-of-range files never cost a task or a request.
+
+Each line is a date, a size and a file path, separated by whitespace:
+    2014-03-01	123456	s3://bucket/2014-03-01-00/file.xz.gpg
+Only the date's leading YYYY-MM-DD is used. The filtered manifest is sorted
+largest file first, so the slowest files start early instead of straggling.
+
+Usage:
+    python -m trec_ingest.manifest --date-range 2014-02-01:2014-11-30 \\
+        list_of_trec_files.txt > manifest.txt
+"""
+import argparse
+import datetime
+import sys
+
+
+DATE_FORMAT = '%Y-%m-%d'
+# February 1, 2014 - November 30, 2014
+EBOLA_DATE_RANGE = '2014-02-01:2014-11-30'
+
+
+class ManifestError(ValueError):
+    """Raised for a malformed date range."""
+    pass
+
+
+def parse_date_range(date_range):
+    """
+    :param str date_range: START:END as YYYY-MM-DD, both days included;
+        either end may be left empty to leave it open
+    :return tuple: start and end datetime.date, or None for an open end
+    """
+    try:
+        start, end = date_range.split(':')
+        start = datetime.datetime.strptime(start, DATE_FORMAT).date() if start else None
+        end = datetime.datetime.strptime(end, DATE_FORMAT).date() if end else None
+    except ValueError:
+        raise ManifestError('Date range must look like YYYY-MM-DD:YYYY-MM-DD, got {!r}'.format(date_range))
+    if start and end and start > end:
+        raise ManifestError('Date range {!r} ends before it starts'.format(date_range))
+    return start, end
+
+
+def parse_manifest_line(line):
+    """
+    :param str line: date, size and file path
+    :return tuple: datetime.date, int size
+    :raise ValueError: if the line is malformed
+    """
+    fields = line.split()
+    if len(fields) < 3:
+        raise ValueError('Expected date, size and path: {!r}'.format(line))
+    date = datetime.datetime.strptime(fields[0][:10], DATE_FORMAT).date()
+    return date, int(fields[-2])
+
+
+def filter_manifest(lines, start, end):
+    """
+    :param lines: iterable of file list lines
+    :param datetime.date start: first day kept, or None
+    :param datetime.date end: last day kept, or None
+    :return tuple: kept lines, largest file first; number of lines out of
+        range; malformed lines
+    """
+    kept = []
+    n_out_of_range = 0
+    malformed = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            date, size = parse_manifest_line(line)
+        except ValueError:
+            malformed.append(line)
+            continue
+        if (start and date < start) or (end and date > end):
+            n_out_of_range += 1
+            continue
+        kept.append((size, line if line.endswith('\n') else line + '\n'))
+
+    # sort is stable, so equal sizes keep their input order
+    kept.sort(key=lambda x: x[0], reverse=True)
+    return [line for size, line in kept], n_out_of_range, malformed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Filter a list of TREC files by date and sort it by size.')
+    parser.add_argument('--date-range', default=EBOLA_DATE_RANGE,
+                        help='START:END as YYYY-MM-DD, both included (default: %(default)s)')
+    parser.add_argument('file_lists', nargs='*', default=['-'],
+                        help='file lists to read (default: stdin)')
+    args = parser.parse_args(argv)
+
+    try:
+        start, end = parse_date_range(args.date_range)
+    except ManifestError as e:
+        parser.error(str(e))
+
+    lines = []
+    for path in args.file_lists:
+        if path == '-':
+            lines.extend(sys.stdin)
+        else:
+            with open(path) as f:
+                lines.extend(f)
+
+    kept, n_out_of_range, malformed = filter_manifest(lines, start, end)
+    sys.stdout.writelines(kept)
+    sys.stderr.write('kept {}, out of range {}, malformed {}\n'.format(len(kept), n_out_of_range, len(malformed)))
+
+
+if __name__ == '__main__':
+    main()
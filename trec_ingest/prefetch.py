@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Overlap downloading and decrypting chunk files with analysis.
+
+A mapper sees one aws_path per call, so prefetching is done by pipelining:
+each call submits its file to a thread pool and analyzes the oldest file
+once more than `depth` are in flight. Whatever is still in flight when the
+input runs out is analyzed from mapper_final via `drain()`.
+
+The worker threads spend their time blocked on the socket or on gpg and xz,
+which run as separate processes, so the GIL is not a bottleneck.
+"""
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+
+class Prefetcher(object):
+    """
+    Keeps up to `depth` chunk files downloading and decrypting while the
+    current one is analyzed.
+    """
+    def __init__(self, ingestor, depth):
+        """
+        :param trec_ingest.ChunkIngestor ingestor: fetches and parses chunks
+        :param int depth: number of files to fetch ahead of the current one
+        """
+        self.ingestor = ingestor
+        self.depth = depth
+        self.pool = ThreadPool(depth)
+        self.in_flight = deque()
+
+    def entries(self, aws_path):
+        """
+        Queue `aws_path` and yield the entries of any earlier files whose
+        turn has come.
+        :param str aws_path: path of the file within the s3 bucket
+        :return generator: feed entries of earlier files, possibly none
+        """
+        self.in_flight.append(self.pool.apply_async(self.ingestor.fetch, (aws_path,)))
+        while len(self.in_flight) > self.depth:
+            for entry in self._next_entries():
+                yield entry
+
+    def drain(self):
+        """
+        :return generator: feed entries of every file still in flight
+        """
+        while self.in_flight:
+            for entry in self._next_entries():
+                yield entry
+
+    def _next_entries(self):
+        chunk = self.in_flight.popleft().get()
+        return self.ingestor.entries_from_fetched(chunk)
+
+    def close(self):
+        for result in self.in_flight:
+            result.get().close()
+        self.in_flight.clear()
+        self.pool.close()
+        self.pool.join()
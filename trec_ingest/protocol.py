@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Compact internal protocol for jobs that shuffle short sequences of small
+non-negative ints: per-user stats, edge weights, keyword counts.
+
+PickleProtocol writes each value as a protocol 0 pickle, string-escaped to
+keep tabs and newlines out of the line, so the 8 stats of a user take about
+60 bytes. VarintProtocol writes a line as
+    <key>\\t<value>
+where the key is its raw utf8 bytes and each int of the value is written in
+base 64, most significant digit first: the last digit of an int is a byte
+in 0x80-0xbf and any before it are bytes in 0x40-0x7f. Ints below 64 take
+one byte and those below 4096 two; no byte of a value is a tab, newline or
+carriage return, so nothing needs escaping.
+
+Keys come back as str. Values come back as lists of ints; subclasses turn
+other shapes into flat sequences of ints and back with `dump_value()` and
+`load_value()`.
+"""
+import re
+
+
+_LAST_DIGITS = [chr(0x80 | d) for d in xrange(64)]
+_MORE_DIGITS = [chr(0x40 | d) for d in xrange(64)]
+_UNSAFE_KEY = re.compile('[\t\n\r]')
+
+
+def encode_varints(values):
+    """
+    :param values: sequence of non-negative ints
+    :return str: the ints, in base 64 as described above
+    :raise ValueError: for a negative int
+    """
+    parts = []
+    for n in values:
+        if 0 <= n < 64:
+            parts.append(_LAST_DIGITS[n])
+            continue
+        if n < 0:
+            raise ValueError('Cannot encode negative int {}'.format(n))
+        digits = [_LAST_DIGITS[n & 63]]
+        n >>= 6
+        while n:
+            digits.append(_MORE_DIGITS[n & 63])
+            n >>= 6
+        digits.reverse()
+        parts.extend(digits)
+    return ''.join(parts)
+
+
+def decode_varints(data):
+    """
+    :param str data: from `encode_varints()`
+    :return list: the ints
+    :raise ValueError: if it isn't from `encode_varints()`
+    """
+    values = []
+    n = 0
+    b = 0x80
+    for b in bytearray(data):
+        if b >= 0x80:
+            if b >= 0xc0:
+                raise ValueError('Not a varint value: {!r}'.format(data))
+            values.append(n << 6 | b - 0x80)
+            n = 0
+        elif b >= 0x40:
+            n = n << 6 | b - 0x40
+        else:
+            raise ValueError('Not a varint value: {!r}'.format(data))
+    # The last byte has to end an int
+    if b < 0x80:
+        raise ValueError('Truncated varint value: {!r}'.format(data))
+    return values
+
+
+class VarintProtocol(object):
+    """
+    Encode ``(key, value)`` as the key's raw bytes and the value's ints in
+    base 64, separated by a tab.
+    """
+    def dump_value(self, value):
+        """
+        :param value: value yielded by a mapper, combiner or reducer
+        :return: sequence of non-negative ints
+        """
+        return value
+
+    def load_value(self, ints):
+        """
+        :param list ints: as `dump_value()` gave them
+        :return: the value
+        """
+        return ints
+
+    def read(self, line):
+        """
+        :param str line: a line, without its newline
+        :return tuple: key (a str), value
+        """
+        key, value = line.split('\t', 1)
+        return key, self.load_value(decode_varints(value))
+
+    def write(self, key, value):
+        """
+        :param str|unicode key: a unicode key is written as utf8
+        :param value: see `dump_value()`
+        :return str: a line, without its newline
+        :raise ValueError: for a key with a tab, newline or carriage return
+        """
+        if isinstance(key, unicode):
+            key = key.encode('utf8')
+        if _UNSAFE_KEY.search(key):
+            raise ValueError('Cannot write key {!r}: it has a tab or line break'.format(key))
+        return key + '\t' + encode_varints(self.dump_value(value))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Compressed files of length-prefixed records, written and read as streams.
+
+A record file `<name>.xz` is a sequence of records, each a 4-byte
+big-endian length and that many bytes, cut into blocks of about
+BLOCK_BYTES and compressed block by block, each block as its own xz
+stream. `xz --decompress` reads the whole file as one, since concatenated
+streams are a valid xz file. Its index `<name>.idx` is a small json file:
+    {"version": 1, "count": <records>,
+     "blocks": [[<offset of the block in the .xz>, <its first record>], ...]}
+so a reader can start at any block without decompressing those before it.
+
+Writers hold one block's compressor and never a whole block of records, so
+a reducer can write a partition of any size; readers hold one chunk of
+decompressed bytes and the record being read.
+"""
+import bisect
+import json
+import os
+import struct
+
+from backports import lzma
+
+
+RECORDS_VERSION = 1
+RECORDS_SUFFIX = '.xz'
+INDEX_SUFFIX = '.idx'
+BLOCK_BYTES = 1 << 20
+READ_BYTES = 1 << 16
+
+_LENGTH = struct.Struct('>I')
+
+
+class RecordFileWriter(object):
+    """
+    Writes a record file and its index. The file only replaces an older
+    copy of itself once `close()` has written both.
+    """
+    def __init__(self, path, block_bytes=BLOCK_BYTES):
+        """
+        :param str path: path of the record file, without RECORDS_SUFFIX
+        :param int block_bytes: uncompressed bytes per block
+        """
+        self.path = path
+        self.tmp_path = '{}.tmp-{}'.format(path, os.getpid())
+        self.block_bytes = block_bytes
+        self.f = open(self.tmp_path + RECORDS_SUFFIX, 'wb')
+        self.count = 0
+        self.blocks = []
+        self.compressor = None
+        self.block_size = 0
+
+    def append(self, record):
+        """
+        :param str record: bytes of the record
+        """
+        if self.compressor is None:
+            self.blocks.append([self.f.tell(), self.count])
+            self.compressor = lzma.LZMACompressor()
+            self.block_size = 0
+        self.f.write(self.compressor.compress(_LENGTH.pack(len(record))))
+        self.f.write(self.compressor.compress(record))
+        self.count += 1
+        self.block_size += _LENGTH.size + len(record)
+        if self.block_size >= self.block_bytes:
+            self.end_block()
+
+    def end_block(self):
+        """End the block being written; the next record starts another."""
+        if self.compressor is not None:
+            self.f.write(self.compressor.flush())
+            self.compressor = None
+
+    def close(self):
+        """
+        Write the index, then move the file and index into place.
+        :return int: number of records written
+        """
+        self.end_block()
+        self.f.close()
+        with open(self.tmp_path + INDEX_SUFFIX, 'w') as index_f:
+            json.dump({'version': RECORDS_VERSION,
+                       'count': self.count,
+                       'blocks': self.blocks},
+                      index_f)
+        os.rename(self.tmp_path + RECORDS_SUFFIX, self.path + RECORDS_SUFFIX)
+        os.rename(self.tmp_path + INDEX_SUFFIX, self.path + INDEX_SUFFIX)
+        return self.count
+
+
+class RecordFileReader(object):
+    """
+    Reads the records of a file written by RecordFileWriter.
+    """
+    def __init__(self, path):
+        """
+        :param str path: path of the record file, with or without RECORDS_SUFFIX
+        """
+        if path.endswith(RECORDS_SUFFIX):
+            path = path[:-len(RECORDS_SUFFIX)]
+        self.path = path
+        with open(path + INDEX_SUFFIX) as index_f:
+            index = json.load(index_f)
+        if index['version'] != RECORDS_VERSION:
+            raise ValueError('Unsupported record file version {} at {}'.format(index['version'], path))
+        self.count = index['count']
+        self.blocks = index['blocks']
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start=0):
+        """
+        :param int start: number of the first record to read
+        :return generator: str of each record from `start` on
+        """
+        if start >= self.count:
+            return
+        block = bisect.bisect_right([first for _, first in self.blocks], start) - 1
+        offset, n = self.blocks[block]
+        with open(self.path + RECORDS_SUFFIX, 'rb') as f:
+            f.seek(offset)
+            for record in self._read_records(f):
+                if n >= start:
+                    yield record
+                n += 1
+        if n != self.count:
+            raise ValueError('Record file {} holds {} records, not {}'.format(self.path, n, self.count))
+
+    def _read_records(self, f):
+        decompressor = lzma.LZMADecompressor()
+        in_stream = False
+        buf = ''
+        pos = 0
+        while True:
+            data = f.read(READ_BYTES)
+            if not data:
+                break
+            while data:
+                buf = buf[pos:] + decompressor.decompress(data)
+                pos = 0
+                in_stream = True
+                # A block's stream ended; whatever follows starts the next
+                data = ''
+                if decompressor.eof:
+                    data = decompressor.unused_data
+                    decompressor = lzma.LZMADecompressor()
+                    in_stream = False
+                while pos + _LENGTH.size <= len(buf):
+                    length, = _LENGTH.unpack_from(buf, pos)
+                    end = pos + _LENGTH.size + length
+                    if end > len(buf):
+                        break
+                    yield buf[pos + _LENGTH.size:end]
+                    pos = end
+        if in_stream or pos != len(buf):
+            raise ValueError('Truncated record in {}'.format(self.path))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+User registries: the lists of screen names that jobs keep or skip tweets by.
+
+A registry is a marisa trie of lowercased screen names, saved as
+`<list>.tr`. Loading one maps the file with mmap instead of reading it, so a
+mapper starts without parsing anything and every mapper process on a node
+shares one copy of the pages through the page cache.
+
+A newline-delimited list can be given instead of a `.tr`; it is compiled
+once per node, into a private directory under the temp dir keyed by the
+list's sha1, and mapped from there.
+
+Usage:
+    python -m trec_ingest.registry seed_usernames.csv
+"""
+import argparse
+import codecs
+import errno
+import fcntl
+import hashlib
+import os
+import stat
+import sys
+import tempfile
+
+import marisa_trie
+
+from trec_ingest.stream import IngestError
+
+
+REGISTRY_SUFFIX = '.tr'
+
+
+def read_usernames(path):
+    """
+    :param str path: newline-delimited screen names, utf8
+    :return set: the lowercased names, without blank lines
+    """
+    with codecs.open(path, 'r', 'utf8') as f:
+        usernames = set(line.strip().lower() for line in f)
+    usernames.discard(u'')
+    return usernames
+
+
+def compile_user_registry(source, output=None):
+    """
+    :param str source: newline-delimited screen names
+    :param str output: path of the registry; `<source>.tr` by default
+    :return str: path of the registry
+    """
+    output = output or source + REGISTRY_SUFFIX
+    tmp_output = '{}.tmp-{}'.format(output, os.getpid())
+    marisa_trie.Trie(read_usernames(source)).save(tmp_output)
+    os.rename(tmp_output, output)
+    return output
+
+
+def _cache_dir(tmp_dir=None):
+    cache_dir = os.path.join(tmp_dir or tempfile.gettempdir(), 'trec-user-registry-{}'.format(os.getuid()))
+    try:
+        os.mkdir(cache_dir, 0700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    st = os.lstat(cache_dir)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0077:
+        raise IngestError('Refusing to use registry cache {}: not a private directory'.format(cache_dir))
+    return cache_dir
+
+
+def cached_user_registry(source, tmp_dir=None):
+    """
+    :param str source: newline-delimited screen names
+    :param str tmp_dir: where to keep the node's compiled registries
+    :return str: path of the registry compiled from `source`, compiling it
+        if no process on the node has yet
+    """
+    digest = hashlib.sha1()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), ''):
+            digest.update(block)
+    cache_dir = _cache_dir(tmp_dir)
+    output = os.path.join(cache_dir, digest.hexdigest() + REGISTRY_SUFFIX)
+    if os.path.exists(output):
+        return output
+
+    # Whoever gets the lock first compiles the list; the rest wait for it
+    with open(os.path.join(cache_dir, '.compile.lock'), 'a') as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX)
+        try:
+            if not os.path.exists(output):
+                compile_user_registry(source, output)
+        finally:
+            fcntl.flock(lock_f, fcntl.LOCK_UN)
+    return output
+
+
+class UserRegistry(object):
+    """
+    Read-only set of screen names, mapped from a registry file.
+    """
+    def __init__(self, path, tmp_dir=None):
+        """
+        :param str path: registry (`.tr`), or a newline-delimited list of
+            screen names to compile into one
+        :param str tmp_dir: where to keep compiled lists; see `cached_user_registry()`
+        """
+        if not path.endswith(REGISTRY_SUFFIX):
+            path = cached_user_registry(path, tmp_dir)
+        self.path = path
+        self.trie = marisa_trie.Trie()
+        self.trie.mmap(path)
+
+    def __len__(self):
+        return len(self.trie)
+
+    def __iter__(self):
+        return self.trie.iterkeys()
+
+    def __contains__(self, user):
+        """
+        :param str|unicode user: screen name; a str is taken to be utf8
+        :return bool: True if it is in the registry
+        """
+        if isinstance(user, str):
+            try:
+                user = user.decode('utf8')
+            except UnicodeDecodeError:
+                return False
+        return user in self.trie
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile lists of screen names into user registries.')
+    parser.add_argument('sources', nargs='+',
+                        help='newline-delimited screen names; each is compiled to <list>{}'.format(REGISTRY_SUFFIX))
+    args = parser.parse_args(argv)
+
+    for source in args.sources:
+        output = compile_user_registry(source)
+        sys.stderr.write('compiled {} ({} users)\n'.format(output, len(UserRegistry(output))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Columnar store of the few tweet fields the jobs use, one directory per day.
+
+MRConvertToTweetStore writes it once from the encrypted corpus; afterwards
+any job that only reads those fields, run with --tweet-store, scans it
+locally instead of fetching and decrypting chunks from s3. Jobs that hand
+on whole entries refuse --tweet-store; see MRTrecJob.FULL_ENTRIES.
+
+A day lives in `<store_dir>/<YYYY-MM-DD>/tweets/`:
+    meta.json               tweet count and column dtypes
+    <column>.bin            one fixed-width value per tweet
+    <text>.offsets.bin      int64 offsets into <text>.blob; n + 1 of them
+    <text>.blob             the concatenated utf8 (or raw) bytes
+Screen names, user names and languages are dictionary-encoded: the
+per-tweet column holds an index into a text column of distinct values.
+Everything is read through numpy.memmap, so opening a day is cheap and
+scanning one only touches the columns a job asks for.
+"""
+import collections
+import errno
+import json
+import os
+import shutil
+import time
+
+import numpy
+
+from trec_ingest.timestamps import epoch_from_timestamp
+
+
+STORE_VERSION = 1
+STORE_SCHEME = 'store://'
+DAY_TABLE = 'tweets'
+WRITE_BATCH = 4096
+
+# Per-tweet fixed-width columns
+COLUMNS = collections.OrderedDict([
+    ('user_id', 'int32'),       # index into the `users` dictionary
+    ('name_id', 'int32'),       # index into the `names` dictionary
+    ('lang_id', 'int16'),       # index into the `langs` dictionary
+    ('published', 'int64'),     # epoch seconds, UTC
+    ('spam_probability', 'float32'),
+])
+# Per-tweet variable-width columns
+TEXT_COLUMNS = ('title', 'content')
+# Distinct values of the dictionary-encoded columns
+DICTIONARIES = ('users', 'names', 'langs')
+
+Author = collections.namedtuple('Author', 'name link')
+Link = collections.namedtuple('Link', 'href')
+Lang = collections.namedtuple('Lang', 'code')
+Content = collections.namedtuple('Content', 'data')
+
+
+def timestamp_from_epoch(epoch):
+    """
+    :param int epoch: epoch seconds
+    :return str: ISO 8601 UTC timestamp, as Spinn3r writes `last_published`
+    """
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def day_from_epoch(epoch):
+    """
+    :param int epoch: epoch seconds
+    :return str: YYYY-MM-DD of the UTC day
+    """
+    return time.strftime('%Y-%m-%d', time.gmtime(epoch))
+
+
+def tweet_record_from_entry(entry, with_content=True):
+    """
+    Pull out the fields the jobs use.
+    :param spinn3rApi_pb2.Entry entry: entry from the protostream
+    :param bool with_content: keep the zlib-compressed raw content
+    :return tuple: screen name link, user name, epoch seconds, title,
+        language code, spam probability, content
+    """
+    tweet = entry.feed_entry
+    author = tweet.author[0]
+    return (author.link[0].href,
+            author.name,
+            epoch_from_timestamp(tweet.last_published),
+            tweet.title,
+            tweet.lang[0].code if len(tweet.lang) else u'',
+            tweet.spam_probability,
+            tweet.content.data if with_content else '')
+
+
+def day_table_path(store_dir, day):
+    """
+    :param str store_dir: root of the store
+    :param str day: YYYY-MM-DD
+    :return str: directory holding the day's columns
+    """
+    return os.path.join(store_dir, day, DAY_TABLE)
+
+
+def day_table_line(store_dir, day, count):
+    """
+    :param str store_dir: root of the store
+    :param str day: YYYY-MM-DD
+    :param int count: number of tweets in the day
+    :return str: input line for --tweet-store, shaped like the lines of
+        list_of_trec_files.txt
+    """
+    return '\t'.join([day, str(count), STORE_SCHEME + os.path.abspath(day_table_path(store_dir, day))])
+
+
+class TextColumnWriter(object):
+    """Appends byte strings to `<name>.blob`, tracking their offsets."""
+    def __init__(self, table_dir, name):
+        self.blob_f = open(os.path.join(table_dir, name + '.blob'), 'wb')
+        self.offsets_f = open(os.path.join(table_dir, name + '.offsets.bin'), 'wb')
+        self.offsets = [0]
+        self.end = 0
+
+    def append(self, data):
+        self.blob_f.write(data)
+        self.end += len(data)
+        self.offsets.append(self.end)
+        if len(self.offsets) >= WRITE_BATCH:
+            self.flush()
+
+    def flush(self):
+        numpy.array(self.offsets, dtype='int64').tofile(self.offsets_f)
+        self.offsets = []
+
+    def close(self):
+        self.flush()
+        self.blob_f.close()
+        self.offsets_f.close()
+
+
+class TweetStoreWriter(object):
+    """
+    Writes one day of tweets. Rows are streamed to disk in batches, so a
+    reducer can write a day of any size. The day only replaces an older
+    copy of itself once `close()` has written every column.
+    """
+    def __init__(self, store_dir, day):
+        """
+        :param str store_dir: root of the store
+        :param str day: YYYY-MM-DD
+        """
+        self.path = day_table_path(store_dir, day)
+        self.tmp_path = '{}.tmp-{}'.format(self.path, os.getpid())
+        try:
+            os.makedirs(self.tmp_path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        self.count = 0
+        self.dictionaries = dict((name, {}) for name in DICTIONARIES)
+        self.rows = dict((name, []) for name in COLUMNS)
+        self.column_fs = dict((name, open(os.path.join(self.tmp_path, name + '.bin'), 'wb'))
+                              for name in COLUMNS)
+        self.texts = dict((name, TextColumnWriter(self.tmp_path, name)) for name in TEXT_COLUMNS)
+
+    def _encode(self, dictionary, value):
+        values = self.dictionaries[dictionary]
+        try:
+            return values[value]
+        except KeyError:
+            index = values[value] = len(values)
+            return index
+
+    def append(self, record):
+        """
+        :param tuple record: as returned by `tweet_record_from_entry()`
+        """
+        href, name, published, title, lang, spam_probability, content = record
+        self.rows['user_id'].append(self._encode('users', href))
+        self.rows['name_id'].append(self._encode('names', name))
+        self.rows['lang_id'].append(self._encode('langs', lang))
+        self.rows['published'].append(published)
+        self.rows['spam_probability'].append(spam_probability)
+        self.texts['title'].append(title.encode('utf8'))
+        self.texts['content'].append(content)
+        self.count += 1
+        if len(self.rows['published']) >= WRITE_BATCH:
+            self.flush()
+
+    def flush(self):
+        for name, dtype in COLUMNS.items():
+            numpy.array(self.rows[name], dtype=dtype).tofile(self.column_fs[name])
+            self.rows[name] = []
+
+    def close(self):
+        """
+        Write the dictionaries and metadata, then move the day into place.
+        :return int: number of tweets written
+        """
+        self.flush()
+        for f in self.column_fs.values():
+            f.close()
+        for text in self.texts.values():
+            text.close()
+
+        for name in DICTIONARIES:
+            text = TextColumnWriter(self.tmp_path, name)
+            values = self.dictionaries[name]
+            for value in sorted(values, key=values.get):
+                text.append(value.encode('utf8'))
+            text.close()
+
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as meta_f:
+            json.dump({'version': STORE_VERSION,
+                       'count': self.count,
+                       'columns': COLUMNS,
+                       'dictionaries': dict((name, len(self.dictionaries[name])) for name in DICTIONARIES)},
+                      meta_f)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.rename(self.tmp_path, self.path)
+        return self.count
+
+
+class TweetStore(object):
+    """
+    Read-only view of one day of the store.
+    """
+    def __init__(self, path):
+        """
+        :param str path: directory written by TweetStoreWriter
+        """
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as meta_f:
+            meta = json.load(meta_f)
+        if meta['version'] != STORE_VERSION:
+            raise ValueError('Unsupported tweet store version {} at {}'.format(meta['version'], path))
+        self.count = meta['count']
+        self.dictionary_sizes = meta['dictionaries']
+        self.columns = dict((name, self._memmap(name + '.bin', dtype, self.count))
+                            for name, dtype in meta['columns'].items())
+        self.dictionaries = dict((name, self._text_column(name, self.dictionary_sizes[name]))
+                                 for name in DICTIONARIES)
+        self.texts = dict((name, self._text_column(name, self.count)) for name in TEXT_COLUMNS)
+
+    def __len__(self):
+        return self.count
+
+    def _memmap(self, file_name, dtype, count):
+        if count == 0:
+            # numpy cannot map an empty file
+            return numpy.zeros(0, dtype=dtype)
+        return numpy.memmap(os.path.join(self.path, file_name), dtype=dtype, mode='r', shape=(count,))
+
+    def _text_column(self, name, count):
+        offsets = self._memmap(name + '.offsets.bin', 'int64', count + 1)
+        if count == 0 or offsets[-1] == 0:
+            blob = ''
+        else:
+            blob = self._memmap(name + '.blob', 'uint8', int(offsets[-1]))
+        return offsets, blob
+
+    def text(self, name, i):
+        """
+        :param str name: text column or dictionary
+        :param int i: row
+        :return str: the row's raw bytes
+        """
+        offsets, blob = self.texts[name] if name in self.texts else self.dictionaries[name]
+        return blob[offsets[i]:offsets[i + 1]].tostring() if len(blob) else ''
+
+    def decoded_dictionary(self, name):
+        """
+        :param str name: one of DICTIONARIES
+        :return list: its values as unicode, in index order
+        """
+        return [self.text(name, i).decode('utf8') for i in xrange(self.dictionary_sizes[name])]
+
+    def entries(self):
+        """
+        :return generator: StoredEntry for every tweet of the day
+        """
+        users = self.decoded_dictionary('users')
+        names = self.decoded_dictionary('names')
+        langs = self.decoded_dictionary('langs')
+        user_ids = self.columns['user_id']
+        name_ids = self.columns['name_id']
+        lang_ids = self.columns['lang_id']
+        for i in xrange(self.count):
+            yield StoredEntry(self, i,
+                              users[user_ids[i]],
+                              names[name_ids[i]],
+                              langs[lang_ids[i]])
+
+
+class StoredEntry(object):
+    """
+    Stands in for a spinn3rApi_pb2.Entry read from a chunk: `feed_entry`
+    has the fields the jobs use, decoded from the store when asked for.
+    """
+    __slots__ = ('store', 'i', 'author', 'lang')
+
+    def __init__(self, store, i, href, name, lang):
+        self.store = store
+        self.i = i
+        self.author = [Author(name, [Link(href)])]
+        self.lang = [Lang(lang)]
+
+    @property
+    def feed_entry(self):
+        return self
+
+    @property
+    def title(self):
+        return self.store.text('title', self.i).decode('utf8')
+
+    @property
+    def last_published(self):
+        return timestamp_from_epoch(int(self.store.columns['published'][self.i]))
+
+    @property
+    def spam_probability(self):
+        return float(self.store.columns['spam_probability'][self.i])
+
+    @property
+    def content(self):
+        return Content(self.store.text('content', self.i))
@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Streaming fetch / decrypt / parse of the encrypted Spinn3r chunk files.
+
+The old mapper code did:
+    resp.content -> decrypt_and_uncompress -> StringIO -> ProtoStreamReader
+which holds the encrypted, decrypted and StringIO copies of a chunk in
+memory at the same time. Here the download is spooled to a temporary file
+in fixed-size pieces, and gpg and xz run as a pipeline whose stdout feeds
+ProtoStreamReader directly, so the only buffers are the pipe buffers.
+"""
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import threading
+
+from google.protobuf.internal import api_implementation
+import requests
+from streamcorpus_pipeline._spinn3r_feed_storage import ProtoStreamReader
+
+from trec_ingest.lazy import LazyProtoStreamReader
+
+
+S3_URL = 'http://s3.amazonaws.com'
+DOWNLOAD_CHUNK_BYTES = 1 << 16
+
+# The C++ protobuf parser is faster than scanning fields in Python, and only
+# builds Python objects for the fields that are read anyway.
+LAZY_ENTRIES = api_implementation.Type() == 'python'
+
+DECOMPRESSORS = {
+    '.xz': ['xz', '--decompress', '--stdout'],
+    '.gz': ['gzip', '--decompress', '--stdout'],
+}
+
+
+class IngestError(Exception):
+    """Raised when a chunk file cannot be fetched or decrypted."""
+    pass
+
+
+def aws_path_from_line(line):
+    """
+    :param str|unicode line: pseudo-tab separated date, size and file path
+    :return str: path of the file within the s3 bucket
+    """
+    aws_prefix, aws_path = line.strip().split('//')
+    return aws_path
+
+
+def download_to_file(aws_path, out_f, chunk_bytes=DOWNLOAD_CHUNK_BYTES):
+    """
+    Stream the file at `aws_path` into the open file `out_f`, `chunk_bytes`
+    at a time.
+    :param str aws_path: path of the file within the s3 bucket
+    :param file out_f: file opened for binary writing
+    :param int chunk_bytes: size of each piece read from the socket
+    :return int: number of bytes written
+    """
+    url = os.path.join(S3_URL, aws_path)
+    resp = requests.get(url, stream=True)
+    try:
+        resp.raise_for_status()
+        n_bytes = 0
+        for piece in resp.iter_content(chunk_bytes):
+            out_f.write(piece)
+            n_bytes += len(piece)
+    finally:
+        resp.close()
+    out_f.flush()
+    return n_bytes
+
+
+def decompress_command(aws_path):
+    """
+    Chunk files are named like `<name>.xz.gpg`; the suffix under `.gpg`
+    picks the decompressor. Unknown suffixes are assumed to be xz, which
+    is what streamcorpus.decrypt_and_uncompress defaults to.
+    :param str aws_path: path of the file within the s3 bucket
+    :return list: argv of the decompressor
+    """
+    name = aws_path[:-len('.gpg')] if aws_path.endswith('.gpg') else aws_path
+    return DECOMPRESSORS.get(os.path.splitext(name)[1], DECOMPRESSORS['.xz'])
+
+
+class GpgKeyring(object):
+    """
+    A gpg home directory with the corpus key imported, rather than
+    importing it once per chunk.
+
+    gpg decrypts one message per process, so what persists between chunks
+    is the home directory and its gpg-agent, which keeps the key loaded.
+    A shared keyring lives in a fixed directory per user and key, so every
+    mapper on a node, in this job and later ones, reuses one import and one
+    agent. A private keyring is a temporary directory that `close()`
+    removes, along with its agent.
+    """
+    def __init__(self, gpg_private, tmp_dir=None, shared=False):
+        """
+        :param str gpg_private: path to gpg private key for decrypting the data
+        :param str tmp_dir: where to make the gpg home directory
+        :param bool shared: share the home directory with other processes
+        """
+        self.gpg_private = gpg_private
+        self.tmp_dir = tmp_dir
+        self.shared = shared
+        self.gpg_dir = None
+        self.lock = threading.Lock()
+
+    def home(self):
+        """
+        :return str: gpg home directory holding the imported key
+        """
+        with self.lock:
+            return self._home()
+
+    def _home(self):
+        if self.gpg_dir is None:
+            if not os.path.exists(self.gpg_private):
+                raise IngestError('Cannot locate key: {}'.format(self.gpg_private))
+            if self.shared:
+                self.gpg_dir = self._shared_home()
+            else:
+                gpg_dir = tempfile.mkdtemp(dir=self.tmp_dir, prefix='tmp-trec-ingest-gpg-')
+                try:
+                    self._import_key(gpg_dir)
+                except IngestError:
+                    shutil.rmtree(gpg_dir, ignore_errors=True)
+                    raise
+                self.gpg_dir = gpg_dir
+            self._launch_agent()
+        return self.gpg_dir
+
+    def _shared_home(self):
+        with open(self.gpg_private, 'rb') as f:
+            key_digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        gpg_dir = os.path.join(self.tmp_dir or tempfile.gettempdir(),
+                               'trec-ingest-gpg-{}-{}'.format(os.getuid(), key_digest))
+        try:
+            os.mkdir(gpg_dir, 0700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        st = os.lstat(gpg_dir)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0077:
+            raise IngestError('Refusing to use gpg home {}: not a private directory'.format(gpg_dir))
+
+        # Whoever gets the lock first imports the key; the rest wait for it
+        with open(os.path.join(gpg_dir, '.import.lock'), 'a') as lock_f:
+            fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                imported_path = os.path.join(gpg_dir, '.imported')
+                if not os.path.exists(imported_path):
+                    self._import_key(gpg_dir)
+                    open(imported_path, 'w').close()
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+        return gpg_dir
+
+    def _import_key(self, gpg_dir):
+        gpg_child = subprocess.Popen(
+            ['gpg', '--no-permission-warning', '--batch', '--homedir', gpg_dir,
+             '--import', self.gpg_private],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True)
+        s_out, errors = gpg_child.communicate()
+        if gpg_child.returncode != 0:
+            raise IngestError('gpg --import failed:\n{}'.format(errors))
+
+    def _gpgconf(self, command):
+        # gpg 1.x has no agent to manage; a failure here only costs speed
+        try:
+            subprocess.call(['gpgconf', '--homedir', self.gpg_dir, command, 'gpg-agent'],
+                            stdout=open(os.devnull, 'w'),
+                            stderr=subprocess.STDOUT,
+                            close_fds=True)
+        except OSError:
+            pass
+
+    def _launch_agent(self):
+        """Start the agent now, rather than inside the first decryption."""
+        self._gpgconf('--launch')
+
+    def decrypt_command(self):
+        """
+        :return list: argv of a gpg that decrypts stdin to stdout
+        """
+        return ['gpg', '--no-permission-warning', '--batch', '--homedir', self.home(),
+                '--trust-model', 'always', '--output', '-', '--decrypt', '-']
+
+    def close(self):
+        """Remove a private keyring and stop its agent. A shared keyring stays up."""
+        if self.gpg_dir is not None and not self.shared:
+            self._gpgconf('--kill')
+            shutil.rmtree(self.gpg_dir, ignore_errors=True)
+        self.gpg_dir = None
+
+
+class DecryptedStream(object):
+    """
+    gpg | xz pipeline reading an encrypted chunk from a file on disk.
+    `stdout` is the uncompressed protostream; read it, then call `close()`
+    to reap the children and collect gpg's complaints. If `out_f` is given
+    xz writes there instead and `stdout` is None.
+    """
+    def __init__(self, encrypted_f, keyring, aws_path, out_f=None):
+        """
+        :param file encrypted_f: file holding the encrypted chunk, at offset 0
+        :param GpgKeyring keyring: keyring to decrypt with
+        :param str aws_path: path of the file within the s3 bucket
+        :param file out_f: file to write the uncompressed protostream to
+        """
+        self.aws_path = aws_path
+        self.gpg_errors = tempfile.TemporaryFile()
+        # close_fds: with --prefetch several pipelines are spawned from
+        # different threads, and a stray inherited pipe end would keep xz
+        # from ever seeing EOF.
+        self.gpg = subprocess.Popen(keyring.decrypt_command(),
+                                    stdin=encrypted_f,
+                                    stdout=subprocess.PIPE,
+                                    stderr=self.gpg_errors,
+                                    close_fds=True)
+        try:
+            self.xz = subprocess.Popen(decompress_command(aws_path),
+                                       stdin=self.gpg.stdout,
+                                       stdout=out_f if out_f is not None else subprocess.PIPE,
+                                       stderr=subprocess.PIPE,
+                                       close_fds=True)
+        except OSError as e:
+            # No one will read gpg's output, so don't leave it running
+            self.gpg.stdout.close()
+            if self.gpg.poll() is None:
+                self.gpg.kill()
+            self.gpg.wait()
+            self.gpg_errors.close()
+            raise IngestError('{}: could not start {}: {}'.format(aws_path, decompress_command(aws_path)[0], e))
+        # Only xz should hold the read end, so gpg sees SIGPIPE if xz dies.
+        self.gpg.stdout.close()
+        self.stdout = self.xz.stdout
+
+    def close(self, drain=True):
+        """
+        :param bool drain: read whatever is left of the stream so the children
+            exit on their own; otherwise kill them (the consumer gave up early)
+        :return list: error messages from gpg and the decompressor
+        """
+        if self.stdout is None:
+            pass
+        elif drain:
+            while self.stdout.read(DOWNLOAD_CHUNK_BYTES):
+                pass
+        else:
+            for child in (self.xz, self.gpg):
+                if child.poll() is None:
+                    child.kill()
+        if self.stdout is not None:
+            self.stdout.close()
+        xz_errors = self.xz.stderr.read()
+        self.xz.stderr.close()
+        self.xz.wait()
+        self.gpg.wait()
+
+        errors = []
+        self.gpg_errors.seek(0)
+        gpg_errors = self.gpg_errors.read()
+        self.gpg_errors.close()
+        if gpg_errors:
+            errors.append('gpg logs to stderr, read carefully:\n\n%s' % gpg_errors)
+        if xz_errors:
+            errors.append(xz_errors)
+        return errors
+
+    @property
+    def failed(self):
+        return self.gpg.returncode != 0 or self.xz.returncode != 0
+
+
+class FetchedChunk(object):
+    """
+    A chunk downloaded and decrypted to a local file, possibly on another
+    thread. Counter increments and log lines are recorded here and replayed
+    by the ingestor on the main thread, since mrjob counters go to stderr.
+    """
+    def __init__(self, aws_path):
+        """
+        :param str aws_path: path of the file within the s3 bucket
+        """
+        self.aws_path = aws_path
+        self.decrypted_f = None
+        self.counters = []
+        self.messages = []
+
+    def count(self, group, counter):
+        self.counters.append((group, counter))
+
+    def close(self):
+        if self.decrypted_f is not None:
+            self.decrypted_f.close()
+            self.decrypted_f = None
+
+
+class ChunkIngestor(object):
+    """
+    Yields feed entries for each aws_path, counting failures on the job the
+    same way the individual mappers used to.
+    """
+    def __init__(self, gpg_private, increment_counter, logger, tmp_dir=None, cache=None,
+                 lazy_entries=LAZY_ENTRIES, shared_keyring=False):
+        """
+        :param str gpg_private: path to gpg private key for decrypting the data
+        :param increment_counter: MRJob.increment_counter of the running job
+        :param logging.Logger logger: where to put gpg's complaints
+        :param str tmp_dir: where to spool downloads
+        :param trec_ingest.cache.ChunkCache cache: decrypted chunks kept on disk
+        :param bool lazy_entries: yield LazyEntry views instead of parsed entries
+        :param bool shared_keyring: share the imported key and gpg-agent with
+            the other processes on the node
+        """
+        self.keyring = GpgKeyring(gpg_private, tmp_dir, shared=shared_keyring)
+        self.increment_counter = increment_counter
+        self.logger = logger
+        self.tmp_dir = tmp_dir
+        self.cache = cache
+        self.lazy_entries = lazy_entries
+
+    def entries(self, aws_path):
+        """
+        Download `aws_path` and stream its entries straight out of gpg | xz.
+        With a cache the decrypted chunk has to land on disk anyway, so this
+        goes through `fetch()` instead.
+        :param str aws_path: path of the file within the s3 bucket
+        :return generator: spinn3rApi_pb2.Entry for each tweet in the file
+        """
+        if self.cache is not None:
+            return self.entries_from_fetched(self.fetch(aws_path))
+        return self._stream_entries(aws_path)
+
+    def _stream_entries(self, aws_path):
+        with tempfile.TemporaryFile(dir=self.tmp_dir) as encrypted_f:
+            try:
+                n_bytes = download_to_file(aws_path, encrypted_f)
+            except Exception as e:
+                self.increment_counter('resp_exception', type(e).__name__, 1)
+                return
+
+            if n_bytes == 0:
+                self.logger.info('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
+                self.increment_counter('wa1', 'file_data_bad', 1)
+                return
+
+            encrypted_f.seek(0)
+            for entry in self.entries_from_encrypted_file(encrypted_f, aws_path):
+                yield entry
+
+    def entries_from_encrypted_file(self, encrypted_f, aws_path):
+        """
+        :param file encrypted_f: file holding the encrypted chunk, at offset 0
+        :param str aws_path: path of the file within the s3 bucket
+        :return generator: spinn3rApi_pb2.Entry for each tweet in the file
+        """
+        try:
+            stream = DecryptedStream(encrypted_f, self.keyring, aws_path)
+        except IngestError as e:
+            self.logger.info(str(e))
+            self.increment_counter('wa1', 'missing_key', 1)
+            return
+
+        counts = [0]
+        finished = False
+        try:
+            for entry in self.read_entries(stream.stdout, counts):
+                yield entry
+            finished = True
+        finally:
+            errors = stream.close(drain=finished)
+            if errors:
+                self.logger.info('\n'.join(errors))
+            if finished and (counts[0] == 0 or stream.failed):
+                self.logger.info('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
+                self.increment_counter('wa1', 'file_data_bad', 1)
+
+    def fetch(self, aws_path):
+        """
+        Download and decrypt `aws_path` to a temporary file, or open it from
+        the cache, without touching the job. Safe to call from worker threads.
+        :param str aws_path: path of the file within the s3 bucket
+        :return FetchedChunk: the decrypted file, or the reasons there is none
+        """
+        chunk = FetchedChunk(aws_path)
+        if self.cache is not None:
+            cached_f = self.cache.open(aws_path)
+            if cached_f is not None:
+                chunk.count('chunk_cache', 'hit')
+                chunk.decrypted_f = cached_f
+                return chunk
+            chunk.count('chunk_cache', 'miss')
+
+        with tempfile.TemporaryFile(dir=self.tmp_dir) as encrypted_f:
+            try:
+                n_bytes = download_to_file(aws_path, encrypted_f)
+            except Exception as e:
+                chunk.count('resp_exception', type(e).__name__)
+                return chunk
+
+            if n_bytes == 0:
+                chunk.messages.append('{}: did not retrieve any data. Skipping...\n'.format(aws_path))
+                chunk.count('wa1', 'file_data_bad')
+                return chunk
+
+            encrypted_f.seek(0)
+            decrypted_f = self._create_decrypted_file()
+            try:
+                stream = DecryptedStream(encrypted_f, self.keyring, aws_path, out_f=decrypted_f)
+            except IngestError as e:
+                self._discard_decrypted_file(decrypted_f)
+                chunk.messages.append(str(e))
+                chunk.count('wa1', 'missing_key')
+                return chunk
+            chunk.messages.extend(stream.close())
+
+        if stream.failed or os.fstat(decrypted_f.fileno()).st_size == 0:
+            self._discard_decrypted_file(decrypted_f)
+            chunk.messages.append('{}: did not decrypt any data. Skipping...\n'.format(aws_path))
+            chunk.count('wa1', 'file_data_bad')
+            return chunk
+
+        if self.cache is not None:
+            decrypted_f = self.cache.commit(decrypted_f, aws_path)
+        else:
+            decrypted_f.seek(0)
+        chunk.decrypted_f = decrypted_f
+        return chunk
+
+    def _create_decrypted_file(self):
+        if self.cache is not None:
+            return self.cache.create()
+        return tempfile.TemporaryFile(dir=self.tmp_dir)
+
+    def _discard_decrypted_file(self, decrypted_f):
+        if self.cache is not None:
+            self.cache.discard(decrypted_f)
+        else:
+            decrypted_f.close()
+
+    def entries_from_fetched(self, chunk):
+        """
+        Replay the counters of a `fetch()` and parse its decrypted file.
+        :param FetchedChunk chunk: result of `fetch()`
+        :return generator: spinn3rApi_pb2.Entry for each tweet in the file
+        """
+        try:
+            for group, counter in chunk.counters:
+                self.increment_counter(group, counter, 1)
+            if chunk.messages:
+                self.logger.info('\n'.join(chunk.messages))
+            if chunk.decrypted_f is not None:
+                for entry in self.read_entries(chunk.decrypted_f, [0]):
+                    yield entry
+        finally:
+            chunk.close()
+
+    def read_entries(self, f, counts):
+        """
+        :param file f: uncompressed protostream
+        :param list counts: counts[0] is incremented for each entry read
+        :return generator: spinn3rApi_pb2.Entry or LazyEntry for each tweet in the file
+        """
+        if not self.lazy_entries:
+            for entry in self._read_entries(ProtoStreamReader(f), counts):
+                yield entry
+            return
+
+        entry = None
+        n_skipped = 0
+        n_total = 0
+        try:
+            for next_entry in self._read_entries(LazyProtoStreamReader(f), counts):
+                # Whatever the job didn't read of the last entry, it skipped
+                if entry is not None:
+                    n_skipped += entry.skipped_bytes()
+                entry = next_entry
+                n_total += len(entry.SerializeToString())
+                yield entry
+        finally:
+            if entry is not None:
+                n_skipped += entry.skipped_bytes()
+            self.increment_counter('lazy_decode', 'entry_bytes', n_total)
+            self.increment_counter('lazy_decode', 'bytes_skipped', n_skipped)
+
+    def _read_entries(self, reader, counts):
+        reader = iter(reader)
+        while True:
+            try:
+                entry = next(reader)
+            except StopIteration:
+                return
+            except Exception as e:
+                self.increment_counter('file_exception', type(e).__name__, 1)
+                return
+            counts[0] += 1
+            yield entry
+
+    def close(self):
+        self.keyring.close()
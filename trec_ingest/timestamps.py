@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+Parse Spinn3r timestamps, like a feed entry's `last_published`, into epoch
+seconds.
+
+Spinn3r writes ISO 8601 UTC times, e.g. `2014-03-01T12:34:56Z`. Those are
+sliced apart directly; other ISO 8601 variants (fractional seconds, numeric
+offsets, a space for the T) go through a regex, and anything else falls back
+to dateutil. Times without a zone are taken to be UTC.
+
+Working in epoch seconds makes date windows plain integer comparisons, with
+no naive/aware datetime mismatches to catch.
+"""
+import calendar
+import re
+
+import dateutil
+import dateutil.parser
+
+
+ISO_8601_RE = re.compile(r'^(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:[.,]\d+)?'
+                         r'(?:(Z)|([+-])(\d\d):?(\d\d))?$')
+
+SECONDS_PER_DAY = 86400
+DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def days_from_civil(year, month, day):
+    """
+    :param int year: proleptic Gregorian year
+    :param int month: 1 - 12
+    :param int day: 1 - 31
+    :return int: days since 1970-01-01
+    """
+    # http://howardhinnant.github.io/date_algorithms.html#days_from_civil
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _epoch(year, month, day, hour, minute, second):
+    if not (1 <= month <= 12 and 1 <= day <= DAYS_IN_MONTH[month]
+            and hour < 24 and minute < 60 and second < 61):
+        raise ValueError('Invalid date or time')
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        raise ValueError('Invalid date or time')
+    return days_from_civil(year, month, day) * SECONDS_PER_DAY + hour * 3600 + minute * 60 + second
+
+
+def epoch_from_timestamp(timestamp):
+    """
+    :param str|unicode timestamp: e.g. a feed entry's `last_published`
+    :return int: epoch seconds
+    :raise ValueError: if dateutil can't parse it either
+    """
+    # The fixed Spinn3r format: 2014-03-01T12:34:56Z
+    if len(timestamp) == 20 and timestamp[19] == 'Z' and timestamp[10] == 'T':
+        try:
+            return _epoch(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                          int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]))
+        except ValueError:
+            pass
+
+    m = ISO_8601_RE.match(timestamp)
+    if m is not None:
+        year, month, day, hour, minute, second, zulu, sign, offset_hours, offset_minutes = m.groups()
+        try:
+            epoch = _epoch(int(year), int(month), int(day), int(hour), int(minute), int(second))
+        except ValueError:
+            pass
+        else:
+            if sign is not None:
+                offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+                epoch += -offset if sign == '+' else offset
+            return epoch
+
+    return calendar.timegm(dateutil.parser.parse(timestamp).utctimetuple())
+
+
+def seconds_of_day(epoch):
+    """
+    :param int epoch: epoch seconds
+    :return int: seconds since midnight UTC
+    """
+    return epoch % SECONDS_PER_DAY
+
+
+# February 1, 2014 - November 30, 2014
+FEB_2014 = epoch_from_timestamp('2014-02-01T00:00:00Z')
+DEC_2014 = epoch_from_timestamp('2014-12-01T00:00:00Z')
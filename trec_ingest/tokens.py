@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+__author__ = 'Sam Zhang, Peter M. Landwehr'
+"""
+simpleTokenize(), memoized by tweet text.
+
+Retweets and bot-posted duplicates make up a large share of the tweets in a
+crisis burst, and each has the same title as many others. Jobs run with
+--token-cache-size tokenize through a TokenCache, which keeps the tokens of
+about that many distinct texts and counts its hits and misses.
+
+Cached token lists are shared between every tweet with the same text, so
+callers must not change them.
+"""
+from twokenize import simpleTokenize
+
+
+class TokenCache(object):
+    """
+    `simpleTokenize()`, memoized by text, keeping about the `size` most
+    recently used texts in a young and an old generation; see
+    `trec_ingest.authors.ScreenNameCache`.
+    """
+    def __init__(self, size, tokenize=simpleTokenize):
+        """
+        :param int size: texts to keep, across both generations
+        :param tokenize: the tokenizer to memoize
+        """
+        self.generation_size = max(size // 2, 1)
+        self.tokenize = tokenize
+        self.young = {}
+        self.old = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.young) + len(self.old)
+
+    def __call__(self, text):
+        """
+        :param str|unicode text: text of a tweet
+        :return list: its tokens; not to be changed
+        """
+        # The texts themselves are the keys: str and unicode cache their
+        # hash, and a digest alone could hand back another text's tokens
+        tokens = self.young.get(text)
+        if tokens is not None:
+            self.hits += 1
+            return tokens
+        tokens = self.old.get(text)
+        if tokens is None:
+            self.misses += 1
+            tokens = self.tokenize(text)
+        else:
+            self.hits += 1
+        if len(self.young) >= self.generation_size:
+            self.old = self.young
+            self.young = {}
+        self.young[text] = tokens
+        return tokens
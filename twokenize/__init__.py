@@ -201,8 +201,41 @@ def splitEdgePunct(input):
     return input
 
 
-# The main work of tokenizing a tweet.
+# Fast path for simpleTokenize.
+# Every Protected match holds at least one character that isn't a letter, digit or
+# whitespace, and only arbitraryAbbrev (aa2) takes in a space, as its first character.
+# So Protected only has to be run over the space-delimited chunks that hold such a
+# character, starting from the space before each; the rest of the text is split on
+# spaces as it is. Both edge punct passes need an edgePunct character, so they are
+# skipped for text without one.
+EdgePunctChar = re.compile(edgePunct, re.UNICODE)
+ProtectedChunk = re.compile(u"(?<![^ ])[^ ]*?[^A-Za-z0-9\s][^ ]*", re.UNICODE)
+
+
+# The main work of tokenizing a tweet. Gives the same tokens as simpleTokenizeReference.
 def simpleTokenize(text):
+    if EdgePunctChar.search(text):
+        text = splitEdgePunct(text)
+
+    tokens = []
+    goodStart = 0
+    for chunk in ProtectedChunk.finditer(text):
+        chunkStart, chunkEnd = chunk.span()
+        addAllnonempty(tokens, text[goodStart:chunkStart].split(" "))
+        goodStart = chunkStart - 1 if chunkStart else 0
+        for match in Protected.finditer(text, goodStart, chunkEnd):
+            if (match.start() != match.end()):
+                addAllnonempty(tokens, text[goodStart:match.start()].split(" "))
+                addAllnonempty(tokens, [match.group()])
+                goodStart = match.end()
+        addAllnonempty(tokens, text[goodStart:chunkEnd].split(" "))
+        goodStart = chunkEnd
+    addAllnonempty(tokens, text[goodStart:].split(" "))
+    return tokens
+
+
+# The original tokenizer, kept to check simpleTokenize against.
+def simpleTokenizeReference(text):
 
     # Do the no-brainers first
     splitPunctText = splitEdgePunct(text)